@@ -0,0 +1,443 @@
+"""
+Benchmarks for the mockitup registration and dispatch hot paths.
+
+Every case is measured twice: once through mockitup, and once through a raw `unittest.mock.Mock` configured
+with an equivalent `side_effect`, so the cost mockitup adds on top of `unittest.mock` is visible.
+
+    python benchmarks/run_benchmarks.py --output results.json
+    python benchmarks/run_benchmarks.py --compare results.json --threshold 0.2
+    python benchmarks/run_benchmarks.py --memory --output memory.json
+    python benchmarks/run_benchmarks.py --memory --compare memory.json
+
+In compare mode the run fails when a case got slower than the given results by more than the threshold.
+Memory mode measures the bytes every registration keeps alive instead, and compares them against the results of a
+previous memory run.
+"""
+import argparse
+import asyncio
+import json
+import platform
+import sys
+import time
+import timeit
+import tracemalloc
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, cast
+from unittest.mock import AsyncMock, Mock
+
+from hamcrest import greater_than_or_equal_to
+from mockitup import ANY_ARG, FastStub, MockTemplate, allow, dispatch_as_stub, dispatch_by_specificity, \
+    expectation_suite, returns_table
+
+# Seconds it takes to run a case `number` times.
+_Measure = Callable[[int], float]
+
+
+class Case(NamedTuple):
+    name: str
+    # Sets the case up, returning its "mockitup" and "baseline" measures. Only called for the cases that are run.
+    build: Callable[[], Dict[str, _Measure]]
+    number: int
+
+
+_CASES: List[Case] = []
+
+
+def case(name: str, number: int) -> Callable[[Callable[[], Dict[str, _Measure]]], None]:
+
+    def decorator(build: Callable[[], Dict[str, _Measure]]) -> None:
+        _CASES.append(Case(name, build, number))
+
+    return decorator
+
+
+def _timed(func: Callable[[], Any]) -> _Measure:
+    return lambda number: timeit.timeit(func, number=number)
+
+
+def _lookup_table(size: int) -> Dict[int, int]:
+    return {key: key * 2 for key in range(size)}
+
+
+def _registration_cases() -> None:
+
+    @case("register/allow", number=2_000)
+    def _() -> Dict[str, _Measure]:
+        mock = Mock()
+        table: Dict[int, int] = {}
+        keys = iter(range(sys.maxsize))
+        baseline_mock = Mock(side_effect=table.__getitem__)
+
+        def register_allowance() -> None:
+            key = next(keys)
+            allow(mock).lookup(key).returns(key)
+
+        def register_baseline() -> None:
+            key = next(keys)
+            table[key] = key
+            assert baseline_mock.side_effect
+
+        return {"mockitup": _timed(register_allowance), "baseline": _timed(register_baseline)}
+
+    @case("register/expect", number=2_000)
+    def _() -> Dict[str, _Measure]:
+        mock = Mock()
+        es = expectation_suite()
+        table: Dict[int, int] = {}
+        keys = iter(range(sys.maxsize))
+        baseline_mock = Mock(side_effect=table.__getitem__)
+
+        def register_expectation() -> None:
+            key = next(keys)
+            es.expect(mock).lookup(key).returns(key)
+
+        def register_baseline() -> None:
+            key = next(keys)
+            table[key] = key
+            assert baseline_mock.side_effect
+
+        return {"mockitup": _timed(register_expectation), "baseline": _timed(register_baseline)}
+
+    @case("register/template/200", number=2_000)
+    def _() -> Dict[str, _Measure]:
+        template = MockTemplate()
+        for key, value in _lookup_table(200).items():
+            template.allow().lookup(key).returns(value)
+        compiled = template.compile()
+        table = _lookup_table(200)
+
+        def apply_template() -> None:
+            compiled.apply(Mock())
+
+        def build_baseline() -> None:
+            assert Mock().lookup.configure_mock(side_effect=table.__getitem__) is None
+
+        return {"mockitup": _timed(apply_template), "baseline": _timed(build_baseline)}
+
+
+def _dispatch_cases() -> None:
+    for size in (1, 100, 10_000):
+
+        @case(f"dispatch/exact/{size}", number=5_000)
+        def _(size: int = size) -> Dict[str, _Measure]:
+            mock = Mock()
+            for key, value in _lookup_table(size).items():
+                allow(mock).lookup(key).returns(value)
+            baseline_mock = Mock(side_effect=_lookup_table(size).__getitem__)
+            last = size - 1
+            return {
+                "mockitup": _timed(lambda: mock.lookup(last)),
+                "baseline": _timed(lambda: baseline_mock.lookup(last)),
+            }
+
+    @case("dispatch/fast-stub/100", number=5_000)
+    def _() -> Dict[str, _Measure]:
+        stub = FastStub()
+        for key, value in _lookup_table(100).items():
+            allow(stub).lookup(key).returns(value)
+        baseline_mock = Mock(side_effect=_lookup_table(100).__getitem__)
+        return {
+            "mockitup": _timed(lambda: stub.lookup(99)),
+            "baseline": _timed(lambda: baseline_mock.lookup(99)),
+        }
+
+    @case("dispatch/stub-mode/100", number=20_000)
+    def _() -> Dict[str, _Measure]:
+        stub = dispatch_as_stub(FastStub())
+        for key, value in _lookup_table(100).items():
+            allow(stub).lookup(key).returns(value)
+        # Measured against the bare dict lookup it compiles to, rather than a mock.
+        lookup = _lookup_table(100).__getitem__
+        return {
+            "mockitup": _timed(lambda: stub.lookup(99)),
+            "baseline": _timed(lambda: lookup(99)),
+        }
+
+    @case("dispatch/stub-wildcard/20000", number=20_000)
+    def _() -> Dict[str, _Measure]:
+        stub = dispatch_as_stub(FastStub())
+        returns_table(allow(stub).lookup, _lookup_table(20_000))
+        allow(stub).lookup(ANY_ARG).returns(None)
+        lookup = _lookup_table(20_000).get
+        # Calls missing the rows go to the wildcard, which is registered after all of them.
+        return {
+            "mockitup": _timed(lambda: stub.lookup(-1)),
+            "baseline": _timed(lambda: lookup(-1)),
+        }
+
+    @case("dispatch/stub-expect/20000", number=20_000)
+    def _() -> Dict[str, _Measure]:
+        stub = dispatch_as_stub(FastStub())
+        es = expectation_suite()
+        returns_table(es.expect(stub).lookup, _lookup_table(20_000))
+        lookup = _lookup_table(20_000).__getitem__
+        return {
+            "mockitup": _timed(lambda: stub.lookup(19_999)),
+            "baseline": _timed(lambda: lookup(19_999)),
+        }
+
+    @case("dispatch/wildcards/100", number=2_000)
+    def _() -> Dict[str, _Measure]:
+        mock = Mock()
+        for key in range(100):
+            allow(mock).lookup(key, ANY_ARG).returns(key)
+        baseline_mock = Mock(side_effect=lambda key, _: key)
+        return {
+            "mockitup": _timed(lambda: mock.lookup(99, "anything")),
+            "baseline": _timed(lambda: baseline_mock.lookup(99, "anything")),
+        }
+
+    @case("dispatch/specificity/100", number=2_000)
+    def _() -> Dict[str, _Measure]:
+        mock = dispatch_by_specificity(Mock())
+        for key in range(100):
+            allow(mock).lookup(key, ANY_ARG).returns(key)
+            allow(mock).lookup(greater_than_or_equal_to(key), key).returns(key)
+        baseline_mock = Mock(side_effect=lambda key, _: key)
+        return {
+            "mockitup": _timed(lambda: mock.lookup(99, "anything")),
+            "baseline": _timed(lambda: baseline_mock.lookup(99, "anything")),
+        }
+
+    @case("dispatch/hamcrest/100", number=2_000)
+    def _() -> Dict[str, _Measure]:
+        mock = Mock()
+        for key in reversed(range(100)):
+            allow(mock).lookup(greater_than_or_equal_to(key)).returns(key)
+        baseline_mock = Mock(side_effect=lambda key: key)
+        return {
+            "mockitup": _timed(lambda: mock.lookup(0)),
+            "baseline": _timed(lambda: baseline_mock.lookup(0)),
+        }
+
+    @case("dispatch/async/100", number=2_000)
+    def _() -> Dict[str, _Measure]:
+        mock = AsyncMock()
+        for key, value in _lookup_table(100).items():
+            allow(mock).lookup(key).returns(value)
+        baseline_mock = AsyncMock(side_effect=_lookup_table(100).__getitem__)
+
+        def measure(target: AsyncMock) -> _Measure:
+
+            async def run(number: int) -> None:
+                for _ in range(number):
+                    await target.lookup(99)
+
+            def timed(number: int) -> float:
+                started = time.perf_counter()
+                asyncio.run(run(number))
+                return time.perf_counter() - started
+
+            return timed
+
+        return {"mockitup": measure(mock), "baseline": measure(baseline_mock)}
+
+
+def _validation_cases() -> None:
+
+    @case("validate/suite-exit/1000", number=5)
+    def _() -> Dict[str, _Measure]:
+        size = 1_000
+
+        def validate_suite(number: int) -> float:
+            elapsed = 0.0
+            for _ in range(number):
+                es = expectation_suite(ordered=True)
+                mock = Mock()
+                for key in range(size):
+                    es.expect(mock).lookup(key).returns(key)
+                for key in range(size):
+                    mock.lookup(key)
+
+                started = time.perf_counter()
+                es.__exit__(None, None, None)
+                elapsed += time.perf_counter() - started
+            return elapsed
+
+        def validate_baseline(number: int) -> float:
+            elapsed = 0.0
+            for _ in range(number):
+                mock = Mock(side_effect=lambda key: key)
+                for key in range(size):
+                    mock.lookup(key)
+
+                started = time.perf_counter()
+                assert [call.args[0] for call in mock.lookup.call_args_list] == list(range(size))
+                elapsed += time.perf_counter() - started
+            return elapsed
+
+        return {"mockitup": validate_suite, "baseline": validate_baseline}
+
+
+class MemoryCase(NamedTuple):
+    name: str
+    # Registers `number` calls, returning what keeps them alive.
+    register: Callable[[int], Any]
+    number: int
+
+
+_MEMORY_CASES: List[MemoryCase] = []
+
+
+def memory_case(name: str, number: int) -> Callable[[Callable[[int], Any]], None]:
+
+    def decorator(register: Callable[[int], Any]) -> None:
+        _MEMORY_CASES.append(MemoryCase(name, register, number))
+
+    return decorator
+
+
+def _memory_cases() -> None:
+
+    @memory_case("memory/allow/exact", number=20_000)
+    def _(number: int) -> Any:
+        mock = Mock()
+        for key in range(number):
+            allow(mock).lookup(key).returns(key)
+        return mock
+
+    @memory_case("memory/allow/wildcard", number=20_000)
+    def _(number: int) -> Any:
+        mock = Mock()
+        for key in range(number):
+            allow(mock).lookup(key, ANY_ARG).returns(key)
+        return mock
+
+    @memory_case("memory/expect/exact", number=20_000)
+    def _(number: int) -> Any:
+        mock = Mock()
+        es = expectation_suite()
+        for key in range(number):
+            es.expect(mock).lookup(key).returns(key)
+        return mock, es
+
+    @memory_case("memory/allow/table", number=20_000)
+    def _(number: int) -> Any:
+        mock = Mock()
+        returns_table(allow(mock).lookup, {key: key for key in range(number)})
+        return mock
+
+
+def run_memory(cases: List[MemoryCase]) -> Dict[str, Dict[str, float]]:
+    results = {}
+    for bench_case in cases:
+        tracemalloc.start()
+        try:
+            before = tracemalloc.get_traced_memory()[0]
+            kept = bench_case.register(bench_case.number)
+            allocated = tracemalloc.get_traced_memory()[0] - before
+        finally:
+            tracemalloc.stop()
+        del kept
+        results[bench_case.name] = {"bytes_per_registration": allocated / bench_case.number}
+        print(f"{bench_case.name:<28} {allocated / bench_case.number:>12.1f} bytes/registration")
+    return results
+
+
+def run(cases: List[Case], repeat: int) -> Dict[str, Dict[str, float]]:
+    results = {}
+    for bench_case in cases:
+        measures = bench_case.build()
+        mockitup = min(measures["mockitup"](bench_case.number) for _ in range(repeat)) / bench_case.number
+        baseline = min(measures["baseline"](bench_case.number) for _ in range(repeat)) / bench_case.number
+        results[bench_case.name] = {
+            "mockitup_seconds_per_op": mockitup,
+            "baseline_seconds_per_op": baseline,
+            "overhead_ratio": mockitup / baseline,
+        }
+        print(f"{bench_case.name:<28} {mockitup * 1e6:>12.2f}us {baseline * 1e6:>12.2f}us "
+              f"{mockitup / baseline:>8.2f}x")
+    return results
+
+
+def find_regressions(
+    results: Dict[str, Dict[str, float]],
+    previous: Dict[str, Dict[str, float]],
+    threshold: float,
+) -> List[str]:
+    regressions = []
+    for name, measured in results.items():
+        if name not in previous:
+            continue
+        before = previous[name]["mockitup_seconds_per_op"]
+        after = measured["mockitup_seconds_per_op"]
+        if after > before * (1 + threshold):
+            regressions.append(f"{name}: {before * 1e6:.2f}us -> {after * 1e6:.2f}us")
+    return regressions
+
+
+def find_memory_regressions(
+    results: Dict[str, Dict[str, float]],
+    previous: Dict[str, Dict[str, float]],
+    threshold: float,
+) -> List[str]:
+    regressions = []
+    for name, measured in results.items():
+        if name not in previous:
+            continue
+        before = previous[name]["bytes_per_registration"]
+        after = measured["bytes_per_registration"]
+        if after > before * (1 + threshold):
+            regressions.append(f"{name}: {before:.1f} -> {after:.1f} bytes/registration")
+    return regressions
+
+
+def _previous(path: str, kind: str) -> Dict[str, Dict[str, float]]:
+    with open(path) as previous:
+        loaded = json.load(previous)
+    if kind not in loaded:
+        # Timings and memory are measured by separate runs, and only compare against their own kind.
+        label, mode = ("memory", "with") if kind == "memory" else ("timing", "without")
+        raise SystemExit(f"{path} has no {label} results, compare against the output of a run {mode} --memory")
+    return cast(Dict[str, Dict[str, float]], loaded[kind])
+
+
+def _report(regressions: List[str]) -> int:
+    for regression in regressions:
+        print(f"REGRESSION {regression}")
+    return 1 if regressions else 0
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--output", help="Write the results as JSON to this path")
+    parser.add_argument("--compare", help="Results JSON of a previous run to check for regressions against")
+    parser.add_argument("--threshold", type=float, default=0.2,
+                        help="Allowed slowdown, or growth in memory mode, ratio in compare mode")
+    parser.add_argument("--repeat", type=int, default=5, help="Repetitions of every case, the best one is kept")
+    parser.add_argument("--filter", default="", help="Only run cases whose name contains this string")
+    parser.add_argument("--memory", action="store_true", help="Measure the memory of registrations instead")
+    options = parser.parse_args(argv)
+    # Loaded first, so a baseline of the other kind fails before anything is measured.
+    previous = _previous(options.compare, "memory" if options.memory else "results") if options.compare else None
+
+    if options.memory:
+        _memory_cases()
+        memory = run_memory([memory_case for memory_case in _MEMORY_CASES if options.filter in memory_case.name])
+        if options.output:
+            with open(options.output, "w") as output:
+                json.dump({"python": platform.python_version(), "memory": memory}, output, indent=2)
+        if previous is not None:
+            return _report(find_memory_regressions(memory, previous, options.threshold))
+        return 0
+
+    _registration_cases()
+    _dispatch_cases()
+    _validation_cases()
+
+    print(f"{'case':<28} {'mockitup':>14} {'baseline':>14} {'ratio':>9}")
+    results = run([bench_case for bench_case in _CASES if options.filter in bench_case.name], options.repeat)
+
+    if options.output:
+        with open(options.output, "w") as output:
+            json.dump({
+                "python": platform.python_version(),
+                "results": results,
+            }, output, indent=2)
+
+    if previous is not None:
+        return _report(find_regressions(results, previous, options.threshold))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
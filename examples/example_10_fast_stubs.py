@@ -0,0 +1,31 @@
+from unittest.mock import call
+
+import pytest
+from mockitup import ANY_ARG, AsyncFastStub, FastStub, allow, expectation_suite
+
+
+def stubs_are_configured_like_mocks_example():
+    stub = FastStub()
+    allow(stub).get(ANY_ARG).returns("value")
+
+    with expectation_suite() as es:
+        es.expect(stub).put(1).returns(True)
+
+        assert stub.get(1) == "value"
+        assert stub.put(1)
+
+
+def recording_calls_is_opt_in_example():
+    stub = FastStub(record_calls=True)
+    allow(stub).get(ANY_ARG).returns("value")
+    stub.get(1)
+
+    assert stub.get.call_args_list == [call(1)]
+
+
+@pytest.mark.anyio
+async def async_stubs_example():
+    stub = AsyncFastStub()
+    allow(stub).fetch().returns("fetched")
+
+    assert await stub.fetch() == "fetched"
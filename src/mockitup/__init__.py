@@ -1,3 +1,11 @@
 from . import composer
 from .arguments_matcher import ANY_ARG, ANY_ARGS
-from .composer import expectation_suite, allow
+from .composer import expectation_suite, allow, returns_table, scope
+from .history import CallHistory
+from .stubs import AsyncFastStub, FastStub
+from .instrumentation import stats
+from .recording import record, replay
+from .templates import MockTemplate
+from .specificity import dispatch_by_specificity
+from .adaptive import dispatch_adaptively
+from .stubmode import dispatch_as_stub, stub_mode
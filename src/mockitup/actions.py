@@ -1,8 +1,17 @@
+import asyncio
+import functools
+import itertools
+import threading
 import unittest.mock
-from typing import Any, Iterable, TypeVar
+from typing import Any, AsyncIterable, AsyncIterator, Callable, Dict, Generator, Hashable, Iterable, Iterator, List, \
+    Mapping, Optional, Tuple, TypeVar, Union, cast
 
 from typing_extensions import Protocol
 
+from .arguments_matcher import call_key
+from .pending import DeferredResult, PendingCall, PendingCalls, _trio
+from .pickling import LocksArentPickled, Sentinel
+
 _MockType = TypeVar("_MockType", bound=unittest.mock.Mock)
 
 
@@ -12,24 +21,47 @@ class BaseActionResult(Protocol):
         ...
 
 
-class ActionReturnsMultipleValues:
+class ArgumentsActionResult(BaseActionResult, Protocol):
+    """
+    An action whose result depends on the call's arguments, when its `takes_arguments` is true.
+    """
+    takes_arguments: bool
+
+    def provide_result_for(self, args: Tuple[Any, ...], kwargs: Mapping[str, Any]) -> Any:
+        ...
+
+
+class ActionReturnsMultipleValues(LocksArentPickled):
+    __slots__ = ("__all_values", "__return_none", "__values", "__last_value", "__lock")
 
     def __init__(self, *values: Any):
+        self.__all_values = values
         self.__return_none = len(values) == 0
         self.__values = iter(values)
         self.__last_value = None
+        self.__lock = threading.Lock()
 
     def provide_result(self) -> Any:
         if self.__return_none:
             return None
-        try:
-            self.__last_value = next(self.__values)
-        except StopIteration:
-            pass
-        return self.__last_value
+        # Advancing and remembering the last value must happen together, or concurrent callers could skip
+        # values or get each other's.
+        with self.__lock:
+            try:
+                self.__last_value = next(self.__values)
+            except StopIteration:
+                pass
+            return self.__last_value
+
+    def fresh(self) -> "ActionReturnsMultipleValues":
+        """
+        The same action, starting over from the first value.
+        """
+        return ActionReturnsMultipleValues(*self.__all_values)
 
 
 class ActionReturnsSingleValue:
+    __slots__ = ("__value", )
 
     def __init__(self, value: Any):
         self.__value = value
@@ -41,7 +73,141 @@ class ActionReturnsSingleValue:
         return bool(self.__value == o)
 
 
+class ActionReturnsLazily:
+    """
+    Builds the value on every call.
+    """
+    __slots__ = ("__factory", )
+
+    def __init__(self, factory: Callable[[], Any]):
+        self.__factory = factory
+
+    def provide_result(self) -> Any:
+        return self.__factory()
+
+
+_NOT_BUILT = Sentinel("_NOT_BUILT", __name__)
+
+
+class ActionReturnsCached(LocksArentPickled):
+    """
+    Builds the value on the first call, and returns it from then on.
+
+    With `per_arguments=True` the factory is called with the call's arguments, and a value is cached for every
+    distinct set of them. Calls with unhashable arguments build their value every time.
+    """
+    __slots__ = ("__factory", "takes_arguments", "__value", "__values", "__lock")
+
+    def __init__(self, factory: Callable[..., Any], per_arguments: bool = False):
+        self.__factory = factory
+        self.takes_arguments = per_arguments
+        self.__value: Any = _NOT_BUILT
+        self.__values: Dict[Hashable, Any] = {}
+        self.__lock = threading.Lock()
+
+    def provide_result(self) -> Any:
+        if self.__value is _NOT_BUILT:
+            # Concurrent first calls still build the value only once.
+            with self.__lock:
+                if self.__value is _NOT_BUILT:
+                    self.__value = self.__factory()
+        return self.__value
+
+    def provide_result_for(self, args: Tuple[Any, ...], kwargs: Mapping[str, Any]) -> Any:
+        try:
+            key = call_key(args, kwargs)
+            value = self.__values.get(key, _NOT_BUILT)
+        except TypeError:
+            return self.__factory(*args, **kwargs)
+
+        if value is _NOT_BUILT:
+            with self.__lock:
+                value = self.__values.get(key, _NOT_BUILT)
+                if value is _NOT_BUILT:
+                    value = self.__values[key] = self.__factory(*args, **kwargs)
+        return value
+
+    def fresh(self) -> "ActionReturnsCached":
+        """
+        The same action, with nothing cached.
+        """
+        return ActionReturnsCached(self.__factory, self.takes_arguments)
+
+
+class ActionReturnsPending:
+    """
+    Gives every call a result to await, which stays pending until it's settled through `calls`.
+    """
+    __slots__ = ("calls", )
+    takes_arguments = True
+
+    def __init__(self, calls: PendingCalls):
+        self.calls = calls
+
+    def provide_result(self) -> PendingCall:
+        return self.calls._add((), {})
+
+    def provide_result_for(self, args: Tuple[Any, ...], kwargs: Mapping[str, Any]) -> PendingCall:
+        return self.calls._add(args, kwargs)
+
+    def for_mock(self, mock: Any) -> "ActionReturnsPending":
+        """
+        The same action, queuing the calls of `mock` apart, in `calls.of(mock)`.
+        """
+        return ActionReturnsPending(self.calls._for_mock(mock))
+
+
+class ActionAfter:
+    """
+    Delays the result of another action by `latency` seconds, or by what `latency` draws on every call.
+    The call gives a result to await, which sleeps on the running event loop, so a virtual clock can skip the wait.
+    """
+    __slots__ = ("__action", "__latency", "takes_arguments")
+
+    def __init__(self, action: BaseActionResult, latency: Union[float, Callable[[], float]]):
+        self.__action = action
+        self.__latency = latency
+        self.takes_arguments = getattr(action, "takes_arguments", False)
+
+    def provide_result(self) -> "_DelayedResult":
+        return _DelayedResult(self.__delay(), self.__action.provide_result)
+
+    def provide_result_for(self, args: Tuple[Any, ...], kwargs: Mapping[str, Any]) -> "_DelayedResult":
+        action = cast(ArgumentsActionResult, self.__action)
+        return _DelayedResult(self.__delay(), functools.partial(action.provide_result_for, args, kwargs))
+
+    def __delay(self) -> float:
+        latency = self.__latency
+        # Drawn when the call is made, so seeded distributions give the same delays in the same call order.
+        return latency() if callable(latency) else latency
+
+
+class _DelayedResult(DeferredResult):
+    __slots__ = ("__seconds", "__provide")
+
+    def __init__(self, seconds: float, provide: Callable[[], Any]):
+        self.__seconds = seconds
+        self.__provide = provide
+
+    def __await__(self) -> Generator[Any, None, Any]:
+        yield from _sleep(self.__seconds).__await__()
+        result = self.__provide()
+        if isinstance(result, DeferredResult):
+            result = yield from result.__await__()
+        return result
+
+
+async def _sleep(seconds: float) -> None:
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        await _trio().sleep(seconds)
+    else:
+        await asyncio.sleep(seconds)
+
+
 class ActionRaises:
+    __slots__ = ("__value", )
 
     def __init__(self, value: Any):
         self.__value = value
@@ -51,9 +217,72 @@ class ActionRaises:
 
 
 class ActionYieldsFrom:
+    __slots__ = ("__value", )
 
     def __init__(self, value: Iterable[Any]):
         self.__value = value
 
     def provide_result(self) -> Any:
         yield from self.__value
+
+
+class ActionYieldsStream:
+    """
+    Yields from a fresh iterable built by `factory` on every call, so nothing is built before it's iterated.
+    With `chunk_size`, the items are yielded in lists of up to `chunk_size` items.
+    """
+    __slots__ = ("__factory", "__chunk_size")
+
+    def __init__(self, factory: Callable[[], Iterable[Any]], chunk_size: Optional[int] = None):
+        if chunk_size is not None and chunk_size < 1:
+            raise ValueError("Chunks must hold at least one item")
+        self.__factory = factory
+        self.__chunk_size = chunk_size
+
+    def provide_result(self) -> Iterator[Any]:
+        items = iter(self.__factory())
+        if self.__chunk_size is None:
+            yield from items
+            return
+        while True:
+            chunk = list(itertools.islice(items, self.__chunk_size))
+            if not chunk:
+                return
+            yield chunk
+
+
+class ActionYieldsAsyncStream:
+    """
+    Like `ActionYieldsStream`, but gives an async iterator. `factory` may build either an iterable or an async one.
+    """
+    __slots__ = ("__factory", "__chunk_size")
+
+    def __init__(self,
+                 factory: Callable[[], Union[Iterable[Any], AsyncIterable[Any]]],
+                 chunk_size: Optional[int] = None):
+        if chunk_size is not None and chunk_size < 1:
+            raise ValueError("Chunks must hold at least one item")
+        self.__factory = factory
+        self.__chunk_size = chunk_size
+
+    async def provide_result(self) -> AsyncIterator[Any]:
+        chunk: List[Any] = []
+        async for item in _async_items(self.__factory()):
+            if self.__chunk_size is None:
+                yield item
+                continue
+            chunk.append(item)
+            if len(chunk) == self.__chunk_size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+
+async def _async_items(items: Union[Iterable[Any], AsyncIterable[Any]]) -> AsyncIterator[Any]:
+    if isinstance(items, AsyncIterable):
+        async for item in items:
+            yield item
+    else:
+        for item in items:
+            yield item
@@ -0,0 +1,171 @@
+"""
+Dispatching that learns which registrations are called the most.
+
+Registrations that can't be looked up by hash are normally tried one by one, in registration order. Adaptive
+dispatch tries the registrations that are disjoint from all the ones registered before them first, hottest first.
+As no earlier registration could match the calls they match, trying them first can't change where a call goes.
+
+Registrations are proven disjoint when, at some argument, both hold different exact values, or both are `same_as`
+different objects. An exact value a matcher rejects proves nothing, as calls with other values equal to it may still
+match the matcher. Mocks whose registrations are known not to overlap can declare it with `disjoint=True` instead.
+"""
+import bisect
+import threading
+from typing import Any, Dict, FrozenSet, List, Optional, Tuple
+
+from .arguments_matcher import _EQUAL, _EQUAL_REVERSED, _SAME, _SKIP, ArgumentsMatcher, ArgumentsMatchResult, _Check
+from .composer import MockItUpSideEffect, _MockType, _use_side_effect_class
+
+# Hits between two reorderings of the disjoint registrations.
+_REORDER_EVERY = 64
+
+_Shape = Tuple[int, FrozenSet[str]]
+
+
+def _exact_value(check: _Check) -> Tuple[bool, Any]:
+    kind, value = check
+    return kind is _EQUAL or kind is _EQUAL_REVERSED, value
+
+
+def _checks_disjoint(first: _Check, second: _Check) -> bool:
+    if first[0] is _SKIP or second[0] is _SKIP:
+        return False
+    if first[0] is _SAME and second[0] is _SAME:
+        return first[1] is not second[1]
+
+    first_exact, first_value = _exact_value(first)
+    second_exact, second_value = _exact_value(second)
+    if not (first_exact and second_exact):
+        return False
+    try:
+        return not first_value == second_value
+    except Exception:
+        return False
+
+
+def _disjoint(first: ArgumentsMatcher, second: ArgumentsMatcher) -> bool:
+    """
+    Whether no call can match both arguments. Arguments of different shapes never get here.
+    """
+    for first_check, second_check in zip(first._positional_checks, second._positional_checks):
+        if _checks_disjoint(first_check, second_check):
+            return True
+    second_named = dict(second._named_checks)
+    for name, first_check in first._named_checks:
+        if _checks_disjoint(first_check, second_named[name]):
+            return True
+    return False
+
+
+def _shape(arguments: ArgumentsMatcher) -> _Shape:
+    return len(arguments._positional_checks), frozenset(name for name, _ in arguments._named_checks)
+
+
+class AdaptiveStats:
+    """
+    How far calls had to scan to find their registration, counting every registration they were matched against.
+    Counters aren't synchronized, so under concurrent calls they're approximate.
+    """
+
+    def __init__(self) -> None:
+        self.calls = 0
+        self.total_scan_depth = 0
+        self.reorders = 0
+        self.disjoint_registrations = 0
+
+    @property
+    def average_scan_depth(self) -> float:
+        return self.total_scan_depth / self.calls if self.calls else 0.0
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "calls": self.calls,
+            "average_scan_depth": self.average_scan_depth,
+            "reorders": self.reorders,
+            "disjoint_registrations": self.disjoint_registrations,
+        }
+
+
+class AdaptiveSideEffect(MockItUpSideEffect):
+    """
+    Tries the registrations disjoint from all earlier ones first, moving the most hit ones forward.
+    """
+    assume_disjoint = False
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        self.stats = AdaptiveStats()
+        # Ordered by hits, and replaced rather than changed in place, as calls read it without locking.
+        self.__disjoint: List[int] = []
+        self.__hits: Dict[int, int] = {}
+        self.__hits_since_reorder = 0
+        self.__reorder_lock = threading.Lock()
+        # Registrations left to the usual dispatch, in order, to measure how far it scans.
+        self.__ordered: List[int] = []
+        self.__by_shape: Dict[_Shape, List[ArgumentsMatcher]] = {}
+        self.__any_args_registered = False
+
+    def _index(self, position: int, arguments: ArgumentsMatcher) -> None:
+        shape = _shape(arguments)
+        earlier = self.__by_shape.setdefault(shape, [])
+        is_disjoint = arguments.index_key is None and not arguments._any_args and (
+            self.assume_disjoint or
+            (not self.__any_args_registered and all(_disjoint(arguments, other) for other in earlier)))
+        earlier.append(arguments)
+        self.__any_args_registered = self.__any_args_registered or arguments._any_args
+
+        if is_disjoint:
+            self.__hits[position] = 0
+            self.__disjoint = self.__disjoint + [position]
+            self.stats.disjoint_registrations += 1
+            return
+
+        if arguments.index_key is None:
+            self.__ordered.append(position)
+        super()._index(position, arguments)
+
+    def _find(self, args: Tuple[Any], kwargs: Dict[str, Any]) -> Optional[Tuple[int, ArgumentsMatchResult]]:
+        stats = self.stats
+        stats.calls += 1
+        disjoint = self.__disjoint
+        for depth, position in enumerate(disjoint, 1):
+            match_results = self._arguments_at(position).matches(args, kwargs)
+            if match_results:
+                stats.total_scan_depth += depth
+                self.__hit(position)
+                return position, match_results
+
+        found = super()._find(args, kwargs)
+        if found is not None:
+            # The ordered registrations before the found one, and the found one itself.
+            stats.total_scan_depth += len(disjoint) + bisect.bisect_left(self.__ordered, found[0]) + 1
+        return found
+
+    def __hit(self, position: int) -> None:
+        self.__hits[position] += 1
+        self.__hits_since_reorder += 1
+        if self.__hits_since_reorder < _REORDER_EVERY:
+            return
+
+        with self.__reorder_lock:
+            if self.__hits_since_reorder < _REORDER_EVERY:
+                return
+            self.__hits_since_reorder = 0
+            hits = self.__hits
+            self.__disjoint = sorted(self.__disjoint, key=lambda hot: -hits[hot])
+            self.stats.reorders += 1
+
+
+class _DeclaredDisjointSideEffect(AdaptiveSideEffect):
+    assume_disjoint = True
+
+
+def dispatch_adaptively(mock: _MockType, disjoint: bool = False) -> _MockType:
+    """
+    Makes `mock` and its children try their hottest registrations first, where that can't change where calls go.
+    With `disjoint=True`, no two registrations of the mock may match the same call, so all of them can be reordered.
+    Each mock's scan statistics are at `mock.side_effect.stats`, or at `mock.side_effect.__self__.stats` for async
+    mocks.
+    """
+    _use_side_effect_class(mock, _DeclaredDisjointSideEffect if disjoint else AdaptiveSideEffect)
+    return mock
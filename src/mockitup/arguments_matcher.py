@@ -1,73 +1,211 @@
 from collections import namedtuple
-from typing import Any, Mapping, Tuple
+from enum import Enum
+from typing import Any, FrozenSet, Hashable, Mapping, Optional, Tuple
 
-from hamcrest import match_equality
+from hamcrest.core.core.isequal import IsEqual
+from hamcrest.core.core.isinstanceof import IsInstanceOf
+from hamcrest.core.core.issame import IsSame
 from hamcrest.core.matcher import Matcher
 
-ANY_ARG = object()
-ANY_ARGS = object()
+from .pickling import Sentinel
+
+ANY_ARG = Sentinel("ANY_ARG", __name__)
+ANY_ARGS = Sentinel("ANY_ARGS", __name__)
+
+_NO_KWARGS: FrozenSet[Tuple[str, Any]] = frozenset()
+
+
+def call_key(args: Tuple[Any, ...], kwargs: Mapping[str, Any]) -> Hashable:
+    """
+    Freezes call arguments into a key usable for hash lookups.
+
+    Raises `TypeError` when any of the arguments isn't hashable.
+    """
+    return args, frozenset(kwargs.items()) if kwargs else _NO_KWARGS
+
+
+# Kinds of checks a registered value is compiled into.
+_SKIP = 0
+_EQUAL = 1
+_EQUAL_REVERSED = 2
+_INSTANCE_OF = 3
+_SAME = 4
+_MATCHER = 5
+
+_Check = Tuple[int, Any]
+
+
+def _compile_check(registered_value: Any) -> _Check:
+    if registered_value is ANY_ARG:
+        return _SKIP, None
+
+    if not isinstance(registered_value, Matcher):
+        return _EQUAL, registered_value
+
+    # Common matchers are lowered to the very comparison they'd make.
+    if type(registered_value) is IsEqual:
+        return _EQUAL_REVERSED, registered_value.object
+    if type(registered_value) is IsInstanceOf:
+        return _INSTANCE_OF, registered_value.expected_type
+    if type(registered_value) is IsSame:
+        return _SAME, registered_value.object
+    return _MATCHER, registered_value
+
+
+def _run_check(check: _Check, provided_value: Any) -> bool:
+    kind, registered_value = check
+    if kind is _EQUAL:
+        return bool(registered_value == provided_value)
+    if kind is _SKIP:
+        return True
+    if kind is _EQUAL_REVERSED:
+        return bool(provided_value == registered_value)
+    if kind is _INSTANCE_OF:
+        return isinstance(provided_value, registered_value)
+    if kind is _SAME:
+        return provided_value is registered_value
+    return bool(registered_value.matches(provided_value))
 
 
 class ArgumentsMatcher(namedtuple("StrictArgs", ["args", "kwargs"])):
+    """
+    Registered call arguments.
+
+    The arguments are compiled once, when registered, into per-position checks, so matching a call
+    doesn't have to inspect the registered values again.
+    """
+    _registered_len: int
+    _any_args: bool
+    _positional_checks: Tuple[_Check, ...]
+    _named_checks: Tuple[Tuple[str, _Check], ...]
+    _index_key: Optional[Hashable]
+
+    def __init__(self, args: Tuple[Any, ...], kwargs: Mapping[str, Any]) -> None:
+        self._registered_len = len(args) + len(kwargs)
+        self._any_args = bool(args) and args[0] is ANY_ARGS
+        self._positional_checks = tuple(_compile_check(value) for value in args)
+        self._named_checks = tuple((key, _compile_check(value)) for key, value in kwargs.items())
+        self._index_key = self.__compute_index_key()
+
+    @property
+    def index_key(self) -> Optional[Hashable]:
+        """
+        The hash key of these arguments, or `None` if they can't be matched by a lookup.
+
+        Only registrations made of hashable, exact values have a key. Wildcards and hamcrest
+        matchers have to be matched one by one.
+        """
+        return self._index_key
+
+    def __compute_index_key(self) -> Optional[Hashable]:
+        for kind, _ in (*self._positional_checks, *(check for _, check in self._named_checks)):
+            if kind is not _EQUAL:
+                return None
+        if self._any_args:
+            return None
+        try:
+            key = call_key(tuple(self.args), self.kwargs)
+            hash(key)
+        except TypeError:
+            return None
+        return key
 
     def matches(self, args: Tuple[Any], kwargs: Mapping[str, Any]) -> "ArgumentsMatchResult":
-        matched, explanation = self._matches(args, kwargs)
-        return ArgumentsMatchResult(matched, explanation)
+        outcome, position = self._matches(args, kwargs)
+        return ArgumentsMatchResult(outcome, position, self, args, kwargs)
 
-    def _matches(self, args: Tuple[Any], kwargs: Mapping[str, Any]) -> Tuple[bool, str]:
-        registered_len = len(self.args) + len(self.kwargs)
+    def _matches(self, args: Tuple[Any], kwargs: Mapping[str, Any]) -> Tuple["MatchOutcome", Any]:
         provided_len = len(args) + len(kwargs)
-        if registered_len == provided_len == 0:
-            return True, "Arguments matched"
+        if self._registered_len == provided_len == 0:
+            return MatchOutcome.MATCHED, None
 
         # Lengths don't have to match in case of `ANY_ARGS` wildcard.
-        if self.args[0] is ANY_ARGS:
-            return True, "Matched wildcard 'ANY_ARGS'"
+        if self._any_args:
+            return MatchOutcome.MATCHED_ANY_ARGS, None
 
-        if registered_len != provided_len:
-            return False, "Length of provided positional arguments isn't the same as the registered"
+        if self._registered_len != provided_len:
+            return MatchOutcome.LENGTH_MISMATCH, None
 
-        for index, (registered, provided) in enumerate(zip(self.args, args)):
-            matched = self.__match_values(registered, provided)
-            if not matched:
-                return False, (f"Positional arguments at index {index} didn't match "
-                               f"(registered: '{registered}', provided: '{provided}')")
+        for index, (check, provided) in enumerate(zip(self._positional_checks, args)):
+            if not _run_check(check, provided):
+                return MatchOutcome.POSITIONAL_MISMATCH, index
 
         # Should have same keys
-        if set(self.kwargs) != set(kwargs):
-            return False, "Length of provided named arguments isn't the same as the registered"
+        if kwargs.keys() != self.kwargs.keys():
+            return MatchOutcome.NAMES_MISMATCH, None
 
-        for key in self.kwargs:
-            registered = self.kwargs[key]
-            provided = kwargs[key]
-            if not self.__match_values(registered, provided):
-                return False, (f"Named arguments at key '{key}' didn't match "
-                               f"(registered: '{registered}', provided: '{provided}')")
-        return True, "Arguments matched"
+        for key, check in self._named_checks:
+            if not _run_check(check, kwargs[key]):
+                return MatchOutcome.NAMED_MISMATCH, key
+        return MatchOutcome.MATCHED, None
 
-    @staticmethod
-    def __match_values(registered_value: Any, provided_value: Any) -> bool:
-        if registered_value is ANY_ARG:
-            return True
 
-        if isinstance(registered_value, Matcher):
-            registered_value = match_equality(registered_value)
+class MatchOutcome(Enum):
+    MATCHED = "Arguments matched"
+    MATCHED_ANY_ARGS = "Matched wildcard 'ANY_ARGS'"
+    LENGTH_MISMATCH = "Length of provided positional arguments isn't the same as the registered"
+    POSITIONAL_MISMATCH = ("Positional arguments at index {position} didn't match "
+                           "(registered: '{registered}', provided: '{provided}')")
+    NAMES_MISMATCH = "Length of provided named arguments isn't the same as the registered"
+    NAMED_MISMATCH = ("Named arguments at key '{position}' didn't match "
+                      "(registered: '{registered}', provided: '{provided}')")
 
-        return bool(registered_value == provided_value)
+    @property
+    def succeeded(self) -> bool:
+        return self in (MatchOutcome.MATCHED, MatchOutcome.MATCHED_ANY_ARGS)
 
 
 class ArgumentsMatchResult:
-
-    def __init__(self, succeeded: bool, explanation: str):
-        self.__succeeded = succeeded
-        self.__explanation = explanation
+    """
+    The outcome of matching call arguments against registered ones.
+
+    Only the outcome and the position of the mismatch are kept, the explanation is rendered when it's
+    read, so failed matches cost nothing until they're reported.
+    """
+    __slots__ = ("__outcome", "__position", "__arguments", "__args", "__kwargs")
+
+    def __init__(
+        self,
+        outcome: MatchOutcome,
+        position: Any,
+        arguments: ArgumentsMatcher,
+        args: Tuple[Any],
+        kwargs: Mapping[str, Any],
+    ):
+        self.__outcome = outcome
+        self.__position = position
+        self.__arguments = arguments
+        self.__args = args
+        self.__kwargs = kwargs
 
     def __bool__(self) -> bool:
-        return self.__succeeded
+        return self.__outcome.succeeded
+
+    @property
+    def outcome(self) -> MatchOutcome:
+        return self.__outcome
+
+    @property
+    def position(self) -> Any:
+        return self.__position
 
     @property
     def explanation(self) -> str:
-        return self.__explanation
+        template: str = self.__outcome.value
+        registered: Any
+        provided: Any
+        if self.__outcome is MatchOutcome.POSITIONAL_MISMATCH:
+            registered, provided = self.__arguments.args, self.__args
+        elif self.__outcome is MatchOutcome.NAMED_MISMATCH:
+            registered, provided = self.__arguments.kwargs, self.__kwargs
+        else:
+            return template
+
+        return template.format(
+            position=self.__position,
+            registered=registered[self.__position],
+            provided=provided[self.__position],
+        )
 
     def raise_for_failure(self) -> None:
         if not self:
@@ -0,0 +1,55 @@
+from typing import Optional
+
+
+class Cardinality:
+    """
+    How many times an expectation should be fulfilled.
+    """
+
+    def __init__(self, minimum: int, maximum: Optional[int]) -> None:
+        if minimum < 0 or (maximum is not None and maximum < minimum):
+            raise ValueError(f"Invalid call count range: {minimum} to {maximum}")
+        self.minimum = minimum
+        self.maximum = maximum
+
+    @classmethod
+    def exactly(cls, times: int) -> "Cardinality":
+        return cls(times, times)
+
+    @classmethod
+    def at_least(cls, times: int) -> "Cardinality":
+        return cls(times, None)
+
+    @classmethod
+    def at_most(cls, times: int) -> "Cardinality":
+        return cls(0, times)
+
+    @classmethod
+    def never(cls) -> "Cardinality":
+        return cls(0, 0)
+
+    def is_satisfied_by(self, calls: int) -> bool:
+        return self.minimum <= calls and not self.is_exceeded_by(calls)
+
+    def is_exceeded_by(self, calls: int) -> bool:
+        return self.maximum is not None and calls > self.maximum
+
+    def describe(self) -> str:
+        if self.maximum == 0:
+            return "never"
+        if self.minimum == self.maximum:
+            return f"exactly {_times(self.minimum)}"
+        if self.maximum is None:
+            return f"at least {_times(self.minimum)}"
+        if self.minimum == 0:
+            return f"at most {_times(self.maximum)}"
+        return f"between {self.minimum} and {_times(self.maximum)}"
+
+
+def _times(count: int) -> str:
+    if count == 1:
+        return "once"
+    return f"{count} times"
+
+
+AT_LEAST_ONCE = Cardinality.at_least(1)
@@ -0,0 +1,83 @@
+"""
+Virtual time for asyncio event loops, so latencies and timeouts take no real time.
+
+A `VirtualClock` installed on a loop replaces the loop's clock. Timers, like the latencies of `after()` registrations,
+`asyncio.sleep` and `asyncio.wait_for` timeouts, fire when the test advances the clock. With `autojump`, whenever the
+loop has nothing to do but wait for its next timer, the clock jumps to it instead. Timers due at the same virtual time
+fire in the order the loop always fires them in, so runs are reproducible.
+
+On trio, use `trio.testing.MockClock(autojump_threshold=0)` instead, which does the same for trio's own timers.
+"""
+import asyncio
+from types import TracebackType
+from typing import Any, Callable, List, Optional, Type
+
+
+class VirtualClock:
+    """
+    A clock for an asyncio loop that only moves when it's advanced, or jumps to the next timer with `autojump`.
+
+    Install it for a whole test: the loop's timers are scheduled in virtual time while it's installed.
+    Only event loops built on selectors, the default ones, are supported.
+    """
+
+    def __init__(self, autojump: bool = True) -> None:
+        self.autojump = autojump
+        self.__now = 0.0
+        self.__loop: Optional[asyncio.AbstractEventLoop] = None
+        self.__select: Optional[Callable[..., List[Any]]] = None
+
+    def time(self) -> float:
+        return self.__now
+
+    def advance(self, seconds: float) -> None:
+        """
+        Moves the clock forward. Timers that got due fire the next time the loop runs, like on `asyncio.sleep(0)`.
+        """
+        if seconds < 0:
+            raise ValueError("Virtual time can't go backwards")
+        self.__now += seconds
+
+    def install(self, loop: Optional[asyncio.AbstractEventLoop] = None) -> None:
+        """
+        Makes `loop`, by default the running one, use this clock. Virtual time carries on from the loop's time.
+        """
+        if self.__loop is not None:
+            raise RuntimeError("The clock is already installed")
+        loop = loop or asyncio.get_running_loop()
+        selector = getattr(loop, "_selector", None)
+        if selector is None:
+            raise TypeError(f"Virtual clocks need a selector event loop, not '{type(loop).__name__}'")
+
+        self.__now = loop.time()
+        self.__loop = loop
+        self.__select = selector.select
+        setattr(loop, "time", self.time)
+        setattr(selector, "select", self.__select_jumping)
+
+    def uninstall(self) -> None:
+        if self.__loop is None:
+            return
+        del self.__loop.time
+        del getattr(self.__loop, "_selector").select
+        self.__loop = None
+        self.__select = None
+
+    def __select_jumping(self, timeout: Optional[float] = None) -> List[Any]:
+        select = self.__select
+        assert select is not None
+        # The loop only waits with a timeout when its next timer isn't due yet, and nothing else is ready.
+        if not self.autojump or timeout is None or timeout <= 0:
+            return select(timeout)
+        events = select(0)
+        if not events:
+            self.__now += timeout
+        return events
+
+    def __enter__(self) -> "VirtualClock":
+        self.install()
+        return self
+
+    def __exit__(self, exception_type: Optional[Type[BaseException]], exception_value: Optional[BaseException],
+                 traceback: Optional[TracebackType]) -> None:
+        self.uninstall()
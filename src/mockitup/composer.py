@@ -1,21 +1,57 @@
+import copy
+import functools
+import itertools
+import pickle
+import queue
+import threading
+import types
 import unittest.mock
+import weakref
 from trace import Trace
-from typing import Any, List, Optional, Tuple, Type, TypeVar, cast
+from typing import (TYPE_CHECKING, Any, Callable, Dict, Hashable, Iterable, Iterator, List, Mapping, NoReturn,
+                    Optional, Sequence, Set, Tuple, Type, TypeVar, Union, cast)
 
 from typing_extensions import Protocol
 
-from .actions import BaseActionResult
-from .arguments_matcher import ArgumentsMatcher, ArgumentsMatchResult
+from .actions import ActionReturnsSingleValue, ArgumentsActionResult, BaseActionResult
+from .arguments_matcher import ArgumentsMatcher, ArgumentsMatchResult, call_key
+from .cardinality import AT_LEAST_ONCE, Cardinality
+from .diagnostics import NearestIndex
+from .history import CallHistory, _is_stub, _parent_of
+from .pending import DeferredResult
+from .pickling import LocksArentPickled
 from .proxies import MockResponseProxy, ProxyCallback
+from .signatures import SignatureNormalizer, normalizer_for
 
-_MockType = TypeVar("_MockType", bound=unittest.mock.Mock)
+if TYPE_CHECKING:
+    from .stubs import FastStub
+
+_MockType = TypeVar("_MockType", bound=Union[unittest.mock.Mock, "FastStub"])
+
+
+_TableRows = Iterable[Tuple[ArgumentsMatcher, BaseActionResult]]
+
+
+class TableCallback(Protocol):
+
+    def __call__(self, mock: _MockType, rows: _TableRows) -> None:
+        ...
 
 
 class _MockComposerMembers:
+    __slots__ = ("mock", "proxy_cb", "history", "table_cb")
 
-    def __init__(self, mock: _MockType, proxy_cb: ProxyCallback) -> None:
+    def __init__(
+        self,
+        mock: _MockType,
+        proxy_cb: ProxyCallback,
+        history: Optional[CallHistory],
+        table_cb: Optional[TableCallback],
+    ) -> None:
         self.mock = mock
         self.proxy_cb: ProxyCallback = proxy_cb
+        self.history = history
+        self.table_cb = table_cb
 
 
 def _composer_members(composer: "MockComposer") -> _MockComposerMembers:
@@ -23,15 +59,32 @@ def _composer_members(composer: "MockComposer") -> _MockComposerMembers:
 
 
 class MockComposer:
+    __slots__ = ("_members", )
 
-    def __init__(self, mock: _MockType, proxy_cb: ProxyCallback):
-        super().__setattr__("_members", _MockComposerMembers(mock, proxy_cb))
+    def __init__(
+        self,
+        mock: _MockType,
+        proxy_cb: ProxyCallback,
+        history: Optional[CallHistory] = None,
+        table_cb: Optional[TableCallback] = None,
+    ):
+        super().__setattr__("_members", _MockComposerMembers(mock, proxy_cb, history, table_cb))
 
     def __getattr__(self, name: str) -> "MockComposer":
         members = _composer_members(self)
         mock = members.mock
         result = getattr(mock, name)
-        return MockComposer(result, members.proxy_cb)
+
+        # Child composers of plain `allow(mock)` calls are cached on the mock, so later ones find them too, as long as
+        # the attribute still holds the same mock. Others would keep their suites and policies alive with the mock.
+        composers = _composers_of(mock) if members.proxy_cb is _register_allowance and members.history is None \
+            else None
+        child = composers.get(name) if composers is not None else None
+        if child is None or _composer_members(child).mock is not result:
+            child = MockComposer(result, members.proxy_cb, members.history, members.table_cb)
+            if composers is not None:
+                composers[name] = child
+        return child
 
     def __setattr__(self, name: str, value: Any) -> None:
         members = _composer_members(self)
@@ -48,6 +101,12 @@ class MockComposer:
 
     def __call__(self, *args: Any, **kwargs: Any) -> MockResponseProxy:
         members = _composer_members(self)
+        if members.history is not None:
+            members.history.apply(members.mock)
+
+        normalizer = normalizer_for(members.mock)
+        if normalizer is not None:
+            args, kwargs = normalizer.normalize_registration(args, kwargs)  # type: ignore[assignment]
         return MockResponseProxy(
             members.mock,
             ArgumentsMatcher(args, kwargs),
@@ -55,25 +114,208 @@ class MockComposer:
         )
 
 
+_TableRow = Tuple[Tuple[Any, ...], Mapping[str, Any], Any]
+
+
+def returns_table(composer: MockComposer, table: Union[Mapping[Any, Any], Iterable[_TableRow]]) -> None:
+    """
+    Registers many calls of the mock `composer` composes at once, like `returns_table(allow(mock).get, table)`.
+
+    `table` is either a mapping of a single positional argument to the value returned for it, or an iterable of
+    `(args, kwargs, result)` rows. Rows are consumed lazily, so they may stream from a generator.
+    A free function rather than a composer method, so mocked methods named `returns_table` can still be configured.
+    """
+    members = _composer_members(composer)
+    if members.table_cb is None:
+        raise TypeError("This composer doesn't support registering tables")
+    if members.history is not None:
+        members.history.apply(members.mock)
+
+    rows: Iterable[_TableRow]
+    if isinstance(table, Mapping):
+        rows = (((key, ), {}, result) for key, result in table.items())
+    else:
+        rows = table
+
+    normalizer = normalizer_for(members.mock)
+    members.table_cb(members.mock, (
+        (ArgumentsMatcher(*_normalized_row(normalizer, tuple(args), kwargs)), ActionReturnsSingleValue(result))
+        for args, kwargs, result in rows))
+
+
+def _normalized_row(normalizer: Optional[SignatureNormalizer], args: Tuple[Any, ...],
+                    kwargs: Mapping[str, Any]) -> Tuple[Tuple[Any, ...], Mapping[str, Any]]:
+    if normalizer is None:
+        return args, kwargs
+    return normalizer.normalize_registration(args, kwargs)
+
+
 class ExpectationFulfillmentCursor:
 
     def __init__(self) -> None:
-        self.__cursor = 0
+        self.__cursor = itertools.count()
 
     def next(self) -> int:
-        curr = self.__cursor
-        self.__cursor += 1
-        return curr
+        # Advancing `itertools.count` is atomic, so concurrent fulfillments never share a step.
+        return next(self.__cursor)
+
+    def __getstate__(self) -> Dict[str, Any]:
+        # Only the suite's own process numbers steps, copies in other processes never do.
+        return {}
+
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        self.__cursor = itertools.count()
+
+
+class FulfillmentChannel(Protocol):
+    """
+    Carries fulfillments from other processes back to their suite, like `multiprocessing.Manager().Queue()`.
+    """
+
+    def put(self, item: Any) -> None:
+        ...
+
+    def get_nowait(self) -> Any:
+        ...
+
+
+class _Expectation(LocksArentPickled):
+    """
+    An expected call of a suite.
+
+    Copies unpickled in other processes don't count calls themselves, but send them through the suite's channel.
+    """
+    __slots__ = ("__mock", "__args", "__fulfillment_cursor", "__fulfilled_at_step", "__first_step", "__index",
+                 "__cardinality", "__calls", "__lock", "__on_fulfilled", "__channel", "__remote")
+    __fulfilled_at_step: Optional[int]
+    __first_step: Optional[int]
+
+    def __init__(
+        self,
+        mock: _MockType,
+        args: ArgumentsMatcher,
+        fulfillment_cursor: ExpectationFulfillmentCursor,
+        *,
+        index: int,
+        cardinality: Cardinality,
+        on_fulfilled: Callable[[Any, bool], None],
+        channel: Optional[FulfillmentChannel] = None,
+    ) -> None:
+        self.__mock = mock
+        self.__args = args
+        self.__fulfillment_cursor = fulfillment_cursor
+        self.__fulfilled_at_step = None
+        self.__first_step = None
+        self.__index = index
+        self.__cardinality = cardinality
+        self.__calls = 0
+        self.__lock = threading.Lock()
+        self.__on_fulfilled = on_fulfilled
+        self.__channel = channel
+        self.__remote = False
+
+    def __getstate__(self) -> Dict[str, Any]:
+        if self.__channel is None:
+            raise pickle.PicklingError("Expectations can only be sent to other processes by suites with a channel")
+        state = super().__getstate__()
+        state.update(_Expectation__on_fulfilled=None, _Expectation__remote=True)
+        return state
+
+    def was_met(self) -> bool:
+        return self.__cardinality.is_satisfied_by(self.__calls)
+
+    def exceeded(self) -> bool:
+        return self.__cardinality.is_exceeded_by(self.__calls)
+
+    def reached_minimum(self) -> bool:
+        return self.__calls >= self.__cardinality.minimum
+
+    def assert_met(self) -> None:
+        if not self.was_met():
+            raise self.not_fulfilled()
+
+    def not_fulfilled(self) -> "ExpectationNotFulfilled":
+        return ExpectationNotFulfilled(
+            mock=self.__mock,
+            expected_arguments=self.__args,
+            cardinality=self.__cardinality,
+            calls=self.__calls,
+        )
+
+    def finish(self, match_results: Optional[ArgumentsMatchResult]) -> None:
+        if self.__remote:
+            cast(FulfillmentChannel, self.__channel).put(self.__index)
+            return
+
+        with self.__lock:
+            was_met = self.was_met()
+            self.__calls += 1
+            self.__fulfilled_at_step = self.__fulfillment_cursor.next()
+            if self.__first_step is None:
+                self.__first_step = self.__fulfilled_at_step
+            self.__on_fulfilled(self, was_met)
+
+    @property
+    def fulfillment_step(self) -> Optional[int]:
+        return self.__fulfilled_at_step
+
+    @property
+    def first_step(self) -> Optional[int]:
+        return self.__first_step
+
+    @property
+    def index(self) -> int:
+        return self.__index
+
+    @property
+    def mock_name(self) -> str:
+        return self.__mock._extract_mock_name()
+
+    def describe_arguments(self) -> str:
+        args, kwargs = self.__args
+        return f"(args: '{args}', kwargs: '{kwargs}')"
 
 
 class ExpectationSuite:
-    __expectations: List["__Expectation"]
+    """
+    A group of expected calls, verified when the suite exits.
+
+    The suite keeps a running count of its unmet expectations, so `pending()` costs nothing.
+    With `fail_fast=True` every call is checked as it's made: calling an expectation out of order, or more
+    times than expected, raises from the offending call instead of waiting for the suite to exit.
+
+    With a `channel`, mocks with expectations can be pickled and sent to other processes. Their calls there
+    are sent back through the channel, and counted when the suite collects them, in `pending()` and on exit.
+    Collecting them tells nothing of when they were made, so ordered suites can't have a channel.
+    The suite itself stays in its process, only its mocks are pickled.
+    """
+    __expectations: List["_Expectation"]
     __ordered: bool
 
-    def __init__(self, ordered: bool) -> None:
+    def __init__(
+        self,
+        ordered: bool,
+        history: Optional[CallHistory] = None,
+        fail_fast: bool = False,
+        channel: Optional[FulfillmentChannel] = None,
+    ) -> None:
+        if ordered and channel is not None:
+            raise ValueError("Calls made in other processes can't be ordered, so ordered suites can't have a channel")
         self.__expectations = []
+        self.__channel = channel
         self.__ordered = ordered
+        self.__history = history
+        self.__fail_fast = fail_fast
         self.__expectation_fulfillment_cursor = ExpectationFulfillmentCursor()
+        self.__unmet = 0
+        self.__lock = threading.Lock()
+        self.__highest_fulfilled_index = -1
+        # Every expectation before it was called at least as many times as it expects.
+        self.__lowest_unmet_index = 0
+        self.__failure: Optional["ExpectationNotMet"] = None
+
+    def __getstate__(self) -> NoReturn:
+        raise pickle.PicklingError("Suites can't be pickled, only the mocks and stubs they expect calls of")
 
     def __enter__(self) -> "ExpectationSuite":
         return self
@@ -81,71 +323,163 @@ class ExpectationSuite:
     def __exit__(self, *args: Any, **kwargs: Any) -> None:
         self.__validate_expectations()
 
+    def pending(self) -> int:
+        """
+        The number of expectations that weren't met yet.
+        """
+        self.__collect_remote_fulfillments()
+        return self.__unmet
+
+    def __collect_remote_fulfillments(self) -> None:
+        if self.__channel is None:
+            return
+        while True:
+            try:
+                index = self.__channel.get_nowait()
+            except queue.Empty:
+                return
+            self.__expectations[index].finish(None)
+
     def __validate_expectations(self) -> None:
-        for expectation_index, expectation in enumerate(self.__expectations):
+        self.__collect_remote_fulfillments()
+        if self.__failure is not None:
+            raise self.__failure
+
+        if self.__fail_fast and not self.__unmet:
+            # Call counts and order were already verified call by call.
+            return
+
+        latest_step = -1
+        for expectation in self.__expectations:
             expectation.assert_met()
-            if self.__ordered and expectation_index != expectation.fulfillment_step:
-                raise ExpectationNotMet("Expectations were fulfilled out of order")
+            if self.__ordered and expectation.first_step is not None:
+                # No call of an expectation may come before a call of a previous one.
+                if expectation.first_step < latest_step:
+                    raise ExpectationOutOfOrder("Expectations were fulfilled out of order")
+                latest_step = max(latest_step, cast(int, expectation.fulfillment_step))
 
     def expect(self, mock: _MockType) -> "MockComposer":
-        return MockComposer(mock, self.__register_expectation)
+        return MockComposer(mock, self.__register_expectation, self.__history, self.__register_expectation_table)
 
     def __register_expectation(
         self,
         mock: _MockType,
         arguments: ArgumentsMatcher,
         action: BaseActionResult,
+        cardinality: Optional[Cardinality] = None,
     ) -> None:
-        expectation = self.__Expectation(mock, arguments, self.__expectation_fulfillment_cursor)
+        expectation = self.__new_expectation(mock, arguments, cardinality or AT_LEAST_ONCE)
         register_call_side_effect(mock, arguments, action, report=expectation.finish)
-        self.__expectations.append(expectation)
-
-    class __Expectation:
-        __match_results: Optional[ArgumentsMatchResult]
-        __fulfilled_at_step: Optional[int]
-
-        def __init__(self, mock: _MockType, args: ArgumentsMatcher,
-                     fulfillment_cursor: ExpectationFulfillmentCursor) -> None:
-            self.__mock = mock
-            self.__args = args
-            self.__match_results = None
-            self.__fulfillment_cursor = fulfillment_cursor
-            self.__fulfilled_at_step = None
-
-        def was_met(self) -> bool:
-            return bool(self.__match_results)
-
-        def assert_met(self) -> None:
-            if not self.__match_results:
-                mock_name = self.__mock._extract_mock_name()
-                args, kwargs = self.__args
-                message = (f"Expected mock '{mock_name}' to be called with "
-                           f"(args: '{args}', kwargs: '{kwargs}'), but wasn't")
-                raise ExpectationNotFulfilled(
-                    message,
-                    mock=self.__mock,
-                    expected_arguments=self.__args,
-                )
-
-        def finish(self, match_results: ArgumentsMatchResult) -> None:
-            self.__match_results = match_results
-            self.__fulfilled_at_step = self.__fulfillment_cursor.next()
-
-        @property
-        def fulfillment_step(self) -> Optional[int]:
-            return self.__fulfilled_at_step
 
-
-def allow(mock: _MockType) -> "MockComposer":
-    return MockComposer(mock, _register_allowance)
+    def _track_expectation(self, mock: _MockType, arguments: ArgumentsMatcher,
+                           cardinality: Optional[Cardinality] = None) -> "_ReportMatchResults":
+        """
+        Expects a call that's registered elsewhere, returning what should be reported when it's matched.
+        """
+        return self.__new_expectation(mock, arguments, cardinality or AT_LEAST_ONCE).finish
+
+    def __register_expectation_table(self, mock: _MockType, rows: _TableRows) -> None:
+
+        def registrations() -> Iterator[_Registration]:
+            for arguments, action in rows:
+                yield arguments, action, self.__new_expectation(mock, arguments, AT_LEAST_ONCE).finish
+
+        register_call_side_effects(mock, registrations())
+
+    def __new_expectation(self, mock: _MockType, arguments: ArgumentsMatcher,
+                          cardinality: Cardinality) -> "_Expectation":
+        # Indexed and appended at once, so expectations registered from several threads get distinct indexes.
+        with self.__lock:
+            expectation = _Expectation(
+                mock,
+                arguments,
+                self.__expectation_fulfillment_cursor,
+                index=len(self.__expectations),
+                cardinality=cardinality,
+                on_fulfilled=self.__on_fulfilled,
+                channel=self.__channel,
+            )
+            self.__expectations.append(expectation)
+            if not expectation.was_met():
+                self.__unmet += 1
+        return expectation
+
+    def __on_fulfilled(self, expectation: "_Expectation", was_met: bool) -> None:
+        is_met = expectation.was_met()
+        if is_met != was_met:
+            with self.__lock:
+                self.__unmet += -1 if is_met else 1
+
+        if not self.__fail_fast:
+            return
+
+        if expectation.exceeded():
+            self.__fail(expectation.not_fulfilled())
+
+        if self.__ordered:
+            with self.__lock:
+                while (self.__lowest_unmet_index < len(self.__expectations)
+                       and self.__expectations[self.__lowest_unmet_index].reached_minimum()):
+                    self.__lowest_unmet_index += 1
+                unmet_before = self.__lowest_unmet_index < expectation.index
+                after_later = expectation.index < self.__highest_fulfilled_index
+                self.__highest_fulfilled_index = max(self.__highest_fulfilled_index, expectation.index)
+            if unmet_before:
+                unmet = self.__expectations[self.__lowest_unmet_index]
+                self.__fail(
+                    ExpectationOutOfOrder(f"Expectation of mock '{expectation.mock_name}' with "
+                                          f"{expectation.describe_arguments()} was fulfilled at step "
+                                          f"{expectation.fulfillment_step}, but was expected at step "
+                                          f"{expectation.index}, after the expectation of mock "
+                                          f"'{unmet.mock_name}' with {unmet.describe_arguments()}"))
+            if after_later:
+                self.__fail(
+                    ExpectationOutOfOrder(f"Expectation of mock '{expectation.mock_name}' with "
+                                          f"{expectation.describe_arguments()} was fulfilled at step "
+                                          f"{expectation.fulfillment_step}, after a later expectation"))
+
+    def __fail(self, failure: "ExpectationNotMet") -> NoReturn:
+        # Remembered, so the suite fails even if the code under test swallows the error.
+        if self.__failure is None:
+            self.__failure = failure
+        raise failure
+
+
+def allow(mock: _MockType, history: Optional[CallHistory] = None) -> "MockComposer":
+    return MockComposer(mock, _register_allowance, history, _register_allowance_table)
+
+
+def scope(mock: _MockType) -> "_Scope":
+    """
+    Registrations made on `mock` or its children inside the `with` block take precedence over the ones made before,
+    and are dropped when it's left, leaving the ones made before as they were.
+
+    A free function rather than a composer method, so mocked methods named `scope` can still be configured.
+    """
+    return _Scope(mock)
 
 
 def _register_allowance(
     mock: _MockType,
     arguments: ArgumentsMatcher,
     action: BaseActionResult,
+    cardinality: Optional[Cardinality] = None,
 ) -> None:
-    register_call_side_effect(mock, arguments, action, report=lambda *args: None)
+    if cardinality is not None:
+        raise TypeError("Allowances don't verify call counts, use `expectation_suite().expect()` instead")
+    register_call_side_effect(mock, arguments, action, report=_ignore_report)
+
+
+def _register_allowance_table(mock: _MockType, rows: _TableRows) -> None:
+    register_call_side_effects(mock, ((arguments, action, _ignore_report) for arguments, action in rows))
+
+
+def _ignore_report(match_results: ArgumentsMatchResult) -> None:
+    pass
+
+
+# Only taken when a mock gets its first registration, and by scopes.
+_side_effect_creation_lock = threading.Lock()
 
 
 def register_call_side_effect(
@@ -155,10 +489,96 @@ def register_call_side_effect(
     *,
     report: "_ReportMatchResults",
 ) -> None:
-    if not mock.side_effect:
-        mock.side_effect = MockItUpSideEffect()
+    _registration_target_of(mock).register(arguments, action, report=report)
+
+
+def register_call_side_effects(mock: _MockType, registrations: Iterable["_Registration"]) -> None:
+    _registration_target_of(mock).register_many(registrations)
+
+
+def _registration_target_of(mock: _MockType) -> "MockItUpSideEffect":
+    side_effect = _side_effect_of(mock)
+    if not _active_scopes:
+        return side_effect
+
+    # The innermost scope entered on the mock or its parents gets the registration.
+    scope = None
+    target = mock
+    while target is not None:
+        for candidate in _active_scopes.get(target, ()):
+            if scope is None or candidate.entered_at > scope.entered_at:
+                scope = candidate
+        target = _parent_of(target)
+    return side_effect if scope is None else scope.layer_of(side_effect)
+
+
+def _side_effect_of(mock: _MockType) -> "MockItUpSideEffect":
+    side_effect = _installed_side_effect(mock)
+    if not side_effect:
+        with _side_effect_creation_lock:
+            side_effect = _installed_side_effect(mock)
+            if not side_effect:
+                side_effect = _side_effect_class_for(mock).for_mock(mock)
+                _install_side_effect(mock, side_effect)
+    return cast(MockItUpSideEffect, side_effect)
+
+
+def _installed_side_effect(mock: Any) -> Any:
+    """
+    The side effect of `mock`, unwrapped from the coroutine function async mocks get.
+    """
+    side_effect = mock.side_effect
+    if isinstance(side_effect, types.MethodType) and isinstance(side_effect.__self__, MockItUpSideEffect):
+        return side_effect.__self__
+    return side_effect
+
+
+def _install_side_effect(mock: Any, side_effect: "MockItUpSideEffect") -> None:
+    """
+    Makes `side_effect` dispatch the calls of `mock`. `AsyncMock` only awaits side effects that are coroutine
+    functions, so async mocks get one that awaits deferred results too.
+    """
+    mock.side_effect = side_effect._awaiting if isinstance(mock, unittest.mock.AsyncMockMixin) else side_effect
+
+
+# The scopes entered on every mock, from the outermost to the innermost.
+_active_scopes: "weakref.WeakKeyDictionary[Any, List[_Scope]]" = weakref.WeakKeyDictionary()
+_scope_entries = itertools.count()
+
+
+class _Scope:
+    """
+    While it's entered, registrations on its mock and its children go to layers pushed on their side effects.
+    Leaving it pops the layers, which costs one pop per side effect registered to, however many registrations
+    were made in or before the scope.
+    """
+
+    def __init__(self, mock: Any) -> None:
+        self.__mock = mock
+        self.__layers: Dict[MockItUpSideEffect, MockItUpSideEffect] = {}
+        self.entered_at = -1
+
+    def layer_of(self, side_effect: "MockItUpSideEffect") -> "MockItUpSideEffect":
+        with _side_effect_creation_lock:
+            layer = self.__layers.get(side_effect)
+            if layer is None:
+                layer = self.__layers[side_effect] = side_effect.push_layer()
+        return layer
+
+    def __enter__(self) -> None:
+        with _side_effect_creation_lock:
+            self.entered_at = next(_scope_entries)
+            _active_scopes.setdefault(self.__mock, []).append(self)
 
-    mock.side_effect.register(arguments, action, report=report)
+    def __exit__(self, exception_type: Type[BaseException], exception_value: BaseException, traceback: Trace) -> None:
+        with _side_effect_creation_lock:
+            scopes = _active_scopes[self.__mock]
+            scopes.remove(self)
+            if not scopes:
+                del _active_scopes[self.__mock]
+            for side_effect, layer in self.__layers.items():
+                side_effect.pop_layer(layer)
+            self.__layers.clear()
 
 
 class _ReportMatchResults(Protocol):
@@ -171,8 +591,13 @@ class _ExpectationResult:
     pass
 
 
-def expectation_suite(ordered: bool = False) -> ExpectationSuite:
-    return ExpectationSuite(ordered=ordered)
+def expectation_suite(
+    ordered: bool = False,
+    history: Optional[CallHistory] = None,
+    fail_fast: bool = False,
+    channel: Optional[FulfillmentChannel] = None,
+) -> ExpectationSuite:
+    return ExpectationSuite(ordered=ordered, history=history, fail_fast=fail_fast, channel=channel)
 
 
 class ExpectationNotMet(Exception):
@@ -186,51 +611,404 @@ class ExpectationNotFulfilled(ExpectationNotMet):
         *args: object,
         mock: _MockType,
         expected_arguments: ArgumentsMatcher,
+        cardinality: Cardinality = AT_LEAST_ONCE,
+        calls: int = 0,
     ) -> None:
         Exception.__init__(self, *args)
         self.mock = mock
         self.expected_arguments = expected_arguments
+        self.cardinality = cardinality
+        self.calls = calls
+
+    def __str__(self) -> str:
+        if self.args:
+            return Exception.__str__(self)
+
+        mock_name = self.mock._extract_mock_name()
+        args, kwargs = self.expected_arguments
+        if self.cardinality is AT_LEAST_ONCE:
+            return (f"Expected mock '{mock_name}' to be called with "
+                    f"(args: '{args}', kwargs: '{kwargs}'), but wasn't")
+
+        return (f"Expected mock '{mock_name}' to be called {self.cardinality.describe()} with "
+                f"(args: '{args}', kwargs: '{kwargs}'), but was called {self.calls} time(s)")
 
 
 class ExpectationOutOfOrder(ExpectationNotMet):
     pass
 
 
-class MockItUpSideEffect:
-    __registered: List[Tuple[ArgumentsMatcher, BaseActionResult, _ReportMatchResults]]
+_Registration = Tuple[ArgumentsMatcher, BaseActionResult, "_ReportMatchResults"]
 
-    def __init__(self) -> None:
+
+class MockItUpSideEffect(LocksArentPickled):
+    """
+    Dispatches calls of a mock to the first registration matching their arguments.
+
+    Registrations made only of hashable, exact values are indexed by their arguments, so looking them
+    up doesn't depend on how many registrations there are. Wildcard and matcher registrations are kept
+    in an ordered fallback list, which is only scanned up to the indexed candidate, preserving the
+    first-registered-wins precedence.
+
+    Mocks with a spec normalise the arguments of every call to the spec's signature, the way their registered
+    arguments were normalised.
+
+    Registering is guarded by a lock of its own, while dispatching reads the registrations without locking:
+    a registration is only indexed after it was appended, so readers never see an index to a missing entry.
+
+    Layers pushed on top of the registrations are tried first, the latest first. Popping a layer drops its
+    registrations without touching the ones below.
+    """
+    __registered: List[_Registration]
+    __index: Dict[Hashable, int]
+    __fallback: List[int]
+    _layers: List["MockItUpSideEffect"]
+
+    def __init__(self, normalizer: Optional[SignatureNormalizer] = None) -> None:
         self.__registered = []
+        self.__index = {}
+        self.__fallback = []
+        self.__lock = threading.Lock()
+        self.__normalizer = normalizer
+        self.__shared = False
+        # The positions of the registrations whose actions take the call's arguments.
+        self.__takes_arguments: Set[int] = set()
+        self._layers = []
+        self.__nearest_index: Optional[NearestIndex] = None
+
+    @classmethod
+    def for_mock(cls, mock: _MockType) -> "MockItUpSideEffect":
+        return cls(normalizer_for(mock))
+
+    def share(self, replacements: Optional[Mapping[int, _Registration]] = None) -> "MockItUpSideEffect":
+        """
+        A side effect dispatching like this one, sharing its registrations and index until it's registered to.
+        The registrations at the positions of `replacements` are replaced, which only copies the registrations list.
+
+        Registering to this side effect afterwards isn't supported, as the shared side effects would see it.
+        """
+        shared = copy.copy(self)
+        shared.__lock = threading.Lock()
+        shared.__shared = True
+        shared._layers = []
+        if replacements:
+            shared.__registered = list(self.__registered)
+            for position, registration in replacements.items():
+                shared.__registered[position] = registration
+        return shared
 
     def register(self, arguments: ArgumentsMatcher, action_result: BaseActionResult,
                  report: _ReportMatchResults) -> None:
-        self.__registered.append((arguments, action_result, report))
+        with self.__lock:
+            self.__add((arguments, action_result, report))
+
+    def register_many(self, registrations: Iterable[_Registration]) -> None:
+        """
+        Registers all of the given registrations in a single pass, consuming them lazily.
+        """
+        with self.__lock:
+            for registration in registrations:
+                self.__add(registration)
+
+    def __add(self, registration: _Registration) -> None:
+        if self.__shared:
+            # Copied on write, so the side effects this one shares with never see its registrations.
+            self.__registered = list(self.__registered)
+            self.__index = dict(self.__index)
+            self.__fallback = list(self.__fallback)
+            self.__takes_arguments = set(self.__takes_arguments)
+            self.__shared = False
+
+        position = len(self.__registered)
+        self.__registered.append(registration)
+        self.__nearest_index = None
+
+        if getattr(registration[1], "takes_arguments", False):
+            self.__takes_arguments.add(position)
+        self._index(position, registration[0])
+
+    def registrations(self) -> List[_Registration]:
+        return list(self.__registered)
+
+    def push_layer(self) -> "MockItUpSideEffect":
+        """
+        Adds a layer of registrations taking precedence over all the current ones, and returns it to register to.
+        Calls are matched as they are, so the layer doesn't normalise them again.
+        """
+        layer = MockItUpSideEffect()
+        with self.__lock:
+            # Replaced rather than changed in place, as calls read the layers without locking.
+            self._layers = self._layers + [layer]
+        return layer
+
+    def pop_layer(self, layer: "MockItUpSideEffect") -> None:
+        """
+        Drops `layer` and its registrations.
+        """
+        with self.__lock:
+            self._layers = [pushed for pushed in self._layers if pushed is not layer]
+
+    def _arguments_at(self, position: int) -> ArgumentsMatcher:
+        return self.__registered[position][0]
+
+    def _registration_at(self, position: int) -> _Registration:
+        return self.__registered[position]
+
+    def _index(self, position: int, arguments: ArgumentsMatcher) -> None:
+        """
+        Makes the registration at `position` findable by `_find`. Called while registering, under the lock.
+        """
+        key = arguments.index_key
+        if key is None:
+            self.__fallback.append(position)
+        else:
+            # Later registrations of the same arguments are shadowed by the first one anyway.
+            self.__index.setdefault(key, position)
 
     def __call__(self, *args: Any, **kwargs: Any) -> Any:
-        results = []
-        for registered_args, action_result, report in self.__registered:
-            match_results = registered_args.matches(cast(Tuple[Any], args), kwargs)
+        if self.__normalizer is not None:
+            # Calls that don't fit the signature raise a `TypeError`, like calling the spec would.
+            args, kwargs = self.__normalizer.normalize(args, kwargs)
+
+        if self._layers:
+            for layer in reversed(self._layers):
+                found = layer._find(cast(Tuple[Any], args), kwargs)
+                if found is not None:
+                    return layer._provide(found, args, kwargs)
+
+        found = self._find(cast(Tuple[Any], args), kwargs)
+        if found is None:
+            raise self._unregistered_call(args, kwargs)
+        return self._provide(found, args, kwargs)
+
+    async def _awaiting(self, *args: Any, **kwargs: Any) -> Any:
+        """
+        Dispatches calls of async mocks, awaiting deferred results for their callers like `AsyncFastStub` does.
+        """
+        result = self(*args, **kwargs)
+        if isinstance(result, DeferredResult):
+            return await result
+        return result
 
-            if not match_results:
-                results.append(match_results)
-                continue
+    def _unregistered_call(self, args: Tuple[Any, ...], kwargs: Dict[str, Any]) -> "UnregisteredCall":
+        return UnregisteredCall(diagnose=functools.partial(_diagnose, (*reversed(self._layers), self), args, kwargs))
 
-            report(match_results)
-            return action_result.provide_result()
-        raise UnregisteredCall(results)
+    def _nearest(self, args: Tuple[Any, ...], kwargs: Dict[str, Any],
+                 limit: int) -> Tuple[List[Tuple[int, ArgumentsMatchResult]], int]:
+        """
+        The match results of up to `limit` registrations closest to the call, with how close they were, and the
+        number of registrations.
+        """
+        index = self.__nearest_index
+        if index is None:
+            with self.__lock:
+                index = self.__nearest_index = NearestIndex([arguments for arguments, _, _ in self.__registered])
+
+        nearest = []
+        for position, score in index.nearest(args, kwargs, limit):
+            arguments = self.__registered[position][0]
+            # Explained without `matches`, which instrumentation would count as a dispatch attempt.
+            outcome, mismatch = arguments._matches(cast(Tuple[Any], args), kwargs)
+            nearest.append((score, ArgumentsMatchResult(outcome, mismatch, arguments, cast(Tuple[Any], args), kwargs)))
+        return nearest, index.count
+
+    def _provide(self, found: Tuple[int, ArgumentsMatchResult], args: Tuple[Any, ...], kwargs: Dict[str, Any]) -> Any:
+        """
+        Reports the call to the registration `_find` found, and provides its result.
+        """
+        position, match_results = found
+        _, action_result, report = self.__registered[position]
+        report(match_results)
+        if position in self.__takes_arguments:
+            return cast(ArgumentsActionResult, action_result).provide_result_for(args, kwargs)
+        return action_result.provide_result()
+
+    def _find(self, args: Tuple[Any], kwargs: Dict[str, Any]) -> Optional[Tuple[int, ArgumentsMatchResult]]:
+        """
+        The position of the registration the call dispatches to, with its match results.
+        """
+        try:
+            indexed = self.__index.get(call_key(args, kwargs))
+        except TypeError:
+            # Unhashable arguments may still compare equal to indexed ones, like a set to a frozenset.
+            return self.__scan(args, kwargs)
+
+        for position in self.__fallback:
+            if indexed is not None and position > indexed:
+                break
+            match_results = self.__registered[position][0].matches(args, kwargs)
+            if match_results:
+                return position, match_results
+
+        if indexed is None:
+            return None
+
+        match_results = self.__registered[indexed][0].matches(args, kwargs)
+        if match_results:
+            return indexed, match_results
+
+        # The arguments hash like the registered ones but don't compare equal to them, so the index
+        # can't be trusted for this call.
+        return self.__scan(args, kwargs)
+
+    def __scan(self, args: Tuple[Any], kwargs: Dict[str, Any]) -> Optional[Tuple[int, ArgumentsMatchResult]]:
+        for position, (registered_args, _, _) in enumerate(self.__registered):
+            match_results = registered_args.matches(args, kwargs)
+            if match_results:
+                return position, match_results
+        return None
+
+    def _position_of(self, args: Tuple[Any], kwargs: Dict[str, Any]) -> Optional[int]:
+        """
+        The position of the registration the call dispatches to, found like `_find` does without building any
+        match results, for dispatching that only reports calls of expectations.
+        """
+        try:
+            indexed = self.__index.get(call_key(args, kwargs))
+        except TypeError:
+            return self.__scan_positions(args, kwargs)
+
+        for position in self.__fallback:
+            if indexed is not None and position > indexed:
+                break
+            if self.__registered[position][0]._matches(args, kwargs)[0].succeeded:
+                return position
+
+        if indexed is None or self.__registered[indexed][0]._matches(args, kwargs)[0].succeeded:
+            return indexed
+        return self.__scan_positions(args, kwargs)
+
+    def __scan_positions(self, args: Tuple[Any], kwargs: Dict[str, Any]) -> Optional[int]:
+        for position, (registered_args, _, _) in enumerate(self.__registered):
+            if registered_args._matches(args, kwargs)[0].succeeded:
+                return position
+        return None
+
+
+# The kind of side effect mocks get on their first registration, replaced while instrumentation is enabled.
+_side_effect_class: Type[MockItUpSideEffect] = MockItUpSideEffect
+
+# Kinds of side effects chosen for specific mocks and their children, overriding `_side_effect_class`.
+_side_effect_classes: "weakref.WeakKeyDictionary[Any, Type[MockItUpSideEffect]]" = weakref.WeakKeyDictionary()
+
+
+def _use_side_effect_class(mock: Any, side_effect_class: Type[MockItUpSideEffect]) -> None:
+    """
+    Makes `mock` and its children use side effects of `side_effect_class`, keeping their registrations.
+    """
+    _side_effect_classes[mock] = side_effect_class
+    _convert_side_effects(mock, side_effect_class)
+
+
+def _convert_side_effects(mock: Any, side_effect_class: Type[MockItUpSideEffect]) -> None:
+    installed = _installed_side_effect(mock)
+    if isinstance(installed, MockItUpSideEffect) and type(installed) is not side_effect_class:
+        side_effect = side_effect_class.for_mock(mock)
+        side_effect.register_many(installed.registrations())
+        _install_side_effect(mock, side_effect)
+    for child in _children_of(mock):
+        _convert_side_effects(child, side_effect_class)
+
+
+def _side_effect_class_for(mock: Any) -> Type[MockItUpSideEffect]:
+    target = mock if _side_effect_classes else None
+    while target is not None:
+        side_effect_class = _side_effect_classes.get(target)
+        if side_effect_class is not None:
+            return side_effect_class
+        target = _parent_of(target)
+    return _side_effect_class
+
+
+def _children_of(mock: Any) -> List[Any]:
+    if _is_stub(mock):
+        children = list(mock._stub_children.values())
+    else:
+        children = list(getattr(mock, "__dict__", {}).get("_mock_children", {}).values())
+    return [child for child in children if _is_stub(child) or "_mock_children" in getattr(child, "__dict__", {})]
+
+
+def _composers_of(mock: Any) -> Optional[Dict[str, "MockComposer"]]:
+    # Kept on the mock rather than in a weak map from mocks, which their composers would keep alive.
+    if _is_stub(mock):
+        composers = mock._stub_composers
+        if composers is None:
+            composers = {}
+            object.__setattr__(mock, "_stub_composers", composers)
+        return cast(Dict[str, MockComposer], composers)
+    if not isinstance(mock, unittest.mock.NonCallableMock):
+        # Real objects composed through aren't written to.
+        return None
+    return cast(Dict[str, MockComposer], mock.__dict__.setdefault("_mockitup_composers", {}))
+
+
+def _diagnose(side_effects: Sequence[MockItUpSideEffect], args: Tuple[Any, ...], kwargs: Dict[str, Any],
+              limit: int) -> Tuple[List[ArgumentsMatchResult], int]:
+    nearest: List[Tuple[int, ArgumentsMatchResult]] = []
+    count = 0
+    for side_effect in side_effects:
+        side_effect_nearest, side_effect_count = side_effect._nearest(args, kwargs, limit)
+        nearest.extend(side_effect_nearest)
+        count += side_effect_count
+    # Stable, so ties go to the latest layer, then to the earliest registration.
+    nearest.sort(key=lambda scored: -scored[0])
+    return [match_results for _, match_results in nearest[:limit]], count
+
+
+_Diagnose = Callable[[int], Tuple[List[ArgumentsMatchResult], int]]
 
 
 class UnregisteredCall(Exception):
+    """
+    A call no registration matched.
+
+    Only the registrations closest to the call are explained, up to `limit` of them: the ones with the most arguments
+    matching the call's. They're only looked for when the failure is first reported, the others are just counted.
+    """
+    limit = 5
+
+    def __init__(self, failed_matches: Optional[List[ArgumentsMatchResult]] = None, *,
+                 diagnose: Optional[_Diagnose] = None):
+        Exception.__init__(self)
+        self.__failed_matches = failed_matches
+        self.__diagnose = diagnose
+        self.__registrations = 0 if failed_matches is None else len(failed_matches)
+
+    @property
+    def failed_matches(self) -> List[ArgumentsMatchResult]:
+        """
+        The match results of the registrations closest to the call, the closest first.
+        """
+        if self.__failed_matches is None:
+            if self.__diagnose is None:
+                self.__failed_matches = []
+            else:
+                self.__failed_matches, self.__registrations = self.__diagnose(self.limit)
+                # The registrations it'd keep alive aren't needed anymore.
+                self.__diagnose = None
+        return self.__failed_matches
+
+    @property
+    def unexplained(self) -> int:
+        """
+        The number of registrations that weren't explained, being further from the call.
+        """
+        return self.__registrations - len(self.failed_matches)
+
+    def __str__(self) -> str:
+        return _assemble_unregistered_call_message(self.failed_matches, self.unexplained)
 
-    def __init__(self, failed_matches: List[ArgumentsMatchResult]):
-        Exception.__init__(self, _assemble_unregistered_call_message(failed_matches))
-        self.failed_matches = failed_matches
+    def __repr__(self) -> str:
+        # The message isn't in `args`, as it's only rendered when it's first read.
+        return f"{type(self).__name__}({str(self)!r})"
 
 
-def _assemble_unregistered_call_message(failed_matches: List[ArgumentsMatchResult]) -> str:
+def _assemble_unregistered_call_message(failed_matches: List[ArgumentsMatchResult], unexplained: int = 0) -> str:
     lines = [
         "Failed all arguments matching, can't finish call:",
     ]
     for failed_match in failed_matches:
         lines.append(f" - {failed_match.explanation}")
+    if unexplained:
+        lines.append(f" ... and {unexplained} more registration(s), matching less of the call")
     return "\n".join(lines)
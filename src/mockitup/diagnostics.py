@@ -0,0 +1,93 @@
+"""
+Finding the registrations closest to a call that matched none of them, to explain it.
+
+Registrations are grouped by their shape: the number of positional arguments and the names of the named ones. Within a
+shape, registrations whose first argument is an exact, hashable value are indexed by it, so registrations sharing the
+call's first argument are found by a lookup. Only those, and the ones that can't be indexed, are scored, by how many of
+their arguments matched the call's.
+"""
+import heapq
+from typing import Any, Dict, FrozenSet, Hashable, List, Mapping, Sequence, Tuple
+
+from .arguments_matcher import _EQUAL, ArgumentsMatcher, _Check, _run_check
+
+_Shape = Tuple[int, FrozenSet[str]]
+
+# A registration's position, and how many of its arguments matched the call's.
+Candidate = Tuple[int, int]
+
+
+class _ShapeGroup:
+    __slots__ = ("positions", "by_first", "unindexed")
+
+    def __init__(self) -> None:
+        self.positions: List[int] = []
+        self.by_first: Dict[Hashable, List[int]] = {}
+        self.unindexed: List[int] = []
+
+
+def _shape(arguments: ArgumentsMatcher) -> _Shape:
+    return len(arguments._positional_checks), frozenset(name for name, _ in arguments._named_checks)
+
+
+class NearestIndex:
+    """
+    The registrations of a side effect, grouped for finding the ones closest to a call. Built when a call first matches
+    nothing, and dropped when the side effect is registered to.
+    """
+
+    def __init__(self, registered: Sequence[ArgumentsMatcher]) -> None:
+        self.count = len(registered)
+        self.__registered = registered
+        self.__shapes: Dict[_Shape, _ShapeGroup] = {}
+        for position, arguments in enumerate(registered):
+            group = self.__shapes.setdefault(_shape(arguments), _ShapeGroup())
+            group.positions.append(position)
+            checks = arguments._positional_checks
+            if checks and checks[0][0] is _EQUAL:
+                try:
+                    group.by_first.setdefault(checks[0][1], []).append(position)
+                    continue
+                except TypeError:
+                    pass
+            group.unindexed.append(position)
+
+    def nearest(self, args: Tuple[Any, ...], kwargs: Mapping[str, Any], limit: int) -> List[Candidate]:
+        """
+        Up to `limit` registrations, the ones with the most arguments matching the call's first, earliest first.
+        """
+        group = self.__shapes.get((len(args), frozenset(kwargs)))
+        if group is None:
+            # None have the call's shape, so none is closer than another.
+            return [(position, 0) for position in range(min(limit, self.count))]
+
+        try:
+            candidates = list(group.by_first.get(args[0], ())) if args else []
+        except TypeError:
+            candidates = []
+        candidates.extend(group.unindexed)
+        if len(candidates) < limit:
+            # Too few share the call's first argument, so others of its shape are shown too.
+            included = set(candidates)
+            candidates.extend(
+                position for position in group.positions[:limit + len(included)] if position not in included)
+
+        scored = [(position, _score(self.__registered[position], args, kwargs)) for position in candidates]
+        return heapq.nsmallest(limit, scored, key=_closest_first)
+
+
+def _closest_first(candidate: Candidate) -> Tuple[int, int]:
+    position, score = candidate
+    return -score, position
+
+
+def _score(arguments: ArgumentsMatcher, args: Tuple[Any, ...], kwargs: Mapping[str, Any]) -> int:
+    score = sum(_passes(check, provided) for check, provided in zip(arguments._positional_checks, args))
+    return score + sum(_passes(check, kwargs[name]) for name, check in arguments._named_checks if name in kwargs)
+
+
+def _passes(check: _Check, provided: Any) -> bool:
+    try:
+        return _run_check(check, provided)
+    except Exception:
+        return False
@@ -0,0 +1,192 @@
+import unittest.mock
+from collections import deque
+from typing import Any, Deque, Dict, Iterable, Iterator, List, Optional, Sequence, overload
+from unittest.mock import _CallList
+
+
+class _BoundedCallList(Sequence[Any]):
+    """
+    A call list keeping only the last `limit` calls appended to it, or none at all when `limit` is 0.
+
+    Calls are kept in a ring buffer, so appending one costs O(1) however many are kept. Like `unittest.mock` call
+    lists, it compares equal to lists of the same calls, and contains the lists of calls it has in a row.
+    """
+    __slots__ = ("limit", "__calls")
+
+    def __init__(self, limit: int, calls: Iterable[Any] = ()) -> None:
+        self.limit = limit
+        self.__calls: Deque[Any] = deque(calls, maxlen=limit)
+
+    def append(self, call: Any) -> None:
+        self.__calls.append(call)
+
+    def clear(self) -> None:
+        self.__calls.clear()
+
+    def __len__(self) -> int:
+        return len(self.__calls)
+
+    def __iter__(self) -> Iterator[Any]:
+        return iter(self.__calls)
+
+    @overload
+    def __getitem__(self, index: int) -> Any:
+        ...
+
+    @overload
+    def __getitem__(self, index: slice) -> List[Any]:
+        ...
+
+    def __getitem__(self, index: Any) -> Any:
+        if isinstance(index, slice):
+            return list(self.__calls)[index]
+        return self.__calls[index]
+
+    def __contains__(self, value: object) -> bool:
+        if isinstance(value, list):
+            return value in _CallList(self.__calls)
+        return value in self.__calls
+
+    def __eq__(self, other: object) -> bool:
+        return list(self.__calls) == other
+
+    __hash__ = None  # type: ignore[assignment]
+
+    def __repr__(self) -> str:
+        return repr(_CallList(self.__calls))
+
+
+class _ChildrenUnderHistory(Dict[str, Any]):
+    """
+    The children of a mock, applying a history policy to the ones added, as `unittest.mock` creates them lazily.
+    """
+    __slots__ = ("history", )
+
+    def __init__(self, history: "CallHistory", children: Dict[str, Any]) -> None:
+        super().__init__(children)
+        self.history = history
+
+    def __setitem__(self, name: str, child: Any) -> None:
+        super().__setitem__(name, child)
+        if isinstance(child, unittest.mock.NonCallableMock):
+            self.history._apply_to_tree(child)
+
+
+def _reset_keeping_history(mock: Any, *args: Any, **kwargs: Any) -> None:
+    # Installed as `reset_mock` on the class `unittest.mock` creates for every mock, so it overrides only this one.
+    super(type(mock), mock).reset_mock(*args, **kwargs)
+    type(mock)._mockitup_history._bound_records(mock)
+
+
+class CallHistory:
+    """
+    How much of their call history mocks keep.
+
+    `unittest.mock.Mock` records every call into `call_args_list`, `mock_calls` and `method_calls`, on the mock
+    and on all of its parents. That's unbounded, and long-running mocks can grow huge.
+    Expectations don't rely on those records, so they keep working under any policy.
+    """
+
+    def __init__(self, limit: Optional[int]) -> None:
+        self.__limit = limit
+
+    @classmethod
+    def full(cls) -> "CallHistory":
+        """
+        Keep every call, like `unittest.mock` does.
+        """
+        return cls(None)
+
+    @classmethod
+    def last(cls, calls: int) -> "CallHistory":
+        """
+        Keep only the last `calls` calls.
+        """
+        if calls < 1:
+            raise ValueError("A bounded history must keep at least one call, use `counts_only()` instead")
+        return cls(calls)
+
+    @classmethod
+    def counts_only(cls) -> "CallHistory":
+        """
+        Keep no call records, only `call_count` and `called` are updated.
+        """
+        return cls(0)
+
+    def apply(self, mock: Any) -> None:
+        """
+        Applies the policy to every mock of the tree `mock` is in, including the children created later, as parents
+        record the calls of their children too. Mocks keep the policy when they're reset.
+        """
+        root = mock
+        parent = _parent_of(mock)
+        while parent is not None:
+            root, parent = parent, _parent_of(parent)
+        # Applied on every registration, so trees already under the same policy aren't walked again.
+        if not self.__is_applied_to(root):
+            self._apply_to_tree(root)
+
+    def __is_applied_to(self, mock: Any) -> bool:
+        if isinstance(mock, unittest.mock.NonCallableMock):
+            children = mock.__dict__["_mock_children"]
+            return isinstance(children, _ChildrenUnderHistory) and children.history.__limit == self.__limit
+        if not _is_stub(mock):
+            return False
+        # Children of a `FastStub` take the kind of call list of their parent when they're created.
+        calls = mock._stub_calls
+        if self.__limit == 0:
+            return calls is None
+        if self.__limit is None:
+            return isinstance(calls, _CallList)
+        return isinstance(calls, _BoundedCallList) and calls.limit == self.__limit
+
+    def _apply_to_tree(self, mock: Any) -> None:
+        pending = [mock]
+        visited = set()
+        while pending:
+            target = pending.pop()
+            if id(target) in visited:
+                continue
+            visited.add(id(target))
+            self._bound_records(target)
+
+            if isinstance(target, unittest.mock.NonCallableMock):
+                children = target.__dict__["_mock_children"]
+                if not isinstance(children, _ChildrenUnderHistory) or children.history.__limit != self.__limit:
+                    target.__dict__["_mock_children"] = _ChildrenUnderHistory(self, children)
+                pending.extend(child for child in children.values()
+                               if isinstance(child, unittest.mock.NonCallableMock))
+            elif _is_stub(target):
+                pending.extend(child for child in target._stub_children.values() if _is_stub(child))
+
+    def _bound_records(self, mock: Any) -> None:
+        if not isinstance(mock, unittest.mock.NonCallableMock):
+            # A `FastStub` records only its own calls, not those of its children.
+            calls = None if self.__limit == 0 else self.__bound(mock._stub_calls or [])
+            object.__setattr__(mock, "_stub_calls", calls)
+            return
+
+        for records in ("call_args_list", "mock_calls", "method_calls"):
+            setattr(mock, records, self.__bound(getattr(mock, records)))
+        setattr(type(mock), "_mockitup_history", self)
+        setattr(type(mock), "reset_mock", _reset_keeping_history)
+
+    def __bound(self, calls: Sequence[Any]) -> Sequence[Any]:
+        if self.__limit is None:
+            return calls if isinstance(calls, _CallList) else _CallList(calls)
+        if isinstance(calls, _BoundedCallList) and calls.limit == self.__limit:
+            return calls
+        return _BoundedCallList(self.__limit, calls)
+
+
+def _parent_of(mock: Any) -> Any:
+    # Read from the instance, as other lookups would spawn children, and not every mock is a `unittest.mock` one.
+    attributes = getattr(mock, "__dict__", {})
+    if "_mock_new_parent" in attributes:
+        return attributes["_mock_new_parent"]
+    # Registrations can also be made on methods of mocks, like `__call__`, which have no parent.
+    return mock._stub_parent if _is_stub(mock) else None
+
+
+def _is_stub(mock: Any) -> bool:
+    return hasattr(type(mock), "_stub_children")
@@ -0,0 +1,238 @@
+"""
+Opt-in statistics about how mocks dispatch their calls.
+
+While instrumentation is enabled, mocks getting their first registration are given an instrumented side effect,
+recording per-registration hits and match attempts, the scan depth of every call, the time spent matching
+arguments versus providing results, and the calls that matched nothing. Mocks configured while it's disabled
+are left untouched, and pay nothing for it.
+"""
+import json
+import time
+import weakref
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Mapping, Optional, Tuple, cast
+
+from . import composer
+from .actions import ArgumentsActionResult, BaseActionResult
+from .arguments_matcher import ArgumentsMatcher, ArgumentsMatchResult
+from .composer import MockItUpSideEffect, UnregisteredCall, _MockType, _Registration, _ReportMatchResults
+from .signatures import SignatureNormalizer, normalizer_for
+
+_instrumented: "weakref.WeakSet[InstrumentedSideEffect]" = weakref.WeakSet()
+
+
+class RegistrationStats:
+    __slots__ = ("arguments", "hits", "attempts")
+
+    def __init__(self, arguments: ArgumentsMatcher) -> None:
+        self.arguments = arguments
+        self.hits = 0
+        self.attempts = 0
+
+    def as_dict(self) -> Dict[str, Any]:
+        args, kwargs = self.arguments
+        return {
+            "arguments": f"(args: '{args}', kwargs: '{kwargs}')",
+            "hits": self.hits,
+            "attempts": self.attempts,
+        }
+
+
+class MockStats:
+    """
+    Dispatch statistics of a single mock.
+
+    Counters aren't synchronized, so under concurrent calls they're approximate.
+    """
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self.calls = 0
+        self.unregistered_calls = 0
+        self.attempts = 0
+        self.total_scan_depth = 0
+        self.max_scan_depth = 0
+        self.matching_seconds = 0.0
+        self.provide_seconds = 0.0
+        self.registrations: List[RegistrationStats] = []
+
+    @property
+    def average_scan_depth(self) -> float:
+        matched_calls = self.calls - self.unregistered_calls
+        return self.total_scan_depth / matched_calls if matched_calls else 0.0
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "calls": self.calls,
+            "unregistered_calls": self.unregistered_calls,
+            "average_scan_depth": self.average_scan_depth,
+            "max_scan_depth": self.max_scan_depth,
+            "matching_seconds": self.matching_seconds,
+            "provide_seconds": self.provide_seconds,
+            "registrations": [registration.as_dict() for registration in self.registrations],
+        }
+
+
+class DispatchStats:
+
+    def __init__(self, mocks: List[MockStats]) -> None:
+        self.mocks = mocks
+
+    def __getitem__(self, name: str) -> MockStats:
+        for mock_stats in self.mocks:
+            if mock_stats.name == name:
+                return mock_stats
+        raise KeyError(name)
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {"mocks": [mock_stats.as_dict() for mock_stats in self.mocks]}
+
+    def to_json(self, **kwargs: Any) -> str:
+        return json.dumps(self.as_dict(), **kwargs)
+
+
+class _InstrumentedArguments:
+    """
+    Counts the match attempts of a registration.
+    """
+    __slots__ = ("__arguments", "__registration", "__mock_stats", "index_key")
+
+    def __init__(self, arguments: ArgumentsMatcher, registration: RegistrationStats, mock_stats: MockStats) -> None:
+        self.__arguments = arguments
+        self.__registration = registration
+        self.__mock_stats = mock_stats
+        self.index_key = arguments.index_key
+
+    def matches(self, args: Tuple[Any], kwargs: Mapping[str, Any]) -> ArgumentsMatchResult:
+        self.__registration.attempts += 1
+        self.__mock_stats.attempts += 1
+        return self.__arguments.matches(args, kwargs)
+
+    def __getattr__(self, name: str) -> Any:
+        # Explaining unregistered calls reads the compiled arguments, which doesn't count as an attempt.
+        if name.startswith("__") or name == "_InstrumentedArguments__arguments":
+            # Looked up before the instance is set up, like by `pickle`.
+            raise AttributeError(name)
+        return getattr(self.__arguments, name)
+
+
+class _InstrumentedAction:
+    """
+    Counts the hits of a registration, and times providing its result.
+    """
+    __slots__ = ("__action", "__registration", "__mock_stats", "takes_arguments")
+
+    def __init__(self, action: BaseActionResult, registration: RegistrationStats, mock_stats: MockStats) -> None:
+        self.__action = action
+        self.__registration = registration
+        self.__mock_stats = mock_stats
+        self.takes_arguments = getattr(action, "takes_arguments", False)
+
+    def provide_result(self) -> Any:
+        return self.__timed(self.__action.provide_result)
+
+    def provide_result_for(self, args: Tuple[Any, ...], kwargs: Mapping[str, Any]) -> Any:
+        return self.__timed(lambda: cast(ArgumentsActionResult, self.__action).provide_result_for(args, kwargs))
+
+    def __timed(self, provide: Callable[[], Any]) -> Any:
+        self.__registration.hits += 1
+        started = time.perf_counter()
+        try:
+            return provide()
+        finally:
+            self.__mock_stats.provide_seconds += time.perf_counter() - started
+
+
+class InstrumentedSideEffect(MockItUpSideEffect):
+
+    def __init__(self, normalizer: Optional[SignatureNormalizer] = None, name: str = "") -> None:
+        super().__init__(normalizer)
+        self.stats = MockStats(name)
+        _instrumented.add(self)
+
+    @classmethod
+    def for_mock(cls, mock: _MockType) -> "InstrumentedSideEffect":
+        return cls(normalizer_for(mock), mock._extract_mock_name())
+
+    def register(self, arguments: ArgumentsMatcher, action_result: BaseActionResult,
+                 report: _ReportMatchResults) -> None:
+        super().register(*self.__instrument(arguments, action_result, report))
+
+    def register_many(self, registrations: Iterable[_Registration]) -> None:
+        super().register_many(
+            self.__instrument(arguments, action_result, report) for arguments, action_result, report in registrations)
+
+    def __instrument(self, arguments: ArgumentsMatcher, action_result: BaseActionResult,
+                     report: _ReportMatchResults) -> _Registration:
+        registration = RegistrationStats(arguments)
+        self.stats.registrations.append(registration)
+        return (
+            _InstrumentedArguments(arguments, registration, self.stats),  # type: ignore[return-value]
+            _InstrumentedAction(action_result, registration, self.stats),
+            report,
+        )
+
+    def __call__(self, *args: Any, **kwargs: Any) -> Any:
+        mock_stats = self.stats
+        attempts_before = mock_stats.attempts
+        provide_before = mock_stats.provide_seconds
+        started = time.perf_counter()
+        unregistered = False
+        try:
+            return super().__call__(*args, **kwargs)
+        except UnregisteredCall:
+            unregistered = True
+            raise
+        finally:
+            elapsed = time.perf_counter() - started
+            mock_stats.calls += 1
+            mock_stats.matching_seconds += elapsed - (mock_stats.provide_seconds - provide_before)
+            if unregistered:
+                mock_stats.unregistered_calls += 1
+            else:
+                scan_depth = mock_stats.attempts - attempts_before
+                mock_stats.total_scan_depth += scan_depth
+                mock_stats.max_scan_depth = max(mock_stats.max_scan_depth, scan_depth)
+
+
+def enable() -> None:
+    composer._side_effect_class = InstrumentedSideEffect
+
+
+def disable() -> None:
+    composer._side_effect_class = MockItUpSideEffect
+
+
+def is_enabled() -> bool:
+    return composer._side_effect_class is InstrumentedSideEffect
+
+
+@contextmanager
+def instrumented() -> Iterator[None]:
+    """
+    Instruments the mocks configured inside the `with` block.
+    """
+    was_enabled = is_enabled()
+    enable()
+    try:
+        yield
+    finally:
+        if not was_enabled:
+            disable()
+
+
+def stats(name: Optional[str] = None) -> DispatchStats:
+    """
+    Statistics of the instrumented mocks that are still alive, optionally only of the mocks with the given name.
+    """
+    return DispatchStats([
+        side_effect.stats for side_effect in list(_instrumented) if name is None or side_effect.stats.name == name
+    ])
+
+
+def reset() -> None:
+    """
+    Stops tracking the mocks instrumented so far.
+    """
+    _instrumented.clear()
@@ -0,0 +1,257 @@
+"""
+Calls whose results stay pending until the test settles them.
+
+Every call gets a `PendingCall` to await, queued in the `PendingCalls` of its registration. The test resolves or
+fails the queued calls in bulk: first come first served, in random order, or only the calls with a given key. Queuing
+a call and settling it cost O(1) each, so tens of thousands of calls can be in flight at once.
+
+Pending calls are awaitable on asyncio and on trio. Which one is running is found out when a call is first awaited.
+Calls are settled from the thread running the event loop, like the rest of the test.
+"""
+import abc
+import asyncio
+import functools
+import random
+import weakref
+from collections import deque
+from typing import Any, Callable, Deque, Dict, Generator, Hashable, List, Mapping, Optional, Tuple
+
+from .pickling import Sentinel
+
+FIFO = "fifo"
+RANDOM = "random"
+
+_ALL_KEYS = Sentinel("_ALL_KEYS", __name__)
+
+
+class DeferredResult(abc.ABC):
+    """
+    A result the caller awaits, rather than the result itself. Async stubs await it for their callers.
+    """
+    __slots__ = ()
+
+    @abc.abstractmethod
+    def __await__(self) -> Generator[Any, None, Any]:
+        ...
+
+
+def _trio() -> Any:
+    # Only asyncio comes with Python, trio is found out to be running when no asyncio loop is.
+    try:
+        import trio
+    except ImportError:
+        raise RuntimeError("Awaiting outside of an asyncio event loop needs trio, which isn't installed") from None
+    return trio
+
+
+class PendingCall(DeferredResult):
+    """
+    The awaitable result of a call, pending until it's settled through its `PendingCalls`.
+    """
+    __slots__ = ("args", "kwargs", "key", "__outcome", "__future", "__task", "__cancelled")
+
+    def __init__(self, args: Tuple[Any, ...], kwargs: Mapping[str, Any], key: Hashable) -> None:
+        self.args = args
+        self.kwargs = kwargs
+        self.key = key
+        self.__outcome: Optional[Tuple[bool, Any]] = None
+        self.__future: "Optional[asyncio.Future[None]]" = None
+        self.__task: Any = None
+        self.__cancelled = False
+
+    @property
+    def settled(self) -> bool:
+        return self.__outcome is not None
+
+    def _settle(self, returned: bool, value: Any) -> bool:
+        """
+        Resolves the call with `value`, or fails it with it. Returns whether it wasn't settled before.
+        Calls whose caller was cancelled are settled too, waking no one.
+        """
+        if self.__outcome is not None:
+            return False
+
+        self.__outcome = (returned, value)
+        if self.__future is not None:
+            if not self.__future.done():
+                self.__future.set_result(None)
+        elif self.__task is not None and not self.__cancelled:
+            _trio().lowlevel.reschedule(self.__task)
+        return True
+
+    def __await__(self) -> Generator[Any, None, Any]:
+        if self.__outcome is None:
+            try:
+                loop = asyncio.get_running_loop()
+            except RuntimeError:
+                yield from self.__wait_on_trio().__await__()
+            else:
+                self.__future = loop.create_future()
+                yield from self.__future.__await__()
+
+        returned, value = self.__outcome  # type: ignore[misc]
+        if returned:
+            return value
+        raise value
+
+    async def __wait_on_trio(self) -> None:
+        trio = _trio()
+        self.__task = trio.lowlevel.current_task()
+
+        def abort(raise_cancel: Any) -> Any:
+            self.__cancelled = True
+            return trio.lowlevel.Abort.SUCCEEDED
+
+        await trio.lowlevel.wait_task_rescheduled(abort)
+
+
+class _CallQueue:
+    """
+    Calls in the order they were made, and in a pool to draw from at random, where taking one out swaps it with the
+    last. Every waiting call is in both. Settled calls are dropped from each as they're come across, so taking calls
+    out costs O(1) each, amortized.
+    """
+    __slots__ = ("__in_order", "__pool")
+
+    def __init__(self) -> None:
+        self.__in_order: Deque[PendingCall] = deque()
+        self.__pool: List[PendingCall] = []
+
+    def __len__(self) -> int:
+        """
+        The number of calls kept, including the settled ones that weren't come across yet.
+        """
+        return max(len(self.__in_order), len(self.__pool))
+
+    def is_drained(self) -> bool:
+        return not self.__in_order or not self.__pool
+
+    def append(self, call: PendingCall) -> None:
+        self.__in_order.append(call)
+        self.__pool.append(call)
+
+    def first(self) -> Optional[PendingCall]:
+        in_order = self.__in_order
+        while in_order:
+            call = in_order.popleft()
+            if not call.settled:
+                return call
+        return None
+
+    def draw(self, rng: Any) -> Optional[PendingCall]:
+        pool = self.__pool
+        while pool:
+            index: int = rng.randrange(len(pool))
+            call = pool[index]
+            pool[index] = pool[-1]
+            pool.pop()
+            if not call.settled:
+                return call
+        return None
+
+    def compact(self) -> None:
+        self.__in_order = deque(call for call in self.__in_order if not call.settled)
+        self.__pool = [call for call in self.__pool if not call.settled]
+
+
+class PendingCalls:
+    """
+    The calls of a `returns_pending()` registration that weren't settled yet, in the order they were made.
+
+    With a `key`, calls are also grouped by what `key` returns for their arguments, so they can be settled by key.
+    Settled calls are dropped from the queues they're still in as the queues are walked, so settling a call costs
+    O(1) however it was picked.
+
+    Mocks made from a template queue their calls apart, in `calls.of(mock)`.
+    """
+
+    def __init__(self, key: Optional[Callable[..., Hashable]] = None) -> None:
+        self.__key = key
+        self.__queue = _CallQueue()
+        self.__by_key: Dict[Hashable, _CallQueue] = {}
+        self.__waiting = 0
+        self.__per_mock: "weakref.WeakKeyDictionary[Any, PendingCalls]" = weakref.WeakKeyDictionary()
+
+    def __len__(self) -> int:
+        """
+        The number of calls that weren't settled yet, including the ones whose caller was cancelled.
+        """
+        return self.__waiting
+
+    def _add(self, args: Tuple[Any, ...], kwargs: Mapping[str, Any]) -> PendingCall:
+        if self.__key is None:
+            call = PendingCall(args, kwargs, None)
+        else:
+            call = PendingCall(args, kwargs, self.__key(*args, **kwargs))
+            queue = self.__by_key.get(call.key)
+            if queue is None:
+                queue = self.__by_key[call.key] = _CallQueue()
+            queue.append(call)
+        self.__queue.append(call)
+        self.__waiting += 1
+        if len(self.__queue) > 2 * self.__waiting:
+            # Calls settled one way linger in the other, until there are as many of them as waiting calls.
+            self.__queue.compact()
+        return call
+
+    def of(self, mock: Any) -> "PendingCalls":
+        """
+        The calls of `mock`, when the registration was scripted in a template applied to it.
+        """
+        try:
+            return self.__per_mock[mock]
+        except KeyError:
+            raise ValueError("The calls of this mock aren't queued here, was the template applied to it?") from None
+
+    def _for_mock(self, mock: Any) -> "PendingCalls":
+        calls = self.__per_mock[mock] = PendingCalls(self.__key)
+        return calls
+
+    def resolve(self, value: Any = None, *, count: Optional[int] = None, order: str = FIFO, key: Any = _ALL_KEYS,
+                rng: Optional[random.Random] = None) -> int:
+        """
+        Makes up to `count` waiting calls return `value`, all of them by default, and returns how many were resolved.
+
+        Calls are picked first come first served, or in random order with `order=RANDOM`, drawn from `rng` if given.
+        With `key`, only the calls with that key are picked.
+        """
+        return self.__settle(True, value, count, order, key, rng)
+
+    def fail(self, error: BaseException, *, count: Optional[int] = None, order: str = FIFO, key: Any = _ALL_KEYS,
+             rng: Optional[random.Random] = None) -> int:
+        """
+        Like `resolve`, but makes the calls raise `error`.
+        """
+        return self.__settle(False, error, count, order, key, rng)
+
+    def __settle(self, returned: bool, value: Any, count: Optional[int], order: str, key: Any,
+                 rng: Optional[random.Random]) -> int:
+        if order not in (FIFO, RANDOM):
+            raise ValueError(f"Calls are settled in '{FIFO}' or '{RANDOM}' order, not '{order}'")
+        if key is _ALL_KEYS:
+            queue = self.__queue
+        elif self.__key is None:
+            raise TypeError("Settling calls by key needs a `key` given to `returns_pending()`")
+        else:
+            queue = self.__by_key.get(key, _CallQueue())
+
+        limit = len(queue) if count is None else count
+        take = queue.first if order == FIFO else functools.partial(queue.draw, rng or random)
+        settled = 0
+        while settled < limit:
+            call = take()
+            if call is None:
+                break
+            call._settle(returned, value)
+            settled += 1
+
+        if key is not _ALL_KEYS and queue.is_drained():
+            self.__by_key.pop(key, None)
+        self.__waiting -= settled
+        return settled
+
+    def keys(self) -> List[Hashable]:
+        """
+        The keys of the calls that may still be waiting.
+        """
+        return list(self.__by_key)
@@ -0,0 +1,61 @@
+"""
+Pickling of objects holding locks, so configured stubs and suites can be sent to other processes.
+"""
+import threading
+from typing import Any, Dict, Iterator
+
+_LOCK_TYPE = type(threading.Lock())
+
+
+class _NewLock:
+    """
+    Stands in for a lock in pickled state, every unpickled copy gets a lock of its own.
+    """
+
+
+def _slot_names(obj: Any) -> Iterator[str]:
+    for cls in type(obj).__mro__:
+        slots = cls.__dict__.get("__slots__", ())
+        for name in (slots, ) if isinstance(slots, str) else slots:
+            if name in ("__weakref__", "__dict__"):
+                continue
+            if name.startswith("__") and not name.endswith("__"):
+                name = f"_{cls.__name__.lstrip('_')}{name}"
+            yield name
+
+
+class LocksArentPickled:
+    """
+    Pickles the attributes of its subclasses, slotted or not, except for their locks which are created anew.
+    """
+    __slots__ = ()
+
+    def __getstate__(self) -> Dict[str, Any]:
+        state = dict(getattr(self, "__dict__", {}))
+        for name in _slot_names(self):
+            try:
+                state[name] = object.__getattribute__(self, name)
+            except AttributeError:
+                pass
+        return {name: _NewLock() if isinstance(value, _LOCK_TYPE) else value for name, value in state.items()}
+
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        for name, value in state.items():
+            object.__setattr__(self, name, threading.Lock() if isinstance(value, _NewLock) else value)
+
+
+class Sentinel:
+    """
+    A unique marker value that stays the very same object when it's unpickled, like a module global.
+    """
+
+    def __init__(self, name: str, module: str) -> None:
+        self.__name = name
+        # Where pickle looks the name up.
+        self.__module__ = module
+
+    def __repr__(self) -> str:
+        return self.__name
+
+    def __reduce__(self) -> str:
+        return self.__name
@@ -1,57 +1,75 @@
-from typing import Any, Callable, Optional, Type, TypeVar, Union
+from typing import TYPE_CHECKING, Any, AsyncIterable, Callable, Hashable, Iterable, Optional, TypeVar, Union
 from unittest.mock import Mock
 
 from typing_extensions import Protocol
 
-from .actions import ActionRaises, ActionReturnsMultipleValues, ActionReturnsSingleValue, ActionYieldsFrom, \
-    BaseActionResult
+from .actions import ActionAfter, ActionRaises, ActionReturnsCached, ActionReturnsLazily, \
+    ActionReturnsMultipleValues, ActionReturnsPending, ActionReturnsSingleValue, ActionYieldsAsyncStream, \
+    ActionYieldsFrom, ActionYieldsStream, BaseActionResult
 from .arguments_matcher import ArgumentsMatcher
+from .cardinality import Cardinality
+from .pending import PendingCalls
 
-_MockType = TypeVar("_MockType", bound=Mock)
+if TYPE_CHECKING:
+    from .stubs import FastStub
 
+_MockType = TypeVar("_MockType", bound=Union[Mock, "FastStub"])
 
-class ProxyCallback(Protocol):
-
-    def __call__(self, mock: _MockType, arguments: ArgumentsMatcher, action: BaseActionResult) -> None:
-        ...
-
-
-class _ActionResultBaseFactory(Protocol):
-
-    def __call__(self, value: Any) -> BaseActionResult:
-        ...
 
+class ProxyCallback(Protocol):
 
-class _ValueProvidingDescriptor:
-
-    def __init__(self, build_action_result: _ActionResultBaseFactory) -> None:
-        self.__build_action_result = build_action_result
-
-    def __get__(
+    def __call__(
         self,
-        obj: "MockResponseProxy",
-        objtype: Optional[Type["MockResponseProxy"]] = None,
-    ) -> Callable[[Any], None]:
-
-        def __tmp(value: Any) -> None:
-            return obj._cb(
-                obj._mock,
-                obj._arguments,
-                self.__build_action_result(value),
-            )
-
-        return __tmp
+        mock: _MockType,
+        arguments: ArgumentsMatcher,
+        action: BaseActionResult,
+        cardinality: Optional[Cardinality] = None,
+    ) -> None:
+        ...
 
 
 ActionReturns = Union[ActionReturnsMultipleValues, ActionReturnsSingleValue]
 
 
 class MockResponseProxy:
+    __slots__ = ("_mock", "_arguments", "_cb", "_cardinality", "_latency")
 
     def __init__(self, mock: _MockType, arguments: "ArgumentsMatcher", cb: ProxyCallback):
         self._mock = mock
         self._arguments = arguments
         self._cb = cb
+        self._cardinality: Optional[Cardinality] = None
+        self._latency: Optional[Union[float, Callable[[], float]]] = None
+
+    def after(self, latency: Union[float, Callable[[], float]]) -> "MockResponseProxy":
+        """
+        Delay the result by `latency` seconds, or by what `latency` returns on every call, like a seeded
+        `random.Random().expovariate`. The call gives a result to await, see `mockitup.clock` for skipping the wait.
+        """
+        self._latency = latency
+        return self
+
+    def times(self, times: int) -> "MockResponseProxy":
+        """
+        Expect exactly `times` calls.
+        """
+        self._cardinality = Cardinality.exactly(times)
+        return self
+
+    def at_least(self, times: int) -> "MockResponseProxy":
+        self._cardinality = Cardinality.at_least(times)
+        return self
+
+    def at_most(self, times: int) -> "MockResponseProxy":
+        self._cardinality = Cardinality.at_most(times)
+        return self
+
+    def never(self) -> None:
+        """
+        Expect no calls at all.
+        """
+        self._cardinality = Cardinality.never()
+        return self._register(ActionReturnsSingleValue(None))
 
     def returns(self, *values: Any) -> None:
         action: ActionReturns
@@ -60,7 +78,52 @@ class MockResponseProxy:
         else:
             action = ActionReturnsSingleValue(values[0] if len(values) else None)
 
-        return self._cb(self._mock, self._arguments, action)
-
-    raises = _ValueProvidingDescriptor(ActionRaises)
-    yields_from = _ValueProvidingDescriptor(ActionYieldsFrom)
+        return self._register(action)
+
+    def returns_lazily(self, factory: Callable[[], Any]) -> None:
+        """
+        Return what `factory` builds, calling it on every call.
+        """
+        return self._register(ActionReturnsLazily(factory))
+
+    def returns_cached(self, factory: Callable[..., Any], per_arguments: bool = False) -> None:
+        """
+        Return what `factory` builds, calling it only on the first call.
+        With `per_arguments=True`, `factory` is called with the call's arguments, once for every distinct set of them.
+        """
+        return self._register(ActionReturnsCached(factory, per_arguments))
+
+    def returns_pending(self, key: Optional[Callable[..., Hashable]] = None) -> PendingCalls:
+        """
+        Give every call a result to await, pending until it's settled through the returned `PendingCalls`.
+        With `key`, calls can also be settled by what `key` returns for their arguments.
+        """
+        calls = PendingCalls(key)
+        self._register(ActionReturnsPending(calls))
+        return calls
+
+    def yields_stream(self, factory: Callable[[], Iterable[Any]], chunk_size: Optional[int] = None) -> None:
+        """
+        Yield from a fresh iterable built by `factory` on every call, in lists of `chunk_size` items if given.
+        """
+        return self._register(ActionYieldsStream(factory, chunk_size))
+
+    def yields_async_stream(self, factory: Callable[[], Union[Iterable[Any], AsyncIterable[Any]]],
+                            chunk_size: Optional[int] = None) -> None:
+        """
+        Like `yields_stream`, but the call gives an async iterator, for `async for`.
+        """
+        return self._register(ActionYieldsAsyncStream(factory, chunk_size))
+
+    def _register(self, action: BaseActionResult) -> None:
+        if self._latency is not None:
+            action = ActionAfter(action, self._latency)
+        if self._cardinality is None:
+            return self._cb(self._mock, self._arguments, action)
+        return self._cb(self._mock, self._arguments, action, cardinality=self._cardinality)
+
+    def raises(self, value: Any) -> None:
+        return self._register(ActionRaises(value))
+
+    def yields_from(self, value: Iterable[Any]) -> None:
+        return self._register(ActionYieldsFrom(value))
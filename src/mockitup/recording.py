@@ -0,0 +1,232 @@
+"""
+Recording the calls of real objects, and replaying them as allowances.
+
+A recording is a stream of frames, each holding the attribute path that was called, the pickled call arguments and
+the pickled outcome: what the call returned or raised. Frame headers are read on their own, so replaying indexes a
+recording without unpickling it. The calls of an attribute path are only unpickled when its mock is first used.
+"""
+import functools
+import mmap
+import pickle
+import struct
+import threading
+import warnings
+from contextlib import contextmanager
+from typing import Any, BinaryIO, Callable, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+from .actions import BaseActionResult
+from .arguments_matcher import ArgumentsMatcher
+from .composer import MockItUpSideEffect, _ignore_report, _installed_side_effect, _MockType, _normalized_row, \
+    _Registration, _ReportMatchResults, _install_side_effect
+from .pickling import LocksArentPickled
+from .signatures import SignatureNormalizer, normalizer_for
+
+# Lengths of the attribute path, the pickled call and the pickled outcome.
+_HEADER = struct.Struct(">HII")
+
+_Outcome = Tuple[bool, Any]
+
+
+class _RecordingFile:
+
+    def __init__(self, file: BinaryIO) -> None:
+        self.__file = file
+        self.__lock = threading.Lock()
+
+    def write(self, attribute_path: str, call: bytes, outcome: _Outcome) -> None:
+        result = _pickled(attribute_path, outcome, "outcome")
+        if result is None:
+            return
+        path = attribute_path.encode()
+        frame = b"".join((_HEADER.pack(len(path), len(call), len(result)), path, call, result))
+        with self.__lock:
+            self.__file.write(frame)
+
+
+def _pickled(attribute_path: str, value: Any, what: str) -> Optional[bytes]:
+    try:
+        return pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+    except (pickle.PicklingError, TypeError, AttributeError) as e:
+        warnings.warn(f"Not recording a call of '{attribute_path}', its {what} can't be pickled: {e}", RuntimeWarning)
+        return None
+
+
+class _RecorderMembers:
+
+    def __init__(self, target: Any, recording: _RecordingFile, attribute_path: str) -> None:
+        self.target = target
+        self.recording = recording
+        self.attribute_path = attribute_path
+
+
+class Recorder:
+    """
+    Forwards calls to the object it wraps, recording each call with what it returned or raised.
+
+    Callable attributes and attributes holding objects are wrapped as well, so calls are recorded anywhere along an
+    attribute chain. Plain data attributes are returned as they are.
+
+    Calls whose arguments or outcome can't be pickled aren't recorded, with a warning.
+    """
+
+    def __init__(self, target: Any, recording: _RecordingFile, attribute_path: str = "") -> None:
+        super().__setattr__("_members", _RecorderMembers(target, recording, attribute_path))
+
+    def __getattr__(self, name: str) -> Any:
+        members = _recorder_members(self)
+        attribute = getattr(members.target, name)
+        if not callable(attribute) and not hasattr(attribute, "__dict__"):
+            return attribute
+        attribute_path = f"{members.attribute_path}.{name}" if members.attribute_path else name
+        return Recorder(attribute, members.recording, attribute_path)
+
+    def __call__(self, *args: Any, **kwargs: Any) -> Any:
+        members = _recorder_members(self)
+        # Pickled before the call, so calls that can't be replayed are made without being recorded.
+        call = _pickled(members.attribute_path, (args, dict(kwargs)), "arguments")
+        if call is None:
+            return members.target(*args, **kwargs)
+        try:
+            result = members.target(*args, **kwargs)
+        except Exception as e:
+            members.recording.write(members.attribute_path, call, (False, e))
+            raise
+        members.recording.write(members.attribute_path, call, (True, result))
+        return result
+
+
+def _recorder_members(recorder: Recorder) -> _RecorderMembers:
+    return object.__getattribute__(recorder, "_members")  # type: ignore[no-any-return]
+
+
+@contextmanager
+def record(target: Any, filename: str) -> Iterator[Recorder]:
+    """
+    Records the calls made through the yielded recorder, appending them to `filename`.
+    """
+    with open(filename, "ab") as file:
+        yield Recorder(target, _RecordingFile(file))
+
+
+class _ActionReplaysOutcomes(LocksArentPickled):
+    """
+    Replays the recorded outcomes of a call in order, repeating the last one once they run out.
+    """
+
+    def __init__(self, outcomes: List[_Outcome]) -> None:
+        self.__outcomes = iter(outcomes)
+        self.__last = outcomes[-1]
+        self.__lock = threading.Lock()
+
+    def provide_result(self) -> Any:
+        with self.__lock:
+            self.__last = next(self.__outcomes, self.__last)
+            returned, value = self.__last
+        if returned:
+            return value
+        raise value
+
+
+class _Recording:
+    """
+    A memory-mapped recording, with the offsets of the frames of every attribute path.
+    """
+
+    def __init__(self, filename: str) -> None:
+        with open(filename, "rb") as file:
+            self.__buffer: Union[mmap.mmap, bytes] = \
+                mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) if file.seek(0, 2) else b""
+        self.frames: Dict[str, List[int]] = {}
+
+        offset = 0
+        end = len(self.__buffer)
+        while offset < end:
+            path_length, call_length, result_length = _HEADER.unpack_from(self.__buffer, offset)
+            path = bytes(self.__buffer[offset + _HEADER.size:offset + _HEADER.size + path_length]).decode()
+            self.frames.setdefault(path, []).append(offset)
+            offset += _HEADER.size + path_length + call_length + result_length
+
+    def registrations(self, attribute_path: str, normalizer: Optional[SignatureNormalizer]) -> List[_Registration]:
+        # Repeated calls replay their outcomes in order, so calls are grouped by their pickled arguments.
+        calls: Dict[bytes, Tuple[Tuple[Any, ...], Dict[str, Any], List[_Outcome]]] = {}
+        for offset in self.frames[attribute_path]:
+            path_length, call_length, result_length = _HEADER.unpack_from(self.__buffer, offset)
+            call_start = offset + _HEADER.size + path_length
+            call = bytes(self.__buffer[call_start:call_start + call_length])
+            result = self.__buffer[call_start + call_length:call_start + call_length + result_length]
+            if call not in calls:
+                args, kwargs = pickle.loads(call)
+                calls[call] = (args, kwargs, [])
+            calls[call][2].append(pickle.loads(result))
+
+        return [(ArgumentsMatcher(*_normalized_row(normalizer, args, kwargs)), _ActionReplaysOutcomes(outcomes),
+                 _ignore_report) for args, kwargs, outcomes in calls.values()]
+
+
+class _ReplayedSideEffect(MockItUpSideEffect):
+    """
+    Registers the recorded calls of its attribute path when it's first called or registered to, after the
+    registrations `earlier` the mock already had.
+    """
+
+    def __init__(self, normalizer: Optional[SignatureNormalizer], load: Callable[[], List[_Registration]],
+                 earlier: Iterable[_Registration] = ()) -> None:
+        super().__init__(normalizer)
+        super().register_many(earlier)
+        self.__load: Optional[Callable[[], List[_Registration]]] = load
+        self.__load_lock = threading.Lock()
+
+    def __ensure_loaded(self) -> None:
+        if self.__load is None:
+            return
+        with self.__load_lock:
+            if self.__load is not None:
+                super().register_many(self.__load())
+                self.__load = None
+
+    def __getstate__(self) -> Dict[str, Any]:
+        # The recording is memory mapped, so its calls are sent along instead.
+        self.__ensure_loaded()
+        return super().__getstate__()
+
+    def register(self, arguments: ArgumentsMatcher, action_result: BaseActionResult,
+                 report: _ReportMatchResults) -> None:
+        self.__ensure_loaded()
+        super().register(arguments, action_result, report)
+
+    def register_many(self, registrations: Iterable[_Registration]) -> None:
+        self.__ensure_loaded()
+        super().register_many(registrations)
+
+    def registrations(self) -> List[_Registration]:
+        # Read when mocks are converted to other kinds of side effects, which must get the recorded calls too.
+        self.__ensure_loaded()
+        return super().registrations()
+
+    def __call__(self, *args: Any, **kwargs: Any) -> Any:
+        self.__ensure_loaded()
+        return super().__call__(*args, **kwargs)
+
+
+def replay(mock: _MockType, filename: str) -> _MockType:
+    """
+    Allows the calls recorded in `filename` on `mock`, each returning or raising what it did when it was recorded.
+    Registrations made on the mock before take precedence over the recorded calls.
+    """
+    recording = _Recording(filename)
+    targets = {
+        attribute_path: functools.reduce(getattr, attribute_path.split("."), mock) if attribute_path else mock
+        for attribute_path in recording.frames
+    }
+    for target in targets.values():
+        side_effect = _installed_side_effect(target)
+        if side_effect is not None and not isinstance(side_effect, MockItUpSideEffect):
+            raise ValueError(f"Mock '{target._extract_mock_name()}' already has a side effect of its own")
+
+    for attribute_path, target in targets.items():
+        normalizer = normalizer_for(target)
+        side_effect = _installed_side_effect(target)
+        _install_side_effect(target, _ReplayedSideEffect(
+            normalizer, functools.partial(recording.registrations, attribute_path, normalizer),
+            side_effect.registrations() if side_effect is not None else ()))
+    return mock
@@ -0,0 +1,112 @@
+"""
+Normalisation of call arguments for mocks that have a spec.
+
+A call like `get(1, timeout=2)` can also be spelled `get(1, 2)`, or `get(1)` when `2` is the default. For mocks with
+a spec, both registered and provided arguments are bound to the spec's signature, so all spellings match alike.
+"""
+import functools
+import inspect
+import unittest.mock
+from typing import Any, Dict, Mapping, Optional, Tuple
+
+from .arguments_matcher import ANY_ARGS
+
+_EMPTY = inspect.Parameter.empty
+_VAR_KINDS = (inspect.Parameter.VAR_POSITIONAL, inspect.Parameter.VAR_KEYWORD)
+
+
+class SignatureNormalizer:
+    """
+    Binds call arguments to their canonical form: every positional parameter as a positional argument, and every
+    keyword-only parameter as a named argument, with defaults applied.
+
+    Signatures without variadic parameters get a binding plan computed once, so normalising a call costs about a
+    tuple build. Others go through `inspect.Signature.bind`.
+    """
+
+    def __init__(self, signature: inspect.Signature) -> None:
+        self.__signature = signature
+        parameters = list(signature.parameters.values())
+        self.__planned = not any(parameter.kind in _VAR_KINDS for parameter in parameters)
+        self.__positional = tuple(
+            (parameter.name, parameter.default, parameter.kind is inspect.Parameter.POSITIONAL_ONLY)
+            for parameter in parameters
+            if parameter.kind in (inspect.Parameter.POSITIONAL_ONLY, inspect.Parameter.POSITIONAL_OR_KEYWORD))
+        self.__keyword_only = tuple((parameter.name, parameter.default)
+                                    for parameter in parameters
+                                    if parameter.kind is inspect.Parameter.KEYWORD_ONLY)
+
+    def normalize(self, args: Tuple[Any, ...], kwargs: Mapping[str, Any]) -> Tuple[Tuple[Any, ...], Dict[str, Any]]:
+        """
+        Raises `TypeError` when the arguments don't fit the signature.
+        """
+        if not self.__planned or len(args) > len(self.__positional):
+            return self.__bind(args, kwargs)
+
+        if not kwargs and not self.__keyword_only and len(args) == len(self.__positional):
+            return args, {}
+
+        remaining = dict(kwargs)
+        positional = list(args)
+        for name, default, positional_only in self.__positional[len(args):]:
+            if name in remaining and not positional_only:
+                positional.append(remaining.pop(name))
+            elif default is not _EMPTY:
+                positional.append(default)
+            else:
+                return self.__bind(args, kwargs)
+
+        named = {}
+        for name, default in self.__keyword_only:
+            if name in remaining:
+                named[name] = remaining.pop(name)
+            elif default is not _EMPTY:
+                named[name] = default
+            else:
+                return self.__bind(args, kwargs)
+
+        if remaining:
+            return self.__bind(args, kwargs)
+        return tuple(positional), named
+
+    def normalize_registration(self, args: Tuple[Any, ...],
+                               kwargs: Mapping[str, Any]) -> Tuple[Tuple[Any, ...], Mapping[str, Any]]:
+        """
+        Like `normalize`, but registrations that can't be bound (like `ANY_ARGS`) are kept as they are.
+        """
+        if args and args[0] is ANY_ARGS:
+            return args, kwargs
+        try:
+            return self.normalize(args, kwargs)
+        except TypeError:
+            return args, kwargs
+
+    def __bind(self, args: Tuple[Any, ...], kwargs: Mapping[str, Any]) -> Tuple[Tuple[Any, ...], Dict[str, Any]]:
+        bound = self.__signature.bind(*args, **kwargs)
+        bound.apply_defaults()
+        return bound.args, bound.kwargs
+
+
+@functools.lru_cache(maxsize=1024)
+def _normalizer_for_signature(signature: inspect.Signature) -> Optional[SignatureNormalizer]:
+    if all(parameter.kind in _VAR_KINDS for parameter in signature.parameters.values()):
+        # Nothing to normalise, e.g. the `(*args, **kwargs)` of a mock specced with a class.
+        return None
+    return SignatureNormalizer(signature)
+
+
+def normalizer_for(mock: Any) -> Optional[SignatureNormalizer]:
+    if not isinstance(mock, unittest.mock.NonCallableMock):
+        # `create_autospec` of a function returns a function, calling the mock it holds.
+        mock = getattr(mock, "__dict__", {}).get("mock")
+        if not isinstance(mock, unittest.mock.NonCallableMock):
+            return None
+
+    signature = mock.__dict__.get("_spec_signature")
+    if signature is None:
+        return None
+    try:
+        return _normalizer_for_signature(signature)
+    except TypeError:
+        # Signatures with unhashable defaults, like `options=[]`, can't be cached.
+        return _normalizer_for_signature.__wrapped__(signature)
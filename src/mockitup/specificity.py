@@ -0,0 +1,155 @@
+"""
+Dispatching calls to their most specific registration, instead of their first.
+
+The registrations of a mock are compiled into a decision tree keyed on the number of positional arguments and the
+names of the named ones, then on each positional argument in turn, then on each named argument by name in alphabetical
+order. At every level the branches are tried from the most specific to the least:
+
+1. the exact value, found by a hash lookup (or compared, when it isn't hashable),
+2. hamcrest matchers, in registration order,
+3. `ANY_ARG`.
+
+A call dispatches to the first registration found this way. `ANY_ARGS` registrations are tried last, and ties always
+go to the earliest registration.
+"""
+from typing import Any, Dict, List, Mapping, Optional, Tuple
+
+from .arguments_matcher import _EQUAL, _SKIP, ArgumentsMatcher, ArgumentsMatchResult, _Check, _run_check
+from . import composer
+from .composer import MockItUpSideEffect, _MockType
+
+# The number of positional arguments, and the names of the named ones in alphabetical order.
+_Shape = Tuple[int, Tuple[str, ...]]
+
+
+class _Node:
+    __slots__ = ("exact", "checked", "any", "leaves")
+
+    def __init__(self) -> None:
+        self.exact: Dict[Any, _Node] = {}
+        # Unhashable exact values and matchers, tried in the order they were registered.
+        self.checked: List[Tuple[_Check, _Node]] = []
+        self.any: Optional[_Node] = None
+        # Positions of the registrations ending at this node, which all have the same checks, earliest first.
+        self.leaves: List[int] = []
+
+    def child(self, check: _Check) -> "_Node":
+        kind, value = check
+        if kind is _SKIP:
+            if self.any is None:
+                self.any = _Node()
+            return self.any
+
+        if kind is _EQUAL:
+            try:
+                node = self.exact.get(value)
+                if node is None:
+                    node = self.exact[value] = _Node()
+                return node
+            except TypeError:
+                pass
+
+        for registered_check, node in self.checked:
+            if registered_check[0] is kind and registered_check[1] is value:
+                return node
+        node = _Node()
+        self.checked.append((check, node))
+        return node
+
+
+class SpecificitySideEffect(MockItUpSideEffect):
+    """
+    Dispatches calls to their most specific matching registration, looking it up in a decision tree.
+    A lookup costs about the number of arguments, however many registrations there are.
+    """
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        self.__shapes: Dict[_Shape, _Node] = {}
+        self.__any_args: List[int] = []
+
+    def _index(self, position: int, arguments: ArgumentsMatcher) -> None:
+        if arguments._any_args:
+            self.__any_args.append(position)
+            return
+
+        named_checks = sorted(arguments._named_checks, key=_by_name)
+        shape = (len(arguments._positional_checks), tuple(name for name, _ in named_checks))
+        node = self.__shapes.get(shape)
+        if node is None:
+            node = self.__shapes[shape] = _Node()
+        for check in arguments._positional_checks:
+            node = node.child(check)
+        for _, check in named_checks:
+            node = node.child(check)
+        # Appending is safe for calls reading the leaves without locking, and keeps earlier registrations first.
+        node.leaves.append(position)
+
+    def _find(self, args: Tuple[Any], kwargs: Dict[str, Any]) -> Optional[Tuple[int, ArgumentsMatchResult]]:
+        names, values = _shape_and_values(args, kwargs)
+        node = self.__shapes.get((len(args), names))
+        if node is not None:
+            found = self.__search(node, values, args, kwargs, 0)
+            if found is not None:
+                return found
+
+        for position in self.__any_args:
+            match_results = self._arguments_at(position).matches(args, kwargs)
+            if match_results:
+                return position, match_results
+        return None
+
+    def __search(self, node: _Node, values: Tuple[Any, ...], args: Tuple[Any], kwargs: Dict[str, Any],
+                 depth: int) -> Optional[Tuple[int, ArgumentsMatchResult]]:
+        if depth == len(values):
+            for position in node.leaves:
+                match_results = self._arguments_at(position).matches(args, kwargs)
+                if match_results:
+                    return position, match_results
+            return None
+
+        provided = values[depth]
+        try:
+            exact = node.exact.get(provided)
+        except TypeError:
+            # Unhashable values may still compare equal to hashed ones, like a set to a frozenset.
+            exact = None
+            for registered, branch in node.exact.items():
+                if _run_check((_EQUAL, registered), provided):
+                    found = self.__search(branch, values, args, kwargs, depth + 1)
+                    if found is not None:
+                        return found
+        if exact is not None:
+            found = self.__search(exact, values, args, kwargs, depth + 1)
+            if found is not None:
+                return found
+
+        for check, checked in node.checked:
+            if _run_check(check, provided):
+                found = self.__search(checked, values, args, kwargs, depth + 1)
+                if found is not None:
+                    return found
+
+        if node.any is not None:
+            return self.__search(node.any, values, args, kwargs, depth + 1)
+        return None
+
+
+def _by_name(named_check: Tuple[str, _Check]) -> str:
+    return named_check[0]
+
+
+def _shape_and_values(args: Tuple[Any, ...], kwargs: Mapping[str, Any]) -> Tuple[Tuple[str, ...], Tuple[Any, ...]]:
+    if not kwargs:
+        return (), args
+    names = tuple(sorted(kwargs))
+    return names, args + tuple(kwargs[name] for name in names)
+
+
+def dispatch_by_specificity(mock: _MockType) -> _MockType:
+    """
+    Makes `mock` and its children dispatch their calls to their most specific registration, rather than their first.
+    Registrations they already have are kept.
+    """
+    composer._use_side_effect_class(mock, SpecificitySideEffect)
+    return mock
@@ -0,0 +1,104 @@
+"""
+Stub mode: dispatching without any verification, for mocks standing in for services in performance harnesses.
+
+Calls of allowances made of exact, hashable values are compiled into a single dict lookup, followed by the action.
+Other calls are dispatched like they are by default, through the index of exact values and the registrations that
+can't be indexed before it, so calls of expectations are still counted.
+"""
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Hashable, Iterator, Mapping, Optional, Set, cast
+
+from . import composer
+from .actions import ArgumentsActionResult
+from .arguments_matcher import _NO_KWARGS, ArgumentsMatcher
+from .composer import MockItUpSideEffect, _ignore_report, _MockType, _Registration, \
+    _use_side_effect_class
+from .signatures import SignatureNormalizer
+
+
+class StubModeSideEffect(MockItUpSideEffect):
+    """
+    Dispatches like `MockItUpSideEffect`, without its bookkeeping.
+
+    Allowances of exact, hashable values registered before any wildcard or matcher registration are looked up in a
+    table from call arguments to the `provide_result` of their action. Calls of other registrations are dispatched by
+    `MockItUpSideEffect`, as the registrations before them may match their calls first.
+    """
+
+    def __init__(self, normalizer: Optional[SignatureNormalizer] = None) -> None:
+        super().__init__(normalizer)
+        self.__normalizer = normalizer
+        self.__compile()
+
+    def __compile(self) -> None:
+        self.__returns: Dict[Hashable, Callable[[], Any]] = {}
+        self.__keys: Set[Hashable] = set()
+        self.__only_indexed = True
+        for registration in self.registrations():
+            self.__compile_registration(registration)
+
+    def share(self, replacements: Optional[Mapping[int, _Registration]] = None) -> "StubModeSideEffect":
+        shared = cast(StubModeSideEffect, super().share(replacements))
+        shared.__compile()
+        return shared
+
+    def _index(self, position: int, arguments: ArgumentsMatcher) -> None:
+        super()._index(position, arguments)
+        self.__compile_registration(self._registration_at(position))
+
+    def __compile_registration(self, registration: _Registration) -> None:
+        arguments, action, report = registration
+        key = arguments.index_key
+        if key is None:
+            self.__only_indexed = False
+        elif key not in self.__keys:
+            # Later registrations of the same arguments are shadowed by the first one.
+            self.__keys.add(key)
+            if self.__only_indexed and report is _ignore_report and not getattr(action, "takes_arguments", False):
+                self.__returns[key] = action.provide_result
+
+    def __call__(self, *args: Any, **kwargs: Any) -> Any:
+        if self._layers:
+            return super().__call__(*args, **kwargs)
+        if self.__normalizer is not None:
+            args, kwargs = self.__normalizer.normalize(args, kwargs)
+
+        try:
+            # Inlined `call_key`.
+            provide = self.__returns.get((args, frozenset(kwargs.items()) if kwargs else _NO_KWARGS))
+        except TypeError:
+            provide = None
+        if provide is not None:
+            return provide()
+
+        position = self._position_of(args, kwargs)
+        if position is None:
+            raise self._unregistered_call(args, kwargs)
+        arguments, action, report = self._registration_at(position)
+        if report is not _ignore_report:
+            # Only expectations need the match results, to count their calls.
+            report(arguments.matches(args, kwargs))
+        if getattr(action, "takes_arguments", False):
+            return cast(ArgumentsActionResult, action).provide_result_for(args, kwargs)
+        return action.provide_result()
+
+
+def dispatch_as_stub(mock: _MockType) -> _MockType:
+    """
+    Makes `mock` and its children dispatch in stub mode, keeping the registrations they already have.
+    """
+    _use_side_effect_class(mock, StubModeSideEffect)
+    return mock
+
+
+@contextmanager
+def stub_mode() -> Iterator[None]:
+    """
+    Makes the mocks getting their first registration inside the `with` block dispatch in stub mode.
+    """
+    previous = composer._side_effect_class
+    composer._side_effect_class = StubModeSideEffect
+    try:
+        yield
+    finally:
+        composer._side_effect_class = previous
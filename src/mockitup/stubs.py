@@ -0,0 +1,109 @@
+from typing import Any, Dict, List, Optional
+from unittest.mock import _Call, call
+
+from .composer import UnregisteredCall
+from .history import _BoundedCallList
+from .pending import DeferredResult
+from .pickling import LocksArentPickled
+
+
+class FastStub(LocksArentPickled):
+    """
+    A lean stand-in for `unittest.mock.Mock`, meant to be configured with `allow()` and `expect()`.
+
+    Children are created once per attribute and calls go straight to the configured side effect.
+    Calls are only recorded into `call_args_list` when asked for with `record_calls=True`.
+
+    Unlike `unittest.mock.Mock`, stubs can be pickled, along with their registrations, to be sent to other processes.
+    """
+    __slots__ = ("side_effect", "_stub_name", "_stub_parent", "_stub_children", "_stub_calls", "_stub_composers",
+                 "__weakref__")
+
+    side_effect: Any
+    _stub_name: str
+    _stub_parent: Optional["FastStub"]
+    _stub_children: Dict[str, Any]
+    _stub_calls: Optional[List[_Call]]
+    _stub_composers: Optional[Dict[Any, Any]]
+
+    def __init__(self, name: str = "stub", *, record_calls: bool = False, parent: Optional["FastStub"] = None):
+        object.__setattr__(self, "side_effect", None)
+        object.__setattr__(self, "_stub_name", name)
+        object.__setattr__(self, "_stub_parent", parent)
+        object.__setattr__(self, "_stub_children", {})
+        object.__setattr__(self, "_stub_calls", [] if record_calls else None)
+        object.__setattr__(self, "_stub_composers", None)
+
+    def __getattr__(self, name: str) -> Any:
+        # Dunder lookups (made by `copy`, `pickle`, `inspect`...) shouldn't spawn children.
+        if name.startswith("__") and name.endswith("__"):
+            raise AttributeError(name)
+
+        children = self._stub_children
+        try:
+            return children[name]
+        except KeyError:
+            calls = self._stub_calls
+            child = children[name] = type(self)(name, record_calls=calls is not None, parent=self)
+            if isinstance(calls, _BoundedCallList):
+                object.__setattr__(child, "_stub_calls", _BoundedCallList(calls.limit))
+            return child
+
+    def __getstate__(self) -> Dict[str, Any]:
+        state = super().__getstate__()
+        # Composers refer to the suites they register to, and are created again when needed.
+        state["_stub_composers"] = None
+        return state
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        if name == "side_effect":
+            object.__setattr__(self, name, value)
+        else:
+            self._stub_children[name] = value
+
+    def __call__(self, *args: Any, **kwargs: Any) -> Any:
+        calls = self._stub_calls
+        if calls is not None:
+            calls.append(call(*args, **kwargs))
+
+        side_effect = self.side_effect
+        if side_effect is None:
+            raise UnregisteredCall([])
+        return side_effect(*args, **kwargs)
+
+    def __repr__(self) -> str:
+        return f"<{type(self).__name__} name='{self._extract_mock_name()}' id='{id(self)}'>"
+
+    def _extract_mock_name(self) -> str:
+        names = []
+        stub: Optional[FastStub] = self
+        while stub is not None:
+            names.append(stub._stub_name)
+            stub = stub._stub_parent
+        return ".".join(reversed(names))
+
+    @property
+    def call_args_list(self) -> List[_Call]:
+        if self._stub_calls is None:
+            # Not an `AttributeError`, which would make `__getattr__` spawn a child instead.
+            raise ValueError(f"Calls of '{self._extract_mock_name()}' aren't recorded, "
+                             f"create it with `record_calls=True`")
+        return self._stub_calls
+
+    @property
+    def call_count(self) -> int:
+        return len(self.call_args_list)
+
+
+class AsyncFastStub(FastStub):
+    """
+    `FastStub` counterpart of `unittest.mock.AsyncMock`, calling it returns an awaitable.
+    Awaiting it awaits deferred results as well, like those of `returns_pending()` or `after()` registrations.
+    """
+    __slots__ = ()
+
+    async def __call__(self, *args: Any, **kwargs: Any) -> Any:
+        result = FastStub.__call__(self, *args, **kwargs)
+        if isinstance(result, DeferredResult):
+            return await result
+        return result
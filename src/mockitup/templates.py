@@ -0,0 +1,162 @@
+"""
+Allowances and expectations scripted once, and applied to many mocks.
+
+A template compiles the registrations of every attribute path into a dispatch table, which mocks share instead of
+building their own. Only what's kept per mock is copied: the actions returning multiple or cached values, which
+remember the value they're at or what they've built, and the expectations, which count the calls of their own mock.
+"""
+import functools
+from typing import Any, Dict, List, NamedTuple, Optional
+
+from .actions import ActionReturnsCached, ActionReturnsMultipleValues, ActionReturnsPending, BaseActionResult
+from .arguments_matcher import ArgumentsMatcher
+from .cardinality import AT_LEAST_ONCE, Cardinality
+from .composer import ExpectationSuite, MockComposer, MockItUpSideEffect, _ignore_report, _MockType, _TableRows, \
+    _install_side_effect
+
+# Actions with state of their own, which every mock gets a fresh copy of.
+_PER_MOCK_ACTIONS = (ActionReturnsMultipleValues, ActionReturnsCached)
+
+
+class _TemplateNode:
+    """
+    Stands in for a mock while scripting a template, remembering the attribute path it was reached by.
+    """
+
+    def __init__(self, attribute_path: str) -> None:
+        self.attribute_path = attribute_path
+
+    def __getattr__(self, name: str) -> "_TemplateNode":
+        if name.startswith("__"):
+            raise AttributeError(name)
+        return _TemplateNode(f"{self.attribute_path}.{name}" if self.attribute_path else name)
+
+
+def _root() -> Any:
+    # Typed as `Any`, as composers only accept mocks.
+    return _TemplateNode("")
+
+
+class _TemplateEntry(NamedTuple):
+    arguments: ArgumentsMatcher
+    action: BaseActionResult
+    # `None` for allowances.
+    cardinality: Optional[Cardinality]
+
+
+class _PerMockEntry(NamedTuple):
+    attribute_path: str
+    position: int
+    entry: _TemplateEntry
+
+
+class MockTemplate:
+    """
+    A script of allowances and expectations, made with `allow()` and `expect()` like on a mock.
+    """
+
+    def __init__(self) -> None:
+        self.__entries: Dict[str, List[_TemplateEntry]] = {}
+        self.__compiled: Optional[CompiledTemplate] = None
+
+    def allow(self) -> MockComposer:
+        return MockComposer(_root(), self.__register_allowance, table_cb=self.__register_allowance_table)
+
+    def expect(self) -> MockComposer:
+        return MockComposer(_root(), self.__register_expectation, table_cb=self.__register_expectation_table)
+
+    def compile(self) -> "CompiledTemplate":
+        """
+        Freezes the template. Scripting it any further raises a `TypeError`.
+        """
+        if self.__compiled is None:
+            self.__compiled = CompiledTemplate(self.__entries)
+        return self.__compiled
+
+    def __register_allowance(self, mock: Any, arguments: ArgumentsMatcher, action: BaseActionResult,
+                             cardinality: Optional[Cardinality] = None) -> None:
+        if cardinality is not None:
+            raise TypeError("Allowances don't count calls, use `expect()` instead")
+        self.__add(mock, _TemplateEntry(arguments, action, None))
+
+    def __register_expectation(self, mock: Any, arguments: ArgumentsMatcher, action: BaseActionResult,
+                               cardinality: Optional[Cardinality] = None) -> None:
+        self.__add(mock, _TemplateEntry(arguments, action, cardinality or AT_LEAST_ONCE))
+
+    def __register_allowance_table(self, mock: Any, rows: _TableRows) -> None:
+        for arguments, action in rows:
+            self.__add(mock, _TemplateEntry(arguments, action, None))
+
+    def __register_expectation_table(self, mock: Any, rows: _TableRows) -> None:
+        for arguments, action in rows:
+            self.__add(mock, _TemplateEntry(arguments, action, AT_LEAST_ONCE))
+
+    def __add(self, node: Any, entry: _TemplateEntry) -> None:
+        if self.__compiled is not None:
+            raise TypeError("The template was already compiled")
+        self.__entries.setdefault(node.attribute_path, []).append(entry)
+
+
+class CompiledTemplate:
+    """
+    The frozen dispatch tables of a template. Applying it costs a side effect per attribute path, plus a copy of the
+    registrations of the paths with expectations or actions with state of their own.
+
+    Calls of templated mocks are matched against their arguments as registered, even for mocks with a spec.
+    """
+
+    def __init__(self, entries: Dict[str, List[_TemplateEntry]]) -> None:
+        self.__prototypes: Dict[str, MockItUpSideEffect] = {}
+        self.__per_mock: List[_PerMockEntry] = []
+
+        for attribute_path, path_entries in entries.items():
+            prototype = MockItUpSideEffect()
+            prototype.register_many((entry.arguments, entry.action, _ignore_report) for entry in path_entries)
+            self.__prototypes[attribute_path] = prototype
+            self.__per_mock.extend(
+                _PerMockEntry(attribute_path, position, entry) for position, entry in enumerate(path_entries)
+                if entry.cardinality is not None
+                or isinstance(entry.action, (*_PER_MOCK_ACTIONS, ActionReturnsPending)))
+
+    @property
+    def has_expectations(self) -> bool:
+        return any(per_mock.entry.cardinality is not None for per_mock in self.__per_mock)
+
+    def apply(self, mock: _MockType, suite: Optional[ExpectationSuite] = None) -> _MockType:
+        """
+        Registers the template on `mock`, adding its expectations to `suite`.
+        The attributes registered to must not have been registered to before.
+        """
+        if suite is None and self.has_expectations:
+            raise TypeError("The template has expectations, so it must be applied with a suite")
+
+        targets = {
+            attribute_path: _resolve(mock, attribute_path)
+            for attribute_path in self.__prototypes
+        }
+        for attribute_path, target in targets.items():
+            if target.side_effect is not None:
+                raise ValueError(f"Mock '{target._extract_mock_name()}' was already registered to")
+
+        replacements: Dict[str, Dict[int, Any]] = {}
+        for attribute_path, position, entry in self.__per_mock:
+            target = targets[attribute_path]
+            action = entry.action
+            if isinstance(action, ActionReturnsPending):
+                action = action.for_mock(mock)
+            elif isinstance(action, _PER_MOCK_ACTIONS):
+                action = action.fresh()
+            report = _ignore_report
+            if suite is not None and entry.cardinality is not None:
+                report = suite._track_expectation(target, entry.arguments, entry.cardinality)
+            replacements.setdefault(attribute_path, {})[position] = (entry.arguments, action, report)
+
+        for attribute_path, target in targets.items():
+            _install_side_effect(target, self.__prototypes[attribute_path].share(replacements.get(attribute_path)))
+        return mock
+
+
+def _resolve(mock: Any, attribute_path: str) -> Any:
+    if not attribute_path:
+        return mock
+    return functools.reduce(getattr, attribute_path.split("."), mock)
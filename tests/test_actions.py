@@ -0,0 +1,133 @@
+from unittest.mock import Mock
+
+import pytest
+from asyncmock import AsyncMock
+
+from mockitup import ANY_ARG, MockTemplate, allow
+from mockitup.instrumentation import instrumented
+
+
+def _counting(build):
+    calls = []
+
+    def factory(*args, **kwargs):
+        calls.append((args, kwargs))
+        return build(*args, **kwargs)
+
+    return factory, calls
+
+
+def test_returns_lazily_builds_on_every_call():
+    factory, calls = _counting(lambda: object())
+    mock = Mock()
+    allow(mock).load().returns_lazily(factory)
+    assert not calls
+
+    assert mock.load() is not mock.load()
+    assert len(calls) == 2
+
+
+def test_returns_cached_builds_once():
+    factory, calls = _counting(lambda: object())
+    mock = Mock()
+    allow(mock).load().returns_cached(factory)
+    allow(mock).unused().returns_cached(factory)
+    assert not calls
+
+    assert mock.load() is mock.load()
+    assert len(calls) == 1
+
+
+def test_returns_cached_per_arguments():
+    factory, calls = _counting(lambda key, scale=1: [key] * scale)
+    mock = Mock()
+    allow(mock).load(ANY_ARG, scale=ANY_ARG).returns_cached(factory, per_arguments=True)
+
+    assert mock.load(1, scale=2) == [1, 1]
+    assert mock.load(1, scale=2) is mock.load(1, scale=2)
+    assert mock.load(2, scale=1) == [2]
+    assert calls == [((1, ), {"scale": 2}), ((2, ), {"scale": 1})]
+
+
+def test_returns_cached_per_arguments_builds_unhashable_calls_every_time():
+    factory, calls = _counting(lambda items: len(items))
+    mock = Mock()
+    allow(mock).count(ANY_ARG).returns_cached(factory, per_arguments=True)
+
+    assert mock.count([1, 2]) == 2
+    assert mock.count([1, 2]) == 2
+    assert len(calls) == 2
+
+
+def test_returns_cached_per_arguments_while_instrumented():
+    with instrumented():
+        mock = Mock()
+        allow(mock).double(ANY_ARG).returns_cached(lambda value: value * 2, per_arguments=True)
+
+    assert mock.double(4) == 8
+
+
+def test_templates_cache_per_mock():
+    template = MockTemplate()
+    template.allow().load().returns_cached(object)
+    compiled = template.compile()
+    first, second = compiled.apply(Mock()), compiled.apply(Mock())
+
+    assert first.load() is first.load()
+    assert first.load() is not second.load()
+
+
+def test_yields_stream_builds_a_fresh_stream_per_call():
+    factory, calls = _counting(lambda: (page for page in range(3)))
+    mock = Mock()
+    allow(mock).pages().yields_stream(factory)
+    assert not calls
+
+    assert list(mock.pages()) == [0, 1, 2]
+    assert list(mock.pages()) == [0, 1, 2]
+    assert len(calls) == 2
+
+
+def test_yields_stream_is_lazy():
+    consumed = []
+
+    def pages():
+        for page in range(1_000_000):
+            consumed.append(page)
+            yield page
+
+    mock = Mock()
+    allow(mock).pages().yields_stream(pages)
+
+    stream = mock.pages()
+    assert next(stream) == 0
+    assert consumed == [0]
+
+
+def test_yields_stream_in_chunks():
+    mock = Mock()
+    allow(mock).rows().yields_stream(lambda: range(5), chunk_size=2)
+
+    assert list(mock.rows()) == [[0, 1], [2, 3], [4]]
+
+
+@pytest.mark.anyio
+async def test_yields_async_stream():
+    mock = Mock()
+    allow(mock).rows().yields_async_stream(lambda: range(3))
+
+    assert [row async for row in mock.rows()] == [0, 1, 2]
+    assert [row async for row in mock.rows()] == [0, 1, 2]
+
+
+@pytest.mark.anyio
+async def test_yields_async_stream_from_async_iterables_in_chunks():
+
+    async def rows():
+        for row in range(5):
+            yield row
+
+    mock = AsyncMock()
+    allow(mock).rows().yields_async_stream(rows, chunk_size=3)
+
+    assert [chunk async for chunk in await mock.rows()] == [[0, 1, 2], [3, 4]]
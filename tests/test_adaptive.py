@@ -0,0 +1,97 @@
+from unittest.mock import Mock
+
+import pytest
+from asyncmock import AsyncMock
+from hamcrest import contains_string, greater_than, instance_of
+
+from mockitup import ANY_ARG, ANY_ARGS, allow, dispatch_adaptively
+from mockitup.composer import MockItUpSideEffect, UnregisteredCall
+
+
+def test_hot_disjoint_registrations_move_forward():
+    mock = dispatch_adaptively(Mock())
+    for key in range(50):
+        allow(mock).lookup([key]).returns(key)
+
+    for _ in range(10):
+        assert mock.lookup([49]) == 49
+    cold_depth = mock.lookup.side_effect.stats.average_scan_depth
+
+    for _ in range(200):
+        assert mock.lookup([49]) == 49
+    stats = mock.lookup.side_effect.stats
+    assert stats.disjoint_registrations == 50
+    assert stats.reorders > 0
+    assert stats.average_scan_depth < cold_depth / 2
+
+
+def test_overlapping_registrations_keep_their_order():
+    mock = dispatch_adaptively(Mock())
+    allow(mock).lookup(instance_of(int)).returns("int")
+    allow(mock).lookup(greater_than(10)).returns("large")
+
+    for _ in range(100):
+        assert mock.lookup(20) == "int"
+    assert mock.lookup.side_effect.stats.disjoint_registrations == 1
+
+
+def test_different_exact_values_are_disjoint():
+    mock = dispatch_adaptively(Mock())
+    allow(mock).lookup(2, ANY_ARG).returns("two")
+    allow(mock).lookup(1, contains_string("a")).returns("one")
+
+    for _ in range(100):
+        assert mock.lookup(1, "abc") == "one"
+    assert mock.lookup(2, "abc") == "two"
+    assert mock.lookup.side_effect.stats.disjoint_registrations == 2
+
+
+def test_exact_values_rejected_by_matchers_keep_their_order():
+    mock = dispatch_adaptively(Mock())
+    allow(mock).f(0).returns("exact")
+    allow(mock).f(instance_of(float)).returns("float")
+
+    for _ in range(100):
+        assert mock.f(0.0) == "exact"
+    assert mock.f.side_effect.stats.disjoint_registrations == 0
+
+
+def test_wildcards_after_any_args_stay_in_order():
+    mock = dispatch_adaptively(Mock())
+    allow(mock).lookup(ANY_ARGS).returns("any")
+    allow(mock).lookup([1]).returns("one")
+
+    assert mock.lookup([1]) == "any"
+
+
+def test_declared_disjoint_registrations_are_all_reordered():
+    mock = dispatch_adaptively(Mock(), disjoint=True)
+    allow(mock).lookup(instance_of(str)).returns("str")
+    allow(mock).lookup(instance_of(int)).returns("int")
+
+    for _ in range(100):
+        assert mock.lookup(1) == "int"
+    assert mock.lookup("a") == "str"
+    assert mock.lookup.side_effect.stats.disjoint_registrations == 2
+    with pytest.raises(UnregisteredCall):
+        mock.lookup(1.5)
+
+
+def test_keeps_existing_registrations():
+    mock = Mock()
+    allow(mock).lookup([1]).returns("one")
+    dispatch_adaptively(mock)
+    allow(mock).lookup([2]).returns("two")
+
+    assert mock.lookup([1]) == "one"
+    assert mock.lookup([2]) == "two"
+
+
+def test_other_mocks_are_unaffected():
+    opted_in = dispatch_adaptively(Mock())
+    other = AsyncMock()
+    allow(other).__call__(1).returns("one")
+    allow(other).lookup([1]).returns("one")
+
+    assert opted_in is not None
+    assert type(other.lookup.side_effect) is MockItUpSideEffect
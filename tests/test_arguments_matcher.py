@@ -0,0 +1,92 @@
+from unittest.mock import Mock
+
+import pytest
+from hamcrest import equal_to, greater_than, instance_of, same_instance
+from mockitup import ANY_ARG, ANY_ARGS, allow
+from mockitup.arguments_matcher import ArgumentsMatcher, MatchOutcome
+from mockitup.composer import ExpectationNotFulfilled, UnregisteredCall, expectation_suite
+
+
+class _CountsRendering:
+
+    def __init__(self) -> None:
+        self.renders = 0
+
+    def __str__(self) -> str:
+        self.renders += 1
+        return "payload"
+
+    __repr__ = __str__
+
+
+def test_failed_match_carries_outcome_and_position():
+    matcher = ArgumentsMatcher((1, 2), {"key": 3})
+
+    result = matcher.matches((1, 5), {"key": 3})
+    assert not result
+    assert result.outcome is MatchOutcome.POSITIONAL_MISMATCH
+    assert result.position == 1
+    assert result.explanation == "Positional arguments at index 1 didn't match (registered: '2', provided: '5')"
+
+    result = matcher.matches((1, 2), {"key": 4})
+    assert result.outcome is MatchOutcome.NAMED_MISMATCH
+    assert result.explanation == "Named arguments at key 'key' didn't match (registered: '3', provided: '4')"
+
+
+def test_explanations_are_rendered_only_when_read():
+    payload = _CountsRendering()
+    mock = Mock()
+    allow(mock).get(1).returns("one")
+    allow(mock).get(2).returns("two")
+
+    with pytest.raises(UnregisteredCall) as raised:
+        mock.get(payload)
+    assert payload.renders == 0
+
+    message = str(raised.value)
+    assert payload.renders == 2
+    assert message == "\n".join([
+        "Failed all arguments matching, can't finish call:",
+        " - Positional arguments at index 0 didn't match (registered: '1', provided: 'payload')",
+        " - Positional arguments at index 0 didn't match (registered: '2', provided: 'payload')",
+    ])
+
+
+def test_not_fulfilled_expectation_message():
+    mock = Mock()
+    with pytest.raises(ExpectationNotFulfilled) as raised:
+        with expectation_suite() as es:
+            es.expect(mock).get(1).returns(None)
+
+    assert str(raised.value) == "Expected mock 'mock.get' to be called with (args: '(1,)', kwargs: '{}'), but wasn't"
+
+
+@pytest.mark.parametrize("registered, provided, matched", [
+    ((equal_to(5), ), (5, ), True),
+    ((equal_to(5), ), (6, ), False),
+    ((instance_of(int), ), (5, ), True),
+    ((instance_of(int), ), ("5", ), False),
+    ((greater_than(5), ), (6, ), True),
+    ((greater_than(5), ), (5, ), False),
+    ((ANY_ARG, 2), (1, 2), True),
+    ((ANY_ARG, 2), (1, 3), False),
+    ((ANY_ARGS, ), (1, 2, 3), True),
+])
+def test_compiled_checks(registered, provided, matched):
+    assert bool(ArgumentsMatcher(registered, {}).matches(provided, {})) is matched
+
+
+def test_same_instance_matcher():
+    value = [1]
+    matcher = ArgumentsMatcher((same_instance(value), ), {})
+
+    assert matcher.matches((value, ), {})
+    assert not matcher.matches(([1], ), {})
+
+
+def test_named_only_registration():
+    matcher = ArgumentsMatcher((), {"a": 1, "b": 2})
+
+    assert matcher.matches((), {"b": 2, "a": 1})
+    assert matcher.matches((), {"a": 1, "c": 2}).outcome is MatchOutcome.NAMES_MISMATCH
+    assert matcher.matches((1, ), {"a": 1}).outcome is MatchOutcome.NAMES_MISMATCH
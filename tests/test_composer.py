@@ -2,8 +2,9 @@ from unittest.mock import MagicMock, Mock
 
 import pytest
 from hamcrest import equal_to, greater_than
-from mockitup import ANY_ARG, allow
-from mockitup.composer import ExpectationNotMet, MockComposer, MockResponseProxy, expectation_suite
+from mockitup import ANY_ARG, CallHistory, allow, returns_table
+from mockitup.composer import ExpectationNotFulfilled, ExpectationNotMet, ExpectationOutOfOrder, MockComposer, \
+    MockResponseProxy, UnregisteredCall, expectation_suite
 
 
 def test_compose_allows_nesting():
@@ -126,3 +127,256 @@ def test_expect_ensures_order():
             mock.get("one")
             mock.get_three()
             mock.get("two")
+
+
+def test_first_registration_wins_over_indexed_ones():
+    mock = Mock()
+    allow(mock).get(ANY_ARG).returns("wildcard")
+    allow(mock).get(1).returns("exact")
+    allow(mock).get(2).returns("exact")
+    allow(mock).get(2).returns("shadowed")
+
+    assert mock.get(1) == "wildcard"
+
+    mock = Mock()
+    allow(mock).get(1).returns("exact")
+    allow(mock).get(ANY_ARG).returns("wildcard")
+
+    assert mock.get(1) == "exact"
+    assert mock.get(2) == "wildcard"
+
+
+def test_many_exact_registrations():
+    mock = Mock()
+    for key in range(1000):
+        allow(mock).lookup(key, flag=key % 2 == 0).returns(key * 2)
+
+    assert mock.lookup(999, flag=False) == 1998
+    assert mock.lookup(0, flag=True) == 0
+    with pytest.raises(UnregisteredCall):
+        mock.lookup(999, flag=True)
+
+
+def test_unhashable_arguments():
+    mock = Mock()
+    allow(mock).get([1, 2]).returns("list")
+    allow(mock).get({"a": 1}).returns("dict")
+
+    assert mock.get([1, 2]) == "list"
+    assert mock.get({"a": 1}) == "dict"
+    with pytest.raises(UnregisteredCall):
+        mock.get([1])
+
+
+def test_unhashable_arguments_equal_to_indexed_ones():
+    mock = Mock()
+    allow(mock).get(frozenset({1})).returns("set")
+
+    assert mock.get({1}) == "set"
+
+
+def test_out_of_order_is_reported_as_such():
+    with pytest.raises(ExpectationOutOfOrder):
+        with expectation_suite(ordered=True) as es:
+            mock = Mock()
+            es.expect(mock).first().returns()
+            es.expect(mock).second().returns()
+
+            mock.second()
+            mock.first()
+
+
+def test_fail_fast_raises_at_offending_call():
+    with pytest.raises(ExpectationOutOfOrder):
+        with expectation_suite(ordered=True, fail_fast=True) as es:
+            mock = Mock()
+            es.expect(mock).first().returns()
+            es.expect(mock).second().returns()
+            es.expect(mock).third().returns()
+
+            mock.first()
+            with pytest.raises(ExpectationOutOfOrder, match="'mock.third'.*at step 1, but was expected at step 2"):
+                mock.third()
+            # Even if the code under test swallows the error, the suite still fails.
+
+
+def test_fail_fast_in_order():
+    with expectation_suite(ordered=True, fail_fast=True) as es:
+        mock = Mock()
+        es.expect(mock).first().returns(1)
+        es.expect(mock).second().returns(2)
+
+        assert mock.first() == 1
+        assert mock.second() == 2
+
+    with pytest.raises(ExpectationNotFulfilled):
+        with expectation_suite(ordered=True, fail_fast=True) as es:
+            es.expect(mock).first().returns(1)
+
+
+def test_pending_expectations():
+    with expectation_suite() as es:
+        mock = Mock()
+        es.expect(mock).first().returns()
+        es.expect(mock).second().returns()
+        assert es.pending() == 2
+
+        mock.first()
+        mock.first()
+        assert es.pending() == 1
+
+        mock.second()
+        assert es.pending() == 0
+
+
+def test_call_count_expectations():
+    with expectation_suite() as es:
+        mock = Mock()
+        es.expect(mock).get(1).times(2).returns("one")
+        es.expect(mock).get(2).at_least(2).returns("two")
+        es.expect(mock).get(3).at_most(1).returns("three")
+        es.expect(mock).get(4).never()
+
+        for _ in range(2):
+            assert mock.get(1) == "one"
+        for _ in range(3):
+            assert mock.get(2) == "two"
+
+
+@pytest.mark.parametrize("calls, message", [
+    (1, "Expected mock 'mock.get' to be called exactly 2 times with (args: '(1,)', kwargs: '{}'), "
+     "but was called 1 time(s)"),
+    (3, "Expected mock 'mock.get' to be called exactly 2 times with (args: '(1,)', kwargs: '{}'), "
+     "but was called 3 time(s)"),
+])
+def test_call_count_failures_name_counts(calls, message):
+    mock = Mock()
+    with pytest.raises(ExpectationNotFulfilled) as raised:
+        with expectation_suite() as es:
+            es.expect(mock).get(1).times(2).returns("one")
+            for _ in range(calls):
+                mock.get(1)
+
+    assert str(raised.value) == message
+    assert raised.value.calls == calls
+
+
+def test_never_fails_fast():
+    mock = Mock()
+    with pytest.raises(ExpectationNotFulfilled, match="to be called never"):
+        with expectation_suite(fail_fast=True) as es:
+            es.expect(mock).delete().never()
+            with pytest.raises(ExpectationNotFulfilled):
+                mock.delete()
+
+
+def test_counted_expectations_in_order():
+    with expectation_suite(ordered=True, fail_fast=True) as es:
+        mock = Mock()
+        es.expect(mock).connect().returns()
+        es.expect(mock).send(ANY_ARG).times(3).returns()
+        es.expect(mock).close().returns()
+
+        mock.connect()
+        for chunk in range(3):
+            mock.send(chunk)
+        mock.close()
+
+
+def test_fail_fast_before_earlier_expectations_reach_their_counts():
+    with pytest.raises(ExpectationOutOfOrder):
+        with expectation_suite(ordered=True, fail_fast=True) as es:
+            mock = Mock()
+            es.expect(mock).send(ANY_ARG).times(2).returns()
+            es.expect(mock).close().returns()
+
+            mock.send(1)
+            with pytest.raises(ExpectationOutOfOrder, match="'mock.close'.*after the expectation of mock 'mock.send'"):
+                mock.close()
+
+
+def test_allowances_dont_count_calls():
+    with pytest.raises(TypeError):
+        allow(Mock()).get().times(2).returns(None)
+
+
+def test_returns_table_from_mapping():
+    mock = Mock()
+    returns_table(allow(mock).lookup, {n: n * n for n in range(100)})
+
+    assert mock.lookup(7) == 49
+    assert mock.lookup(99) == 9801
+    with pytest.raises(UnregisteredCall):
+        mock.lookup(100)
+
+
+def test_returns_table_from_rows_generator():
+    mock = Mock()
+    returns_table(allow(mock).get, (((n, ), {"default": None}, str(n)) for n in range(3)))
+
+    assert mock.get(2, default=None) == "2"
+    with pytest.raises(UnregisteredCall):
+        mock.get(2)
+
+
+def test_returns_table_keeps_earlier_registrations_first():
+    mock = Mock()
+    allow(mock).get(ANY_ARG).returns("any")
+    returns_table(allow(mock).get, {1: "one"})
+
+    assert mock.get(1) == "any"
+
+
+def test_mocked_methods_named_returns_table():
+    mock = Mock()
+    allow(mock).returns_table(1).returns("mocked")
+
+    assert mock.returns_table(1) == "mocked"
+
+
+def test_expected_table_rows_must_each_be_called():
+    mock = Mock()
+    with pytest.raises(ExpectationNotMet):
+        with expectation_suite() as es:
+            returns_table(es.expect(mock).get, {1: "one", 2: "two"})
+            assert mock.get(1) == "one"
+
+
+def test_child_composers_are_cached():
+    mock = Mock()
+    composer = allow(mock)
+
+    assert composer.a.b is composer.a.b
+    assert allow(mock).a.b is composer.a.b
+    mock.a = Mock()
+    composer.a.b().returns("new")
+    assert mock.a.b() == "new"
+
+
+def test_child_composer_caches_stay_bounded():
+    mock = Mock()
+    for calls in range(1, 100):
+        allow(mock, history=CallHistory.last(calls)).get(calls).returns(calls)
+        with expectation_suite() as es:
+            es.expect(mock).get(-calls).returns(0)
+            mock.get(-calls)
+        allow(mock).get(1).returns(1)
+
+    assert list(mock.__dict__["_mockitup_composers"]) == ["get"]
+
+
+def test_real_objects_composed_through_are_left_alone():
+    mock = Mock()
+    mock.real = ValueError()
+    allow(mock).real.args
+
+    assert "_mockitup_composers" not in vars(mock.real)
+
+
+def test_child_composers_are_cached_per_callback():
+    mock = Mock()
+    allow(mock).get(1).returns("allowed")
+    with expectation_suite() as es:
+        assert es.expect(mock).get is not allow(mock).get
+        es.expect(mock).get(2).returns("expected")
+        assert mock.get(2) == "expected"
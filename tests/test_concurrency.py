@@ -0,0 +1,92 @@
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import Mock
+
+import pytest
+from mockitup import allow, expectation_suite
+from mockitup.composer import ExpectationFulfillmentCursor
+
+_WORKERS = 32
+_CALLS_PER_WORKER = 500
+_CALLS = _WORKERS * _CALLS_PER_WORKER
+
+
+def _hammer(func):
+    """
+    Runs `func` for every index in `range(_CALLS)`, spread in chunks across all workers.
+    """
+
+    start = threading.Barrier(_WORKERS)
+
+    def worker(first):
+        start.wait()
+        return [func(index) for index in range(first, first + _CALLS_PER_WORKER)]
+
+    with ThreadPoolExecutor(_WORKERS) as executor:
+        chunks = executor.map(worker, range(0, _CALLS, _CALLS_PER_WORKER))
+        return [result for chunk in chunks for result in chunk]
+
+
+@pytest.fixture(autouse=True)
+def frequent_thread_switches():
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    yield
+    sys.setswitchinterval(interval)
+
+
+def test_cursor_never_repeats_a_step():
+    cursor = ExpectationFulfillmentCursor()
+    steps = _hammer(lambda _: cursor.next())
+
+    assert sorted(steps) == list(range(_CALLS))
+
+
+def test_multiple_values_are_each_returned_once():
+    mock = Mock()
+    allow(mock).pop().returns(*range(_CALLS))
+    values = _hammer(lambda _: mock.pop())
+
+    assert sorted(values) == list(range(_CALLS))
+
+
+def test_concurrent_registrations_are_not_lost():
+    mock = Mock()
+    _hammer(lambda key: allow(mock).get(key).returns(key))
+
+    assert _hammer(mock.get) == list(range(_CALLS))
+
+
+def test_concurrent_first_registrations_are_not_lost():
+    with ThreadPoolExecutor(_WORKERS) as executor:
+        for _ in range(100):
+            mock = Mock()
+            start = threading.Barrier(_WORKERS)
+
+            def register(key):
+                start.wait()
+                allow(mock).get(key).returns(key)
+
+            list(executor.map(register, range(_WORKERS)))
+
+            assert [mock.get(key) for key in range(_WORKERS)] == list(range(_WORKERS))
+
+
+def test_concurrent_calls_fulfill_all_expectations():
+    with expectation_suite() as es:
+        mock = Mock()
+        for key in range(_CALLS):
+            es.expect(mock).get(key).returns(key)
+
+        assert _hammer(mock.get) == list(range(_CALLS))
+
+
+def test_concurrent_expectations_get_distinct_indexes():
+    with expectation_suite() as es:
+        mock = Mock()
+        _hammer(lambda key: es.expect(mock).get(key).returns(key))
+        expectations = es._ExpectationSuite__expectations
+
+        assert [expectation.index for expectation in expectations] == list(range(_CALLS))
+        assert _hammer(mock.get) == list(range(_CALLS))
@@ -0,0 +1,81 @@
+from unittest.mock import Mock
+
+import pytest
+from hamcrest import greater_than
+from mockitup import ANY_ARG, allow, returns_table, scope
+from mockitup.composer import UnregisteredCall
+
+
+def _unregistered(call):
+    with pytest.raises(UnregisteredCall) as raised:
+        call()
+    return raised.value
+
+
+def test_only_the_closest_registrations_are_explained():
+    mock = Mock()
+    returns_table(allow(mock), ((("region", index, "v1"), {}, index) for index in range(20_000)))
+    allow(mock).get(greater_than(100)).returns("big")
+
+    error = _unregistered(lambda: mock("region", 7, "v2"))
+
+    assert len(error.failed_matches) == UnregisteredCall.limit
+    assert error.failed_matches[0].explanation == (
+        "Positional arguments at index 2 didn't match (registered: 'v1', provided: 'v2')")
+    assert error.unexplained == 20_000 - UnregisteredCall.limit
+    message = str(error)
+    assert len(message) < 1000
+    assert message.endswith(f"... and {error.unexplained} more registration(s), matching less of the call")
+
+
+def test_registrations_are_ranked_by_matching_arguments():
+    mock = Mock()
+    allow(mock).get(1, 2, 3).returns("none match")
+    allow(mock).get(9, 2, 3).returns("two match")
+    allow(mock).get(ANY_ARG, 8, 3).returns("two match too")
+    allow(mock).get(9, 8, 7, key=1).returns("other shape")
+
+    error = _unregistered(lambda: mock.get(9, 8, 0))
+
+    assert [match.explanation for match in error.failed_matches] == [
+        "Positional arguments at index 2 didn't match (registered: '3', provided: '0')",
+        "Positional arguments at index 1 didn't match (registered: '2', provided: '8')",
+        "Positional arguments at index 0 didn't match (registered: '1', provided: '9')",
+    ]
+    assert error.unexplained == 1
+
+
+def test_calls_of_a_shape_no_registration_has():
+    mock = Mock()
+    for index in range(10):
+        allow(mock).get(index).returns(index)
+
+    error = _unregistered(lambda: mock.get(1, 2))
+
+    assert len(error.failed_matches) == UnregisteredCall.limit
+    assert error.unexplained == 10 - UnregisteredCall.limit
+    assert all(not match for match in error.failed_matches)
+
+
+def test_scoped_registrations_are_explained_too():
+    mock = Mock()
+    allow(mock).get(1, 1).returns("base")
+    with scope(mock):
+        allow(mock).get(2, 2).returns("scoped")
+
+        error = _unregistered(lambda: mock.get(2, 3))
+
+    assert [match.explanation for match in error.failed_matches] == [
+        "Positional arguments at index 1 didn't match (registered: '2', provided: '3')",
+        "Positional arguments at index 0 didn't match (registered: '1', provided: '2')",
+    ]
+
+
+def test_repr_includes_the_explanation():
+    mock = Mock()
+    allow(mock).get(1).returns("one")
+
+    error = _unregistered(lambda: mock.get(2))
+
+    assert repr(error).startswith("UnregisteredCall(")
+    assert "registered: '1', provided: '2'" in repr(error)
@@ -0,0 +1,112 @@
+from unittest.mock import Mock, call
+
+import pytest
+from mockitup import ANY_ARG, CallHistory, FastStub, allow, expectation_suite
+from mockitup.composer import ExpectationNotFulfilled
+
+
+def test_full_history_is_the_default():
+    mock = Mock()
+    allow(mock).get(ANY_ARG).returns(None)
+    for value in range(5):
+        mock.get(value)
+
+    assert len(mock.get.call_args_list) == 5
+    assert len(mock.mock_calls) == 5
+
+
+def test_bounded_history_keeps_last_calls():
+    mock = Mock()
+    allow(mock, history=CallHistory.last(2)).client.get(ANY_ARG).returns(None)
+    for value in range(5):
+        mock.client.get(value)
+
+    assert mock.client.get.call_args_list == [call(3), call(4)]
+    assert mock.client.get.call_count == 5
+    assert mock.client.method_calls == [call.get(3), call.get(4)]
+    assert mock.method_calls == [call.client.get(3), call.client.get(4)]
+    mock.client.get.assert_called_with(4)
+
+
+def test_counts_only_history():
+    mock = Mock()
+    allow(mock, history=CallHistory.counts_only()).get(ANY_ARG).returns(None)
+    for value in range(5):
+        mock.get(value)
+
+    assert mock.get.call_args_list == []
+    assert mock.mock_calls == []
+    assert mock.get.call_count == 5
+
+
+def test_expectations_work_without_history():
+    mock = Mock()
+    with expectation_suite(history=CallHistory.counts_only()) as es:
+        es.expect(mock).get(1).returns("one")
+        assert mock.get(1) == "one"
+
+    with pytest.raises(ExpectationNotFulfilled):
+        with expectation_suite(history=CallHistory.last(1)) as es:
+            es.expect(mock).get(2).returns("two")
+
+
+def test_history_of_fast_stubs():
+    stub = FastStub()
+    allow(stub, history=CallHistory.last(1)).get(ANY_ARG).returns(None)
+    stub.get(1)
+    stub.get(2)
+
+    assert stub.get.call_args_list == [call(2)]
+
+
+def test_bounded_history_requires_a_call():
+    with pytest.raises(ValueError):
+        CallHistory.last(0)
+
+
+def test_bounded_history_of_children_created_later():
+    mock = Mock()
+    allow(mock, history=CallHistory.last(2)).client.get(ANY_ARG).returns(None)
+    for value in range(5):
+        mock.client.post(value)
+        mock.other(value)
+
+    assert mock.client.post.call_args_list == [call(3), call(4)]
+    assert mock.other.mock_calls == [call(3), call(4)]
+    assert mock.other.call_count == 5
+
+
+def test_bounded_history_survives_reset():
+    mock = Mock()
+    allow(mock, history=CallHistory.last(1)).get(ANY_ARG).returns(None)
+    mock.get(1)
+    mock.reset_mock()
+    mock.get(2)
+    mock.get(3)
+
+    assert mock.get.call_args_list == [call(3)]
+    assert mock.mock_calls == [call.get(3)]
+    assert mock.get.call_count == 2
+
+
+def test_bounded_history_compares_like_call_lists():
+    mock = Mock()
+    allow(mock, history=CallHistory.last(3)).get(ANY_ARG).returns(None)
+    for value in range(5):
+        mock.get(value)
+
+    assert [call(3), call(4)] in mock.get.call_args_list
+    assert mock.get.call_args_list[-1] == call(4)
+    assert mock.get.call_args_list[1:] == [call(3), call(4)]
+    assert list(mock.get.call_args_list) == [call(2), call(3), call(4)]
+    mock.assert_has_calls([call.get(3), call.get(4)])
+
+
+def test_bounded_history_of_fast_stub_children():
+    stub = FastStub()
+    allow(stub, history=CallHistory.last(1)).get(ANY_ARG).returns(None)
+    allow(stub).client.post(ANY_ARG).returns(None)
+    stub.client.post(1)
+    stub.client.post(2)
+
+    assert stub.client.post.call_args_list == [call(2)]
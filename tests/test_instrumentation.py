@@ -0,0 +1,64 @@
+import json
+from unittest.mock import Mock
+
+import pytest
+from mockitup import ANY_ARG, allow, stats
+from mockitup.composer import MockItUpSideEffect, UnregisteredCall
+from mockitup.instrumentation import InstrumentedSideEffect, instrumented, is_enabled, reset
+
+
+@pytest.fixture(autouse=True)
+def fresh_stats():
+    reset()
+    yield
+    reset()
+
+
+def test_mocks_are_not_instrumented_by_default():
+    mock = Mock()
+    allow(mock).get().returns(None)
+
+    assert not is_enabled()
+    assert type(mock.get.side_effect) is MockItUpSideEffect
+    assert stats().mocks == []
+
+
+def test_dispatch_statistics():
+    mock = Mock()
+    with instrumented():
+        allow(mock).get(ANY_ARG, 1).returns("first")
+        allow(mock).get(ANY_ARG, 2).returns("second")
+        allow(mock).get("exact", 3).returns("third")
+    assert not is_enabled()
+    assert isinstance(mock.get.side_effect, InstrumentedSideEffect)
+
+    mock.get("a", 2)
+    mock.get("b", 2)
+    mock.get("exact", 3)
+    with pytest.raises(UnregisteredCall):
+        mock.get("c", 4)
+
+    mock_stats = stats()["mock.get"]
+    assert mock_stats.calls == 4
+    assert mock_stats.unregistered_calls == 1
+    assert mock_stats.max_scan_depth == 3
+    assert mock_stats.average_scan_depth == (2 + 2 + 3) / 3
+    assert [registration.hits for registration in mock_stats.registrations] == [0, 2, 1]
+    assert [registration.attempts for registration in mock_stats.registrations] == [4, 4, 1]
+    assert mock_stats.matching_seconds > 0
+    assert mock_stats.provide_seconds > 0
+
+
+def test_stats_export_to_json():
+    mock = Mock()
+    with instrumented():
+        allow(mock).get(1).returns("one")
+    mock.get(1)
+
+    exported = json.loads(stats().to_json())
+    assert exported["mocks"][0]["name"] == "mock.get"
+    assert exported["mocks"][0]["registrations"][0] == {
+        "arguments": "(args: '(1,)', kwargs: '{}')",
+        "hits": 1,
+        "attempts": 1,
+    }
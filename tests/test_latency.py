@@ -0,0 +1,125 @@
+import asyncio
+import random
+import sys
+import time
+from unittest.mock import AsyncMock, Mock
+
+import pytest
+import trio
+import trio.testing
+from mockitup import ANY_ARG, AsyncFastStub, allow, expectation_suite
+from mockitup.clock import VirtualClock
+
+
+def test_timeouts_run_in_virtual_time():
+
+    async def scenario():
+        with VirtualClock():
+            stub = AsyncFastStub()
+            allow(stub).fetch().after(30).returns("slow")
+
+            with pytest.raises(asyncio.TimeoutError):
+                await asyncio.wait_for(stub.fetch(), timeout=10)
+            assert await stub.fetch() == "slow"
+
+    started = time.perf_counter()
+    asyncio.run(scenario())
+    assert time.perf_counter() - started < 5
+
+
+def test_concurrent_calls_finish_in_a_deterministic_order():
+
+    async def scenario():
+        with VirtualClock():
+            stub = AsyncFastStub()
+            allow(stub).fetch(ANY_ARG).after(random.Random(3).random).returns_lazily(lambda: None)
+            finished = []
+
+            async def fetch(index):
+                await stub.fetch(index)
+                finished.append(index)
+
+            await asyncio.gather(*(fetch(index) for index in range(2000)))
+            return finished
+
+    first, second = asyncio.run(scenario()), asyncio.run(scenario())
+    assert first == second
+    assert first != list(range(2000))
+
+
+def test_advancing_the_clock_by_hand():
+
+    async def scenario():
+        with VirtualClock(autojump=False) as clock:
+            mock = Mock()
+            allow(mock).fetch().after(5).returns("fetched")
+            task = asyncio.ensure_future(mock.fetch())
+            await asyncio.sleep(0)
+
+            clock.advance(4)
+            await asyncio.sleep(0)
+            assert not task.done()
+
+            clock.advance(1)
+            assert await task == "fetched"
+
+    asyncio.run(scenario())
+
+
+def test_async_mocks_await_delayed_results():
+
+    async def scenario():
+        with VirtualClock():
+            mock = Mock()
+            mock.fetch = AsyncMock()
+            allow(mock).fetch().after(30).returns("slow")
+
+            with pytest.raises(asyncio.TimeoutError):
+                await asyncio.wait_for(mock.fetch(), timeout=10)
+            assert await mock.fetch() == "slow"
+
+    started = time.perf_counter()
+    asyncio.run(scenario())
+    assert time.perf_counter() - started < 5
+
+
+def test_expectations_with_latency():
+
+    async def scenario():
+        with expectation_suite() as es, VirtualClock():
+            stub = AsyncFastStub()
+            es.expect(stub).fetch(1).after(1).raises(KeyError("missing"))
+            pending = es.expect(stub).fetch(2).after(2).returns_pending()
+
+            with pytest.raises(KeyError):
+                await stub.fetch(1)
+            fetch = asyncio.ensure_future(stub.fetch(2))
+            await asyncio.sleep(3)
+            assert pending.resolve("pending") == 1
+            assert await fetch == "pending"
+
+    asyncio.run(scenario())
+
+
+def test_latency_on_trio_with_its_mock_clock():
+
+    async def scenario():
+        stub = AsyncFastStub()
+        allow(stub).fetch().after(30).returns("slow")
+        with trio.move_on_after(10) as timeout:
+            await stub.fetch()
+        assert timeout.cancelled_caught
+        assert await stub.fetch() == "slow"
+
+    started = time.perf_counter()
+    trio.run(scenario, clock=trio.testing.MockClock(autojump_threshold=0))
+    assert time.perf_counter() - started < 5
+
+
+def test_latency_outside_of_asyncio_needs_trio(monkeypatch):
+    stub = AsyncFastStub()
+    allow(stub).fetch().after(1).returns("slow")
+    monkeypatch.setitem(sys.modules, "trio", None)
+
+    with pytest.raises(RuntimeError, match="trio"):
+        stub.fetch().__await__().send(None)
@@ -0,0 +1,166 @@
+import random
+import sys
+from unittest.mock import AsyncMock, Mock
+
+import anyio
+import pytest
+from mockitup import ANY_ARG, AsyncFastStub, FastStub, allow
+from mockitup.pending import RANDOM, PendingCalls
+
+_CALLS = 10_000
+
+
+@pytest.fixture(params=["asyncio", "trio"])
+def anyio_backend(request):
+    return request.param
+
+
+async def _wait_for(pending, calls):
+    while len(pending) < calls:
+        await anyio.sleep(0)
+
+
+@pytest.mark.anyio
+async def test_settling_thousands_of_calls_first_come_first_served():
+    stub = AsyncFastStub()
+    pending = allow(stub).fetch(ANY_ARG).returns_pending()
+    made = []
+    results = {}
+
+    async def fetch(index):
+        made.append(index)
+        try:
+            results[index] = await stub.fetch(index)
+        except TimeoutError as error:
+            results[index] = error
+
+    async with anyio.create_task_group() as tasks:
+        for index in range(_CALLS):
+            tasks.start_soon(fetch, index)
+        await _wait_for(pending, _CALLS)
+
+        assert pending.resolve("fetched", count=_CALLS // 2) == _CALLS // 2
+        assert len(pending) == _CALLS // 2
+        assert pending.fail(TimeoutError()) == _CALLS // 2
+
+    assert len(pending) == 0
+    assert all(results[index] == "fetched" for index in made[:_CALLS // 2])
+    assert all(isinstance(results[index], TimeoutError) for index in made[_CALLS // 2:])
+
+
+@pytest.mark.anyio
+async def test_settling_calls_by_key():
+    mock = Mock()
+    pending = allow(mock).get(ANY_ARG).returns_pending(key=lambda url: url)
+    results = {}
+
+    async def get(index, url):
+        results[index] = await mock.get(url)
+
+    async with anyio.create_task_group() as tasks:
+        for index in range(100):
+            tasks.start_soon(get, index, "a" if index % 2 else "b")
+        await _wait_for(pending, 100)
+        assert sorted(pending.keys()) == ["a", "b"]
+
+        assert pending.resolve("from a", key="a") == 50
+        assert pending.resolve("never", key="a") == 0
+        assert pending.resolve("from b") == 50
+
+    assert all(results[index] == ("from a" if index % 2 else "from b") for index in range(100))
+
+
+@pytest.mark.anyio
+async def test_settling_calls_in_random_order():
+    stub = AsyncFastStub()
+    pending = allow(stub).fetch(ANY_ARG).returns_pending()
+    results = {}
+
+    async def fetch(index):
+        results[index] = await stub.fetch(index)
+
+    async with anyio.create_task_group() as tasks:
+        for index in range(1000):
+            tasks.start_soon(fetch, index)
+        await _wait_for(pending, 1000)
+
+        assert pending.resolve("early", count=10, order=RANDOM, rng=random.Random(7)) == 10
+        assert pending.resolve("late") == 990
+
+    early = sorted(index for index, result in results.items() if result == "early")
+    assert len(early) == 10
+    assert early != list(range(10))
+
+
+@pytest.mark.anyio
+async def test_cancelled_callers_are_settled_waking_no_one():
+    stub = FastStub()
+    pending = allow(stub).fetch().returns_pending()
+
+    with anyio.move_on_after(0.01):
+        await stub.fetch()
+
+    assert len(pending) == 1
+    assert pending.resolve("too late") == 1
+
+
+@pytest.mark.anyio
+async def test_calls_settled_before_they_are_awaited():
+    stub = FastStub()
+    pending = allow(stub).fetch().returns_pending()
+    first, second = stub.fetch(), stub.fetch()
+
+    pending.resolve("value", count=1)
+    pending.fail(KeyError("missing"))
+
+    assert await first == "value"
+    with pytest.raises(KeyError):
+        await second
+
+
+def test_settling_by_key_needs_a_key():
+    pending = allow(FastStub()).fetch().returns_pending()
+
+    with pytest.raises(TypeError, match="key"):
+        pending.resolve(key="a")
+    with pytest.raises(ValueError, match="order"):
+        pending.resolve(order="lifo")
+
+
+def test_awaiting_outside_of_asyncio_needs_trio(monkeypatch):
+    stub = FastStub()
+    allow(stub).fetch().returns_pending()
+    monkeypatch.setitem(sys.modules, "trio", None)
+
+    with pytest.raises(RuntimeError, match="trio"):
+        stub.fetch().__await__().send(None)
+
+
+@pytest.mark.anyio
+async def test_async_mocks_await_pending_results():
+    mock = Mock()
+    mock.fetch = AsyncMock()
+    pending = allow(mock).fetch(ANY_ARG).returns_pending()
+    results = {}
+
+    async def fetch(index):
+        results[index] = await mock.fetch(index)
+
+    async with anyio.create_task_group() as tasks:
+        for index in range(100):
+            tasks.start_soon(fetch, index)
+        await _wait_for(pending, 100)
+        assert pending.resolve("fetched") == 100
+
+    assert results == {index: "fetched" for index in range(100)}
+    assert mock.fetch.await_count == 100
+
+
+def test_settling_in_random_order_walks_only_the_settled_calls():
+    pending = PendingCalls()
+    calls = [pending._add((index, ), {}) for index in range(_CALLS)]
+
+    for settled in range(1, _CALLS + 1):
+        assert pending.resolve(settled, count=1, order=RANDOM, rng=random.Random(settled)) == 1
+    assert pending.resolve("none left", order=RANDOM) == 0
+    assert sorted(call._PendingCall__outcome[1] for call in calls) == list(range(1, _CALLS + 1))
@@ -0,0 +1,105 @@
+import multiprocessing
+import pickle
+from concurrent.futures import ProcessPoolExecutor
+
+import pytest
+from hamcrest import greater_than
+from mockitup import ANY_ARG, ANY_ARGS, FastStub, allow, dispatch_by_specificity, expectation_suite
+from mockitup.composer import ExpectationNotFulfilled, UnregisteredCall
+
+
+def _round_trip(value):
+    return pickle.loads(pickle.dumps(value))
+
+
+def _call_get(stub, times):
+    return [stub.get(index) for index in range(times)]
+
+
+def test_wildcards_stay_the_same_when_unpickled():
+    assert _round_trip(ANY_ARG) is ANY_ARG
+    assert _round_trip(ANY_ARGS) is ANY_ARGS
+    assert repr(ANY_ARG) == "ANY_ARG"
+
+
+def test_stub_with_allowances_is_picklable():
+    stub = FastStub()
+    allow(stub).get(1).returns("one")
+    allow(stub).get(greater_than(1)).returns("many")
+    allow(stub).log(ANY_ARGS).returns(None)
+    allow(stub).next().returns(1, 2, 3)
+
+    assert stub.next() == 1
+    copied = _round_trip(stub)
+
+    assert copied.get(1) == "one"
+    assert copied.get(5) == "many"
+    assert copied.log("a", level=3) is None
+    # The copy carries on from where the stub was.
+    assert copied.next() == 2
+    assert stub.next() == 2
+    with pytest.raises(UnregisteredCall):
+        copied.get(0)
+    assert copied.get._extract_mock_name() == "stub.get"
+
+
+def test_cached_and_specificity_side_effects_are_picklable():
+    stub = FastStub()
+    dispatch_by_specificity(stub)
+    allow(stub).get(ANY_ARG).returns("any")
+    allow(stub).get(1).returns("one")
+    allow(stub).build().returns_cached(list)
+
+    copied = _round_trip(stub)
+
+    assert copied.get(1) == "one"
+    assert copied.get(2) == "any"
+    assert copied.build() is copied.build()
+    allow(copied).get(3).returns("three")
+    assert copied.get(3) == "three"
+
+
+def test_expectations_need_a_channel_to_be_pickled():
+    with pytest.raises(ExpectationNotFulfilled):
+        with expectation_suite() as es:
+            stub = FastStub()
+            es.expect(stub).get(1).returns("one")
+
+            with pytest.raises(pickle.PicklingError, match="channel"):
+                pickle.dumps(stub)
+
+
+def test_calls_made_in_other_processes_fulfill_expectations():
+    with multiprocessing.Manager() as manager:
+        with expectation_suite(channel=manager.Queue()) as es:
+            stub = FastStub()
+            es.expect(stub).get(ANY_ARG).times(4).returns("value")
+            es.expect(stub).close().returns(None)
+
+            with ProcessPoolExecutor(2) as executor:
+                assert list(executor.map(_call_get, [stub, stub], [2, 2])) == [["value"] * 2] * 2
+
+            assert es.pending() == 1
+            stub.close()
+            assert es.pending() == 0
+
+
+def test_missing_calls_from_other_processes_fail_the_suite():
+    with multiprocessing.Manager() as manager:
+        with pytest.raises(ExpectationNotFulfilled):
+            with expectation_suite(channel=manager.Queue()) as es:
+                stub = FastStub()
+                es.expect(stub).get(ANY_ARG).times(3).returns("value")
+
+                with ProcessPoolExecutor(1) as executor:
+                    assert executor.submit(_call_get, stub, 2).result() == ["value"] * 2
+
+
+def test_suites_stay_in_their_process():
+    with multiprocessing.Manager() as manager:
+        with expectation_suite(channel=manager.Queue()) as es:
+            with pytest.raises(pickle.PicklingError, match="Suites can't be pickled"):
+                pickle.dumps(es)
+
+        with pytest.raises(ValueError, match="ordered"):
+            expectation_suite(ordered=True, channel=manager.Queue())
@@ -0,0 +1,151 @@
+import threading
+from unittest.mock import Mock, create_autospec
+
+import pytest
+
+from mockitup import ANY_ARG, allow, dispatch_by_specificity, record, replay
+from mockitup.composer import UnregisteredCall
+
+
+class Inventory:
+
+    def __init__(self):
+        self.counts = {"apple": 3}
+
+    def count(self, item, default=0):
+        return self.counts.get(item, default)
+
+    def take(self, item):
+        if not self.counts.get(item):
+            raise KeyError(item)
+        self.counts[item] -= 1
+        return self.counts[item]
+
+
+class Store:
+
+    def __init__(self):
+        self.inventory = Inventory()
+        self.timeout = 30
+
+    def lock(self):
+        return threading.Lock()
+
+
+def test_replays_recorded_results(tmp_path):
+    recording = str(tmp_path / "store.rec")
+    with record(Store(), recording) as store:
+        assert store.inventory.count("apple") == 3
+        assert store.inventory.count("pear", default=None) is None
+
+    mock = replay(Mock(), recording)
+    assert mock.inventory.count("apple") == 3
+    assert mock.inventory.count("pear", default=None) is None
+    with pytest.raises(UnregisteredCall):
+        mock.inventory.count("pear")
+
+
+def test_replays_repeated_calls_in_order(tmp_path):
+    recording = str(tmp_path / "inventory.rec")
+    with record(Inventory(), recording) as inventory:
+        assert inventory.take("apple") == 2
+        assert inventory.take("apple") == 1
+        assert inventory.take("apple") == 0
+        with pytest.raises(KeyError):
+            inventory.take("apple")
+
+    mock = replay(Mock(), recording)
+    assert [mock.take("apple") for _ in range(3)] == [2, 1, 0]
+    for _ in range(2):
+        with pytest.raises(KeyError):
+            mock.take("apple")
+
+
+def test_recordings_append(tmp_path):
+    recording = str(tmp_path / "inventory.rec")
+    for item in ("apple", "pear"):
+        with record(Inventory(), recording) as inventory:
+            inventory.count(item)
+
+    mock = replay(Mock(), recording)
+    assert mock.count("apple") == 3
+    assert mock.count("pear") == 0
+
+
+def test_replayed_calls_take_precedence_over_later_allowances(tmp_path):
+    recording = str(tmp_path / "inventory.rec")
+    with record(Inventory(), recording) as inventory:
+        inventory.count("apple")
+
+    mock = replay(Mock(), recording)
+    allow(mock).count("apple").returns(100)
+    allow(mock).count("pear").returns(5)
+
+    assert mock.count("apple") == 3
+    assert mock.count("pear") == 5
+
+
+def test_replays_onto_specced_mocks(tmp_path):
+    recording = str(tmp_path / "inventory.rec")
+    with record(Inventory(), recording) as inventory:
+        inventory.count("apple")
+
+    mock = replay(create_autospec(Inventory, instance=True), recording)
+    assert mock.count(item="apple", default=0) == 3
+
+
+def test_replayed_calls_survive_choosing_another_dispatch(tmp_path):
+    recording = str(tmp_path / "inventory.rec")
+    with record(Inventory(), recording) as inventory:
+        inventory.count("apple")
+
+    mock = dispatch_by_specificity(replay(Mock(), recording))
+    allow(mock).count(ANY_ARG).returns(0)
+
+    assert mock.count("apple") == 3
+    assert mock.count("pear") == 0
+
+
+def test_data_attributes_are_not_wrapped(tmp_path):
+    with record(Store(), str(tmp_path / "store.rec")) as store:
+        assert store.timeout == 30
+        assert store.inventory.counts == {"apple": 3}
+
+
+def test_replay_keeps_earlier_registrations(tmp_path):
+    recording = str(tmp_path / "inventory.rec")
+    with record(Inventory(), recording) as inventory:
+        inventory.count("apple")
+        inventory.count("pear")
+
+    mock = Mock()
+    allow(mock).count("pear").returns(5)
+    allow(mock).take(ANY_ARG).returns(0)
+    replay(mock, recording)
+
+    assert mock.count("apple") == 3
+    assert mock.count("pear") == 5
+    assert mock.take("apple") == 0
+
+
+def test_replay_rejects_mocks_with_side_effects_of_their_own(tmp_path):
+    recording = str(tmp_path / "inventory.rec")
+    with record(Inventory(), recording) as inventory:
+        inventory.count("apple")
+
+    with pytest.raises(ValueError, match="side effect"):
+        replay(Mock(count=Mock(side_effect=lambda item: 1)), recording)
+
+
+def test_calls_that_cant_be_pickled_are_not_recorded(tmp_path):
+    recording = str(tmp_path / "store.rec")
+    with record(Store(), recording) as store:
+        with pytest.warns(RuntimeWarning, match="'lock', its outcome"):
+            store.lock()
+        with pytest.warns(RuntimeWarning, match="'inventory.count', its arguments"):
+            assert store.inventory.count(threading.Lock()) == 0
+        store.inventory.count("apple")
+
+    mock = replay(Mock(), recording)
+    assert mock.inventory.count("apple") == 3
+    assert mock.lock.side_effect is None
@@ -0,0 +1,82 @@
+from unittest.mock import Mock
+
+import pytest
+from hamcrest import greater_than
+from mockitup import ANY_ARG, FastStub, allow, dispatch_as_stub, dispatch_by_specificity, expectation_suite, scope
+from mockitup.composer import ExpectationNotFulfilled, UnregisteredCall
+
+
+def test_scoped_registrations_take_precedence_until_the_scope_is_left():
+    mock = Mock()
+    allow(mock).get(1).returns("base")
+    allow(mock).get(ANY_ARG).returns("base default")
+    base = mock.get.side_effect
+
+    with scope(mock):
+        allow(mock).get(1).returns("scoped")
+        allow(mock).get(greater_than(5)).returns("scoped big")
+        allow(mock).other().returns("scoped other")
+
+        assert mock.get(1) == "scoped"
+        assert mock.get(6) == "scoped big"
+        assert mock.get(2) == "base default"
+        assert mock.other() == "scoped other"
+
+    assert mock.get.side_effect is base
+    assert mock.get(1) == "base"
+    assert mock.get(6) == "base default"
+    with pytest.raises(UnregisteredCall):
+        mock.other()
+
+
+def test_nested_scopes():
+    stub = FastStub()
+    allow(stub).get(1).returns("base")
+
+    with scope(stub):
+        allow(stub).get(1).returns("outer")
+        with scope(stub.get):
+            allow(stub).get(1).returns("inner")
+            assert stub.get(1) == "inner"
+        assert stub.get(1) == "outer"
+        allow(stub).get(2).returns("outer again")
+        assert stub.get(2) == "outer again"
+
+    assert stub.get(1) == "base"
+    with pytest.raises(UnregisteredCall, match="didn't match"):
+        stub.get(2)
+
+
+def test_scopes_with_other_dispatchers():
+    stub = dispatch_as_stub(FastStub())
+    specific = dispatch_by_specificity(Mock())
+    allow(stub).get(1).returns("base")
+    allow(specific).get(ANY_ARG).returns("base")
+
+    with scope(stub), scope(specific):
+        allow(stub).get(1).returns("scoped")
+        allow(specific).get(1).returns("scoped")
+        assert stub.get(1) == "scoped"
+        assert specific.get(1) == "scoped"
+
+    assert stub.get(1) == "base"
+    assert specific.get(1) == "base"
+
+
+def test_expectations_in_scopes():
+    with pytest.raises(ExpectationNotFulfilled):
+        with expectation_suite() as es:
+            mock = Mock()
+            allow(mock).get(1).returns("base")
+            with scope(mock):
+                es.expect(mock).get(1).returns("scoped")
+                es.expect(mock).get(2).returns("never called")
+                assert mock.get(1) == "scoped"
+            assert mock.get(1) == "base"
+
+
+def test_mocked_methods_named_scope():
+    mock = Mock()
+    allow(mock).scope("read").returns("token")
+
+    assert mock.scope("read") == "token"
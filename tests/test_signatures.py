@@ -0,0 +1,116 @@
+import inspect
+from unittest.mock import Mock, create_autospec
+
+import pytest
+from hamcrest import greater_than
+from mockitup import ANY_ARG, ANY_ARGS, allow
+from mockitup.composer import UnregisteredCall
+from mockitup.signatures import SignatureNormalizer
+
+
+class Client:
+
+    def get(self, key, timeout=5, *, retries=0):
+        ...
+
+    def send(self, *payloads, **headers):
+        ...
+
+
+def fetch(url, /, timeout=5):
+    ...
+
+
+def test_all_spellings_match_autospecced_methods():
+    client = create_autospec(Client, instance=True)
+    allow(client).get(1, timeout=2).returns("one")
+
+    assert client.get(1, 2) == "one"
+    assert client.get(1, timeout=2) == "one"
+    assert client.get(key=1, timeout=2, retries=0) == "one"
+    with pytest.raises(UnregisteredCall):
+        client.get(1)
+
+
+def test_defaults_are_applied():
+    client = create_autospec(Client, instance=True)
+    allow(client).get(1).returns("default timeout")
+
+    assert client.get(1, 5) == "default timeout"
+    assert client.get(1, retries=0) == "default timeout"
+
+
+def test_wildcards_with_signatures():
+    client = create_autospec(Client, instance=True)
+    allow(client).get(greater_than(10), timeout=ANY_ARG).returns("big")
+    allow(client).get(ANY_ARGS).returns("anything")
+
+    assert client.get(11, 1) == "big"
+    assert client.get(1, 1) == "anything"
+
+
+def test_variadic_signatures():
+    client = create_autospec(Client, instance=True)
+    allow(client).send("a", "b", header=1).returns("sent")
+
+    assert client.send("a", "b", header=1) == "sent"
+
+
+def test_mock_specced_with_function():
+    mock = Mock(spec=fetch)
+    allow(mock).__call__("url").returns("page")
+
+    assert mock("url", 5) == "page"
+    assert mock("url", timeout=5) == "page"
+
+
+@pytest.mark.parametrize("args, kwargs, normalized", [
+    ((1, ), {}, ((1, 5), {"retries": 0})),
+    ((1, 2), {"retries": 3}, ((1, 2), {"retries": 3})),
+    ((), {"key": 1, "timeout": 2}, ((1, 2), {"retries": 0})),
+])
+def test_normalizer(args, kwargs, normalized):
+    normalizer = SignatureNormalizer(inspect.signature(lambda key, timeout=5, *, retries=0: None))
+
+    assert normalizer.normalize(args, kwargs) == normalized
+
+
+@pytest.mark.parametrize("args, kwargs", [
+    ((), {}),
+    ((1, 2, 3), {}),
+    ((1, ), {"unknown": 1}),
+])
+def test_normalizer_rejects_unfitting_arguments(args, kwargs):
+    normalizer = SignatureNormalizer(inspect.signature(lambda key, timeout=5, *, retries=0: None))
+
+    with pytest.raises(TypeError):
+        normalizer.normalize(args, kwargs)
+
+
+def test_positional_only_parameters():
+    normalizer = SignatureNormalizer(inspect.signature(fetch))
+
+    assert normalizer.normalize(("url", ), {}) == (("url", 5), {})
+    with pytest.raises(TypeError):
+        normalizer.normalize((), {"url": "url"})
+
+
+def test_function_autospecs():
+    autospec = create_autospec(fetch)
+    allow(autospec)("url").returns("page")
+
+    assert autospec("url", 5) == "page"
+    assert autospec("url", timeout=5) == "page"
+
+
+class Store:
+
+    def get(self, key, options=[]):
+        ...
+
+
+def test_signatures_with_unhashable_defaults():
+    store = create_autospec(Store, instance=True)
+    allow(store).get("key").returns("value")
+
+    assert store.get("key", []) == "value"
@@ -0,0 +1,107 @@
+from unittest.mock import Mock
+
+import pytest
+from hamcrest import greater_than, instance_of
+
+from mockitup import ANY_ARG, ANY_ARGS, allow, dispatch_by_specificity, expectation_suite, returns_table
+from mockitup.composer import UnregisteredCall
+
+
+def test_most_specific_registration_wins():
+    mock = dispatch_by_specificity(Mock())
+    allow(mock).get(ANY_ARGS).returns("any args")
+    allow(mock).get(ANY_ARG).returns("any arg")
+    allow(mock).get(greater_than(10)).returns("matcher")
+    allow(mock).get(20).returns("exact")
+
+    assert mock.get(20) == "exact"
+    assert mock.get(11) == "matcher"
+    assert mock.get(5) == "any arg"
+    assert mock.get(5, 6) == "any args"
+
+
+def test_positions_are_compared_left_to_right():
+    mock = dispatch_by_specificity(Mock())
+    allow(mock).get(ANY_ARG, 2).returns("exact second")
+    allow(mock).get(1, ANY_ARG).returns("exact first")
+
+    assert mock.get(1, 2) == "exact first"
+    assert mock.get(0, 2) == "exact second"
+
+
+def test_backtracks_when_a_specific_branch_doesnt_match():
+    mock = dispatch_by_specificity(Mock())
+    allow(mock).get(1, 2).returns("exact")
+    allow(mock).get(instance_of(int), 3).returns("matcher")
+
+    assert mock.get(1, 3) == "matcher"
+
+
+def test_more_specific_named_arguments_win():
+    mock = dispatch_by_specificity(Mock())
+    allow(mock).get(1, timeout=ANY_ARG).returns("any timeout")
+    allow(mock).get(1, timeout=5).returns("exact timeout")
+
+    assert mock.get(1, timeout=5) == "exact timeout"
+    assert mock.get(1, timeout=6) == "any timeout"
+    with pytest.raises(UnregisteredCall):
+        mock.get(1)
+
+
+def test_named_arguments_are_looked_up_by_value():
+    mock = dispatch_by_specificity(Mock())
+    returns_table(allow(mock).get, (((), {"key": key, "timeout": 5}, key * 2) for key in range(1000)))
+    allow(mock).get(key=ANY_ARG, timeout=5).returns("any key")
+    allow(mock).get(key=1).returns("no timeout")
+
+    assert mock.get(key=999, timeout=5) == 1998
+    assert mock.get(timeout=5, key="a") == "any key"
+    assert mock.get(key=1) == "no timeout"
+
+
+def test_earliest_registration_wins_ties():
+    mock = dispatch_by_specificity(Mock())
+    allow(mock).get(greater_than(0)).returns("first")
+    allow(mock).get(greater_than(1)).returns("second")
+    allow(mock).get(3).returns("one")
+    allow(mock).get(3).returns("other")
+
+    assert mock.get(2) == "first"
+    assert mock.get(3) == "one"
+
+
+def test_unhashable_values():
+    mock = dispatch_by_specificity(Mock())
+    allow(mock).get(ANY_ARG).returns("any")
+    allow(mock).get([1]).returns("list")
+
+    assert mock.get([1]) == "list"
+    assert mock.get([2]) == "any"
+
+
+def test_unhashable_values_equal_to_hashed_ones():
+    mock = dispatch_by_specificity(Mock())
+    allow(mock).get(ANY_ARG, 1).returns("any")
+    allow(mock).get(frozenset({1}), 1).returns("set")
+
+    assert mock.get({1}, 1) == "set"
+    assert mock.get({2}, 1) == "any"
+
+
+def test_keeps_existing_registrations():
+    mock = Mock()
+    allow(mock).get(ANY_ARG).returns("any")
+    allow(mock).get(1).returns("one")
+    dispatch_by_specificity(mock)
+
+    assert mock.get(1) == "one"
+
+
+def test_expectations():
+    with expectation_suite() as es:
+        mock = dispatch_by_specificity(Mock())
+        es.expect(mock).get(ANY_ARG).returns("any")
+        es.expect(mock).get(1).returns("one")
+
+        assert mock.get(1) == "one"
+        assert mock.get(2) == "any"
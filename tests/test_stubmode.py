@@ -0,0 +1,93 @@
+from unittest.mock import Mock, create_autospec
+
+import pytest
+from hamcrest import greater_than
+from mockitup import ANY_ARG, ANY_ARGS, FastStub, allow, dispatch_as_stub, expectation_suite, stub_mode
+from mockitup.arguments_matcher import ArgumentsMatcher
+from mockitup.composer import ExpectationNotFulfilled, UnregisteredCall
+from mockitup.stubmode import StubModeSideEffect
+
+
+def test_allowances_in_stub_mode():
+    stub = dispatch_as_stub(FastStub())
+    allow(stub).get(1).returns("one")
+    allow(stub).get(1).returns("shadowed")
+    allow(stub).get([1]).returns("unhashable")
+    allow(stub).get(frozenset({1})).returns("set")
+    allow(stub).get(greater_than(1)).returns("many")
+    allow(stub).get(2).returns("shadowed by the matcher")
+    allow(stub).get(key=ANY_ARG).returns("named")
+    allow(stub).fail().raises(KeyError("missing"))
+    allow(stub).echo(ANY_ARGS).returns_cached(lambda *args: args, per_arguments=True)
+
+    assert stub.get(1) == "one"
+    assert stub.get([1]) == "unhashable"
+    assert stub.get({1}) == stub.get(frozenset({1})) == "set"
+    assert stub.get(2) == "many"
+    assert stub.get(key=3) == "named"
+    assert stub.echo(1, 2) == (1, 2)
+    with pytest.raises(KeyError):
+        stub.fail()
+    with pytest.raises(UnregisteredCall, match="didn't match"):
+        stub.get(0)
+
+
+def test_mocks_configured_in_stub_mode():
+    mock = Mock()
+    with stub_mode():
+        allow(mock).get(1).returns("one")
+    allow(mock).other(1).returns("other")
+
+    assert isinstance(mock.get.side_effect, StubModeSideEffect)
+    assert not isinstance(mock.other.side_effect, StubModeSideEffect)
+    assert mock.get(1) == "one"
+
+
+def test_expectations_are_still_counted_in_stub_mode():
+    with pytest.raises(ExpectationNotFulfilled):
+        with expectation_suite() as es:
+            stub = dispatch_as_stub(FastStub())
+            es.expect(stub).get(1).times(2).returns("one")
+            allow(stub).get(2).returns("two")
+
+            assert stub.get(1) == "one"
+            assert stub.get(2) == "two"
+            assert es.pending() == 1
+
+
+def test_stub_mode_builds_match_results_only_for_expectations(monkeypatch):
+    built = []
+    original = ArgumentsMatcher.matches
+
+    def matches(self, args, kwargs):
+        built.append(args)
+        return original(self, args, kwargs)
+
+    monkeypatch.setattr(ArgumentsMatcher, "matches", matches)
+    with expectation_suite() as es:
+        stub = dispatch_as_stub(FastStub())
+        allow(stub).get(greater_than(10)).returns("many")
+        es.expect(stub).get(ANY_ARG).returns("expected")
+        allow(stub).get(1).returns("shadowed")
+
+        assert stub.get(20) == "many"
+        assert built == []
+        assert stub.get(1) == "expected"
+        assert built == [(1, )]
+
+
+class Client:
+
+    def get(self, key, timeout=5):
+        ...
+
+
+def test_stub_mode_keeps_existing_registrations_and_normalizes_calls():
+    client = create_autospec(Client, instance=True)
+    allow(client).get(1).returns("one")
+    dispatch_as_stub(client)
+
+    assert client.get(key=1) == "one"
+    assert client.get(1, 5) == "one"
+    with pytest.raises(UnregisteredCall):
+        client.get(1, 2)
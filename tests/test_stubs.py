@@ -0,0 +1,61 @@
+from unittest.mock import call
+
+import pytest
+from mockitup import ANY_ARG, AsyncFastStub, FastStub, allow, expectation_suite
+from mockitup.composer import ExpectationNotFulfilled, UnregisteredCall
+
+
+def test_allowances_on_stub():
+    stub = FastStub()
+    allow(stub).get(1).returns("one")
+    allow(stub).get(ANY_ARG).returns("other")
+    allow(stub).nested.value = 5
+
+    assert stub.get(1) == "one"
+    assert stub.get(2) == "other"
+    assert stub.nested.value == 5
+    with pytest.raises(UnregisteredCall):
+        stub.get(1, 2)
+    with pytest.raises(UnregisteredCall):
+        stub.not_configured()
+
+
+def test_children_are_created_once():
+    stub = FastStub()
+
+    assert stub.a.b is stub.a.b
+    assert stub.a.b._extract_mock_name() == "stub.a.b"
+
+
+def test_expectations_on_stub():
+    with expectation_suite() as es:
+        stub = FastStub()
+        es.expect(stub).get(1).returns("one")
+
+        assert stub.get(1) == "one"
+
+    with pytest.raises(ExpectationNotFulfilled, match="'stub.get'"):
+        with expectation_suite() as es:
+            stub = FastStub()
+            es.expect(stub).get(1).returns("one")
+
+
+def test_calls_are_recorded_only_when_asked():
+    stub = FastStub(record_calls=True)
+    allow(stub).get(ANY_ARG).returns(None)
+    stub.get(1)
+    stub.get(2)
+
+    assert stub.get.call_args_list == [call(1), call(2)]
+    assert stub.get.call_count == 2
+
+    with pytest.raises(ValueError):
+        FastStub().call_args_list
+
+
+@pytest.mark.anyio
+async def test_async_stub():
+    stub = AsyncFastStub()
+    allow(stub).fetch("a").returns("fetched")
+
+    assert await stub.fetch("a") == "fetched"
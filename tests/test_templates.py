@@ -0,0 +1,95 @@
+from unittest.mock import Mock
+
+import pytest
+
+from mockitup import ANY_ARG, MockTemplate, allow, expectation_suite
+from mockitup.composer import ExpectationNotFulfilled, UnregisteredCall
+
+
+def _template():
+    template = MockTemplate()
+    template.allow().get(1).returns("one")
+    template.allow().get(ANY_ARG).returns("any")
+    template.allow().session.cursor().returns(1, 2, 3)
+    return template.compile()
+
+
+def test_applied_mocks_dispatch_like_allowed_ones():
+    mock = _template().apply(Mock())
+
+    assert mock.get(1) == "one"
+    assert mock.get(2) == "any"
+    assert mock.session.cursor() == 1
+
+
+def test_multiple_values_are_per_mock():
+    template = _template()
+    first, second = template.apply(Mock()), template.apply(Mock())
+
+    assert [first.session.cursor() for _ in range(3)] == [1, 2, 3]
+    assert second.session.cursor() == 1
+
+
+def test_pending_calls_are_queued_per_mock():
+    template = MockTemplate()
+    pending = template.allow().fetch(ANY_ARG).returns_pending()
+    compiled = template.compile()
+    first, second = compiled.apply(Mock()), compiled.apply(Mock())
+
+    first_call, second_call = first.fetch(1), second.fetch(2)
+    assert len(pending.of(first)) == len(pending.of(second)) == 1
+    assert pending.of(first).resolve("first") == 1
+    assert first_call.settled and not second_call.settled
+    with pytest.raises(ValueError):
+        pending.of(Mock())
+
+
+def test_registering_to_an_applied_mock_doesnt_affect_others():
+    template = _template()
+    first, second = template.apply(Mock()), template.apply(Mock())
+    allow(first).get(ANY_ARG, ANY_ARG).returns("two")
+
+    assert first.get(1, 2) == "two"
+    with pytest.raises(UnregisteredCall):
+        second.get(1, 2)
+
+
+def test_expectations_are_tracked_per_mock():
+    template = MockTemplate()
+    template.expect().connect().returns(True)
+    compiled = template.compile()
+
+    with pytest.raises(ExpectationNotFulfilled):
+        with expectation_suite() as es:
+            first, second = compiled.apply(Mock(), es), compiled.apply(Mock(), es)
+            first.connect()
+            assert es.pending() == 1
+            second.connect()
+            assert es.pending() == 0
+            second.connect()
+            first = Mock()
+            compiled.apply(first, es)
+
+
+def test_expectations_need_a_suite():
+    template = MockTemplate()
+    template.expect().connect().returns(True)
+
+    with pytest.raises(TypeError):
+        template.compile().apply(Mock())
+
+
+def test_compiled_templates_are_frozen():
+    template = MockTemplate()
+    template.compile()
+
+    with pytest.raises(TypeError):
+        template.allow().get().returns(None)
+
+
+def test_applying_to_registered_mocks_fails():
+    mock = Mock()
+    allow(mock).get(1).returns(None)
+
+    with pytest.raises(ValueError):
+        _template().apply(mock)